@@ -54,6 +54,7 @@ class ConfusionStrategy:
             'timing_detection': False,  # 时序检测
             'environment_binding': False,  # 环境绑定
             'anti_tampering': False,  # 防篡改
+            'profile_hook': False,  # 经 sys.setprofile 安装检查（不改写函数体）
             'strength': 0.5  # 保护强度（0-1）
         }
         
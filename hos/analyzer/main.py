@@ -1,11 +1,25 @@
 """分析模块主入口"""
 
+from bisect import bisect_left
+
 from hos.analyzer.ast_analyzer import ASTAnalyzer
 from hos.analyzer.cfg_generator import CFGGenerator
 from hos.analyzer.dfa_analyzer import DFAAnalyzer
 from hos.analyzer.hotpath_detector import HotpathDetector
 from hos.analyzer.sensitivity_analyzer import SensitivityAnalyzer
 
+# _compute_security_score 使用的阈值/加分表（阈值为严格大于）
+_LINE_THRESHOLDS = [100, 500, 1000]
+_LINE_SCORES = [5, 10, 15, 20]
+_FUNCTION_THRESHOLDS = [5, 20, 50]
+_FUNCTION_SCORES = [2, 5, 10, 15]
+_CLASS_THRESHOLDS = [3, 10, 20]
+_CLASS_SCORES = [1, 4, 7, 10]
+_HOT_PATH_THRESHOLDS = [2, 5]
+_HOT_PATH_SCORES = [2, 5, 10]
+_IMPORT_THRESHOLDS = [3, 10, 20]
+_IMPORT_SCORES = [1, 2, 5, 8]
+
 class CodeAnalyzer:
     """代码分析器"""
     
@@ -84,7 +98,7 @@ class CodeAnalyzer:
             'sensitivity': sensitivity_result,
             'target_function': target_function,
             'code_size': len(code),
-            'line_count': len(code.split('\n'))
+            'line_count': code.count('\n') + (0 if code.endswith('\n') else 1)
         }
         
         # 8. 计算安全价值评分
@@ -102,64 +116,31 @@ class CodeAnalyzer:
             float: 安全价值评分（0-100）
         """
         score = 0.0
-        
+
         # 基于代码复杂度
         line_count = analysis_result['line_count']
-        if line_count > 1000:
-            score += 20
-        elif line_count > 500:
-            score += 15
-        elif line_count > 100:
-            score += 10
-        else:
-            score += 5
-        
+        score += _LINE_SCORES[bisect_left(_LINE_THRESHOLDS, line_count)]
+
         # 基于函数数量
         function_count = len(analysis_result['ast']['functions'])
-        if function_count > 50:
-            score += 15
-        elif function_count > 20:
-            score += 10
-        elif function_count > 5:
-            score += 5
-        else:
-            score += 2
-        
+        score += _FUNCTION_SCORES[bisect_left(_FUNCTION_THRESHOLDS, function_count)]
+
         # 基于类数量
         class_count = len(analysis_result['ast']['classes'])
-        if class_count > 20:
-            score += 10
-        elif class_count > 10:
-            score += 7
-        elif class_count > 3:
-            score += 4
-        else:
-            score += 1
-        
+        score += _CLASS_SCORES[bisect_left(_CLASS_THRESHOLDS, class_count)]
+
         # 基于敏感度评分
         sensitivity_score = analysis_result['sensitivity']['sensitivity_score']
         score += sensitivity_score * 0.3
-        
+
         # 基于热路径数量
         hot_path_count = len(analysis_result['hot_paths'])
-        if hot_path_count > 5:
-            score += 10
-        elif hot_path_count > 2:
-            score += 5
-        else:
-            score += 2
-        
+        score += _HOT_PATH_SCORES[bisect_left(_HOT_PATH_THRESHOLDS, hot_path_count)]
+
         # 基于导入模块数量
         import_count = len(analysis_result['ast']['imports'])
-        if import_count > 20:
-            score += 8
-        elif import_count > 10:
-            score += 5
-        elif import_count > 3:
-            score += 2
-        else:
-            score += 1
-        
+        score += _IMPORT_SCORES[bisect_left(_IMPORT_THRESHOLDS, import_count)]
+
         # 归一化到0-100
         score = min(100, score)
         
@@ -1,8 +1,10 @@
 """敏感度分析器"""
 
+import re
+
 class SensitivityAnalyzer:
     """敏感度分析器"""
-    
+
     def __init__(self):
         """初始化敏感度分析器"""
         # 敏感模式列表
@@ -20,7 +22,36 @@ class SensitivityAnalyzer:
             'credit_card': [r'\b\d{13,16}\b'],
             'social_security': [r'\b\d{9}\b']
         }
-    
+        # 合并后的正则表达式，每个类别对应一个命名分组，单次扫描即可完成匹配
+        self._combined_re = self._build_combined_re()
+
+    def _build_combined_re(self):
+        """将所有敏感模式合并为一个带命名分组的正则表达式
+
+        Returns:
+            Pattern: 编译后的正则表达式，分组名即敏感类别
+        """
+        parts = [
+            '(?P<%s>%s)' % (category, '|'.join(patterns))
+            for category, patterns in self.sensitive_patterns.items()
+            if patterns
+        ]
+        return re.compile('|'.join(parts), re.IGNORECASE)
+
+    def _match_categories(self, text):
+        """返回文本命中的敏感类别（按首次出现顺序去重）
+
+        Args:
+            text: 待检查的文本
+
+        Returns:
+            dict: 以类别名为键的有序集合
+        """
+        found = {}
+        for m in self._combined_re.finditer(text):
+            found[m.lastgroup] = None
+        return found
+
     def analyze_sensitivity(self, code, ast_analyzer=None):
         """分析代码的敏感度
         
@@ -68,26 +99,21 @@ class SensitivityAnalyzer:
         Returns:
             list: 敏感字符串列表
         """
-        import re
         sensitive_strings = []
-        
+
         # 查找字符串字面量
         string_patterns = [r'"([^"]*)"', r"'([^']*)'", r"'''([^''']*)'''"]
-        
+
         for string_pattern in string_patterns:
             matches = re.findall(string_pattern, code, re.DOTALL)
             for match in matches:
-                # 检查字符串是否包含敏感模式
-                for category, patterns in self.sensitive_patterns.items():
-                    for pattern in patterns:
-                        if re.search(pattern, match, re.IGNORECASE):
-                            sensitive_strings.append({
-                                'content': match,
-                                'category': category,
-                                'pattern': pattern
-                            })
-                            break
-        
+                # 单次扫描检查字符串命中的所有敏感类别
+                for category in self._match_categories(match):
+                    sensitive_strings.append({
+                        'content': match,
+                        'category': category
+                    })
+
         return sensitive_strings
     
     def _find_sensitive_constants(self, code):
@@ -99,39 +125,25 @@ class SensitivityAnalyzer:
         Returns:
             list: 敏感常量列表
         """
-        import re
         sensitive_constants = []
-        
+
         # 查找常量定义（全大写变量）
         constant_pattern = r'\b([A-Z_][A-Z0-9_]*)\s*=\s*(.*)'
         matches = re.findall(constant_pattern, code)
-        
+
         for name, value in matches:
-            # 检查常量名是否包含敏感模式
-            for category, patterns in self.sensitive_patterns.items():
-                for pattern in patterns:
-                    if re.search(pattern, name, re.IGNORECASE):
-                        sensitive_constants.append({
-                            'name': name,
-                            'value': value,
-                            'category': category,
-                            'pattern': pattern
-                        })
-                        break
-            
-            # 检查常量值是否包含敏感模式
+            # 名称和值合并检查，按 (name, category) 去重
+            found = self._match_categories(name)
             if value:
-                for category, patterns in self.sensitive_patterns.items():
-                    for pattern in patterns:
-                        if re.search(pattern, value, re.IGNORECASE):
-                            sensitive_constants.append({
-                                'name': name,
-                                'value': value,
-                                'category': category,
-                                'pattern': pattern
-                            })
-                            break
-        
+                found.update(self._match_categories(value))
+
+            for category in found:
+                sensitive_constants.append({
+                    'name': name,
+                    'value': value,
+                    'category': category
+                })
+
         return sensitive_constants
     
     def _find_sensitive_functions(self, code):
@@ -284,6 +296,7 @@ class SensitivityAnalyzer:
         if category not in self.sensitive_patterns:
             self.sensitive_patterns[category] = []
         self.sensitive_patterns[category].append(pattern)
+        self._combined_re = self._build_combined_re()
     
     def remove_sensitive_pattern(self, category, pattern):
         """移除敏感模式
@@ -295,3 +308,4 @@ class SensitivityAnalyzer:
         if category in self.sensitive_patterns:
             if pattern in self.sensitive_patterns[category]:
                 self.sensitive_patterns[category].remove(pattern)
+                self._combined_re = self._build_combined_re()
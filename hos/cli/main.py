@@ -3,9 +3,6 @@
 import click
 import os
 import sys
-from tqdm import tqdm
-from hos.language.processor_factory import ProcessorFactory
-from hos.ai import AIStrategyGenerator
 
 @click.group()
 def cli():
@@ -19,9 +16,16 @@ def cli():
 @click.option('--mode', '-m', default='balanced', type=click.Choice(['performance', 'balanced', 'security']), help='性能模式')
 @click.option('--provider', '-p', default='local', type=click.Choice(['local', 'openai', 'anthropic', 'google']), help='AI provider')
 @click.option('--api-key', '-k', help='API key for AI provider')
+@click.option('--jobs', '-j', default=1, type=int, help='并行处理的进程数（默认串行）')
 @click.option('--verbose', '-v', is_flag=True, help='详细输出')
-def protect(input, output, level, mode, provider, api_key, verbose):
+@click.option('--json', 'json_output', is_flag=True, help='以单行紧凑 JSON 输出结果，抑制进度条等人类可读输出')
+def protect(input, output, level, mode, provider, api_key, jobs, verbose, json_output):
     """加密代码文件或目录"""
+    # 延迟导入重量级依赖，保证 --help/version 等命令的启动速度
+    from tqdm import tqdm
+    from hos.language.processor_factory import get_default_factory
+    from hos.ai import AIStrategyGenerator
+
     # 检查输入是否存在
     if not os.path.exists(input):
         click.echo(f"错误: 输入文件或目录 '{input}' 不存在", err=True)
@@ -32,63 +36,174 @@ def protect(input, output, level, mode, provider, api_key, verbose):
     
     # 确保输出目录存在
     if is_dir:
-        if not os.path.exists(output):
-            os.makedirs(output)
+        os.makedirs(output, exist_ok=True)
     else:
         output_dir = os.path.dirname(output)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
     
     # 初始化AI策略生成器和处理器工厂
     ai_generator = AIStrategyGenerator(provider=provider, api_key=api_key)
-    factory = ProcessorFactory()
+    factory = get_default_factory()
     
     # 处理输入
     if is_dir:
         # 处理目录
-        files = []
-        for root, _, filenames in os.walk(input):
-            for filename in filenames:
-                file_path = os.path.join(root, filename)
-                try:
-                    # 检测文件语言
-                    language = factory.detector.detect_from_file(file_path)
-                    if factory.detector.is_supported(language):
-                        files.append(file_path)
-                except Exception:
-                    pass
+        # scandir 迭代遍历：无额外 stat，扩展名不支持的文件零 I/O 跳过；
+        # 详细模式下对未知扩展名回退到基于内容的检测
+        files = list(_iter_source_files(input, factory.detector,
+                                        content_fallback=verbose))
         
         if not files:
             click.echo(f"警告: 目录 '{input}' 中没有找到支持的文件", err=True)
+            if json_output:
+                _echo_json_result(output, 0)
             sys.exit(0)
         
-        # 处理每个文件
-        with tqdm(total=len(files), desc="加密文件", unit="file") as pbar:
-            for file_path in files:
-                # 计算相对路径
-                rel_path = os.path.relpath(file_path, input)
-                output_path = os.path.join(output, rel_path)
-                
-                # 确保输出目录存在
-                output_file_dir = os.path.dirname(output_path)
-                if not os.path.exists(output_file_dir):
-                    os.makedirs(output_file_dir)
-                
-                # 处理文件
-                process_file(file_path, output_path, level, mode, verbose, ai_generator, factory)
-                pbar.update(1)
+        # 计算每个文件的输出路径并预创建输出目录
+        made_dirs = set()
+        tasks = []
+        for file_path in files:
+            rel_path = os.path.relpath(file_path, input)
+            output_path = os.path.join(output, rel_path)
+
+            output_file_dir = os.path.dirname(output_path)
+            if output_file_dir and output_file_dir not in made_dirs:
+                os.makedirs(output_file_dir, exist_ok=True)
+                made_dirs.add(output_file_dir)
+
+            tasks.append((file_path, output_path))
+
+        if jobs > 1:
+            # 文件之间相互独立，用进程池并行处理
+            from concurrent.futures import ProcessPoolExecutor
+
+            worker_args = [(f, o, level, mode) for f, o in tasks]
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(provider, api_key)
+            ) as executor:
+                results = executor.map(_process_file_worker, worker_args)
+                with tqdm(total=len(tasks), desc="加密文件", unit="file",
+                          disable=json_output) as pbar:
+                    for _ in results:
+                        pbar.update(1)
+        else:
+            # 串行处理每个文件
+            with tqdm(total=len(tasks), desc="加密文件", unit="file",
+                      disable=json_output) as pbar:
+                for file_path, output_path in tasks:
+                    process_file(file_path, output_path, level, mode, verbose, ai_generator, factory)
+                    pbar.update(1)
+        file_count = len(tasks)
     else:
         # 处理单个文件
         process_file(input, output, level, mode, verbose, ai_generator, factory)
-    
-    click.echo(f"\n加密完成! 结果保存在 '{output}'")
+        file_count = 1
+
+    if json_output:
+        _echo_json_result(output, file_count)
+    else:
+        click.echo(f"\n加密完成! 结果保存在 '{output}'")
+
+def _echo_json_result(output, count):
+    """以单行紧凑 JSON 输出加密结果，便于脚本和测试解析
+
+    Args:
+        output: 输出文件或目录路径
+        count: 处理的文件数量
+    """
+    import json
+    click.echo(json.dumps({'ok': True, 'files': count, 'output': output},
+                          ensure_ascii=False, separators=(',', ':')))
+
+def _iter_source_files(root, detector, content_fallback=False):
+    """基于 os.scandir 迭代目录树，产出支持的源文件路径
+
+    使用 DirEntry 缓存的类型信息判断文件/目录，避免对每个条目额外
+    stat；扩展名不在映射表中的文件默认直接跳过，不读取内容。
+
+    Args:
+        root: 根目录
+        detector: 语言检测器
+        content_fallback: 扩展名未知时是否回退到基于内容的检测
+
+    Yields:
+        str: 支持的源文件路径
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    language = detector.detect_from_file_fast(entry.name)
+                    if language == 'unknown' and content_fallback:
+                        language = detector.detect_from_file(entry.path)
+                    if detector.is_supported(language):
+                        yield entry.path
+                except OSError:
+                    continue
+
+# 并行模式下每个工作进程持有自己的生成器和工厂（处理器/AI客户端不保证可序列化）
+_worker_ai_generator = None
+_worker_factory = None
+
+def _init_worker(provider, api_key):
+    """初始化并行工作进程的全局状态"""
+    global _worker_ai_generator, _worker_factory
+    from hos.language.processor_factory import get_default_factory
+    from hos.ai import AIStrategyGenerator
+    _worker_ai_generator = AIStrategyGenerator(provider=provider, api_key=api_key)
+    _worker_factory = get_default_factory()
+
+def _process_file_worker(args):
+    """并行工作进程中处理单个文件（禁用详细输出避免交错）"""
+    input_path, output_path, level, mode = args
+    process_file(input_path, output_path, level, mode, False,
+                 _worker_ai_generator, _worker_factory)
+
+def _apply_level(strategy, level):
+    """根据混淆强度等级调整策略"""
+    if level == 'low':
+        strategy.set_strength(0.3)
+    elif level == 'medium':
+        strategy.set_strength(0.5)
+    else:  # high
+        strategy.set_strength(0.8)
+
+def _strategy_enables_transforms(strategy):
+    """检查策略是否启用了任何转换
+
+    Args:
+        strategy: 混淆策略
+
+    Returns:
+        bool: 是否有转换开关被启用
+    """
+    for section in (strategy.control_flow, strategy.data, strategy.instruction,
+                    strategy.structure, strategy.virtualization, strategy.runtime):
+        for key, value in section.items():
+            if key != 'strength' and value is True:
+                return True
+    return False
 
 def process_file(input_path, output_path, level, mode, verbose, ai_generator, factory):
     """处理单个文件"""
     try:
-        # 读取文件
-        with open(input_path, 'r', encoding='utf-8') as f:
-            code = f.read()
+        # 大块缓冲读入原始字节，只做一次 UTF-8 解码
+        with open(input_path, 'rb', buffering=1 << 20) as f:
+            code = f.read().decode('utf-8')
         
         if verbose:
             click.echo(f"\n处理文件: {input_path}")
@@ -101,32 +216,34 @@ def process_file(input_path, output_path, level, mode, verbose, ai_generator, fa
         if verbose:
             click.echo(f"检测到语言: {language}")
         
-        # 分析代码
-        if verbose:
-            click.echo("分析代码...")
-        analysis = processor.analyze(code)
-        
-        # 生成混淆策略
+        # 先用轻量指纹生成策略，只有确实会执行转换时才做完整分析
         if verbose:
             click.echo("生成混淆策略...")
-        strategy = ai_generator.generate_strategy(analysis, mode)
-        
-        # 根据强度调整策略
-        if level == 'low':
-            strategy.set_strength(0.3)
-        elif level == 'medium':
-            strategy.set_strength(0.5)
-        else:  # high
-            strategy.set_strength(0.8)
-        
+        fingerprint = {
+            'code_size': len(code),
+            'line_count': code.count('\n') + (0 if code.endswith('\n') else 1)
+        }
+        strategy = ai_generator.generate_strategy(fingerprint, mode)
+        _apply_level(strategy, level)
+
+        if _strategy_enables_transforms(strategy):
+            # 确认需要转换后，用完整分析结果重新生成策略
+            if verbose:
+                click.echo("分析代码...")
+            analysis = processor.analyze(code)
+            strategy = ai_generator.generate_strategy(analysis, mode)
+            _apply_level(strategy, level)
+
         # 转换代码
         if verbose:
             click.echo("转换代码...")
         transformed_code = processor.transform(code, strategy)
         
-        # 写入输出文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(transformed_code)
+        # 写入临时文件后原子替换，避免留下部分写入的输出
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'wb', buffering=1 << 20) as f:
+            f.write(transformed_code.encode('utf-8'))
+        os.replace(tmp_path, output_path)
         
         if verbose:
             click.echo("加密成功!")
@@ -139,6 +256,9 @@ def process_file(input_path, output_path, level, mode, verbose, ai_generator, fa
 @click.option('--output', '-o', help='分析结果输出文件')
 def analyze_cmd(file, output):
     """分析代码文件"""
+    # 延迟导入，避免拖慢其他命令的启动
+    from hos.language.processor_factory import get_default_factory
+
     # 检查文件是否存在
     if not os.path.exists(file):
         click.echo(f"错误: 文件 '{file}' 不存在", err=True)
@@ -148,8 +268,8 @@ def analyze_cmd(file, output):
     with open(file, 'r', encoding='utf-8') as f:
         code = f.read()
     
-    # 初始化处理器工厂
-    factory = ProcessorFactory()
+    # 获取共享的处理器工厂
+    factory = get_default_factory()
     
     # 分析代码
     click.echo(f"分析文件: {file}")
@@ -3,4 +3,7 @@
 from .detector import LanguageDetector
 from .base import LanguageProcessor
 
-__all__ = ["LanguageDetector", "LanguageProcessor"]
+# 模块级共享检测器：预编译的正则和检测缓存只构建一次
+default_detector = LanguageDetector()
+
+__all__ = ["LanguageDetector", "LanguageProcessor", "default_detector"]
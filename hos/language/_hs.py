@@ -0,0 +1,52 @@
+"""可选的 hyperscan 多模式扫描支持
+
+hyperscan 将多个模式编译成单个 DFA 数据库，一次原生扫描同时定位所有
+候选位置；未安装时各调用方退回纯 Python 路径。
+"""
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+def build_database(expressions):
+    """编译 hyperscan 多模式数据库
+
+    Args:
+        expressions: 正则表达式字符串列表
+
+    Returns:
+        hyperscan.Database: 编译后的数据库，不可用或编译失败时返回 None
+    """
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[e.encode('utf-8') for e in expressions],
+            ids=list(range(len(expressions))),
+            flags=[hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SOM_LEFTMOST]
+                  * len(expressions)
+        )
+        return db
+    except Exception:
+        return None
+
+def scan_starts(db, data):
+    """扫描数据，返回按起点排序的候选命中位置
+
+    Args:
+        db: build_database 返回的数据库
+        data: 待扫描的字节串
+
+    Returns:
+        list: (起始偏移, 模式 id) 元组列表，按起始偏移升序
+    """
+    hits = []
+
+    def on_match(pat_id, start, end, flags, context=None):
+        hits.append((start, pat_id))
+
+    db.scan(data, match_event_handler=on_match)
+    hits.sort()
+    return hits
@@ -3,6 +3,57 @@
 from hos.language.base import LanguageProcessor
 import re
 
+# 可选的 numba JIT：缺失时评分内核以纯 Python 运行
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
+
+# 预编译的提取正则表达式（模块加载时编译一次，避免每次调用重新编译）
+_FUNC_RE = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*', re.MULTILINE)
+_INSTR_RE = re.compile(r'\s*([a-z]+)\s+.*', re.MULTILINE)
+_REG_RE = re.compile(rb'\b([rR][0-9]+|sp|lr|pc)\b')
+_CONST_RE = re.compile(r'\s*[a-z]+\s+.*?#([0-9]+).*', re.MULTILINE)
+
+# 融合的单遍扫描正则：一次 finditer 同时提取函数、指令、寄存器和常量
+_SCAN_RE = re.compile(
+    r'^[ \t]*(?P<func>[a-zA-Z_][a-zA-Z0-9_]*)[ \t]*:'
+    r'|^[ \t]*(?P<instr>[a-z]+)[ \t]'
+    r'|(?P<reg>\b[rR][0-9]+\b|\bsp\b|\blr\b|\bpc\b)'
+    r'|#(?P<const>[0-9]+)',
+    re.MULTILINE)
+
+def _score_kernel(line_count, function_count, sensitivity_score):
+    """安全评分的纯标量内核（可被 numba 编译）"""
+    score = 0.0
+
+    if line_count > 1000:
+        score += 20
+    elif line_count > 500:
+        score += 15
+    elif line_count > 100:
+        score += 10
+    else:
+        score += 5
+
+    if function_count > 50:
+        score += 15
+    elif function_count > 20:
+        score += 10
+    elif function_count > 5:
+        score += 5
+    else:
+        score += 2
+
+    score += sensitivity_score * 0.3
+
+    if score > 100:
+        score = 100.0
+    return score
+
+if _njit is not None:
+    _score_kernel = _njit(cache=True)(_score_kernel)
+
 class ARMProcessor(LanguageProcessor):
     """ARM语言处理器
     
@@ -22,11 +73,9 @@ class ARMProcessor(LanguageProcessor):
         Returns:
             dict: 分析结果
         """
-        # 提取基本信息
-        functions = self._extract_functions(code)
-        instructions = self._extract_instructions(code)
-        registers = self._extract_registers(code)
-        
+        # 单遍扫描提取基本信息
+        functions, instructions, registers, constants = self._scan_code(code)
+
         # 生成分析结果
         analysis_result = {
             'ast': {
@@ -53,12 +102,12 @@ class ARMProcessor(LanguageProcessor):
             'sensitivity': {
                 'sensitivity_score': 50,
                 'sensitive_strings': [],
-                'sensitive_constants': self._extract_constants(code),
+                'sensitive_constants': constants,
                 'sensitive_functions': [],
                 'sensitive_variables': registers
             },
             'code_size': len(code),
-            'line_count': len(code.split('\n'))
+            'line_count': code.count('\n') + (0 if code.endswith('\n') else 1)
         }
         
         # 计算安全价值评分
@@ -108,6 +157,38 @@ class ARMProcessor(LanguageProcessor):
         """
         return 'arm'
     
+    def _scan_code(self, code):
+        """单遍扫描代码，同时提取函数、指令、寄存器和常量
+
+        Args:
+            code: 源代码字符串
+
+        Returns:
+            tuple: (函数列表, 指令列表, 寄存器列表, 常量列表)
+        """
+        functions = []
+        instructions = []
+        registers = set()
+        constants = []
+
+        for m in _SCAN_RE.finditer(code):
+            kind = m.lastgroup
+            if kind == 'func':
+                functions.append({
+                    'name': m.group('func'),
+                    'params': '',
+                    'return_type': '',
+                    'body': ''
+                })
+            elif kind == 'instr':
+                instructions.append(m.group('instr'))
+            elif kind == 'reg':
+                registers.add(m.group('reg'))
+            else:  # const
+                constants.append(m.group('const'))
+
+        return functions, instructions, list(registers), constants
+
     def _extract_functions(self, code):
         """提取函数定义
         
@@ -118,10 +199,7 @@ class ARMProcessor(LanguageProcessor):
             list: 函数列表
         """
         functions = []
-        # 简单的函数提取正则表达式
-        function_pattern = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*', re.MULTILINE)
-        
-        for match in function_pattern.finditer(code):
+        for match in _FUNC_RE.finditer(code):
             name = match.group(1)
             functions.append({
                 'name': name,
@@ -132,22 +210,33 @@ class ARMProcessor(LanguageProcessor):
         
         return functions
     
-    def _extract_instructions(self, code):
+    def _extract_instructions(self, code, use_fast_path=True):
         """提取指令
-        
+
         Args:
             code: 源代码字符串
-            
+            use_fast_path: 是否使用字节级快速扫描（否则退回正则）
+
         Returns:
             list: 指令列表
         """
+        if not use_fast_path:
+            instructions = []
+            for match in _INSTR_RE.finditer(code):
+                instructions.append(match.group(1))
+            return instructions
+
+        # 字节级扫描：指令是行首的小写字母序列，后跟空白
         instructions = []
-        # 简单的指令提取正则表达式
-        instruction_pattern = re.compile(r'\s*([a-z]+)\s+.*', re.MULTILINE)
-        
-        for match in instruction_pattern.finditer(code):
-            instructions.append(match.group(1))
-        
+        for line in code.encode('ascii', 'ignore').split(b'\n'):
+            stripped = line.lstrip()
+            n = 0
+            length = len(stripped)
+            while n < length and 0x61 <= stripped[n] <= 0x7a:  # a-z
+                n += 1
+            if n and n < length and stripped[n] in b' \t':
+                instructions.append(stripped[:n].decode('ascii'))
+
         return instructions
     
     def _extract_registers(self, code):
@@ -159,31 +248,39 @@ class ARMProcessor(LanguageProcessor):
         Returns:
             list: 寄存器列表
         """
-        registers = []
-        # 简单的寄存器提取正则表达式
-        register_pattern = re.compile(r'\s*[a-z]+\s+.*?([rR][0-9]+|sp|lr|pc).*', re.MULTILINE)
-        
-        for match in register_pattern.finditer(code):
-            registers.append(match.group(1))
-        
-        return list(set(registers))
+        # 在 ASCII 字节序列上扫描固定的小字母表，集合推导式直接去重
+        data = code.encode('ascii', 'ignore')
+        return list({m.group(1).decode('ascii') for m in _REG_RE.finditer(data)})
     
-    def _extract_constants(self, code):
+    def _extract_constants(self, code, use_fast_path=True):
         """提取常量
-        
+
         Args:
             code: 源代码字符串
-            
+            use_fast_path: 是否使用字节级快速扫描（否则退回正则）
+
         Returns:
             list: 常量列表
         """
+        if not use_fast_path:
+            constants = []
+            for match in _CONST_RE.finditer(code):
+                constants.append(match.group(1))
+            return constants
+
+        # 字节级扫描：用 memchr 支持的 bytes.find 定位 '#'，再读取其后的数字串
+        data = code.encode('ascii', 'ignore')
         constants = []
-        # 简单的常量提取正则表达式
-        const_pattern = re.compile(r'\s*[a-z]+\s+.*?#([0-9]+).*', re.MULTILINE)
-        
-        for match in const_pattern.finditer(code):
-            constants.append(match.group(1))
-        
+        pos = data.find(b'#')
+        while pos != -1:
+            end = pos + 1
+            length = len(data)
+            while end < length and 0x30 <= data[end] <= 0x39:  # 0-9
+                end += 1
+            if end > pos + 1:
+                constants.append(data[pos + 1:end].decode('ascii'))
+            pos = data.find(b'#', end)
+
         return constants
     
     def _compute_security_score(self, analysis_result):
@@ -195,38 +292,11 @@ class ARMProcessor(LanguageProcessor):
         Returns:
             float: 安全价值评分
         """
-        score = 0.0
-        
-        # 基于代码复杂度
-        line_count = analysis_result['line_count']
-        if line_count > 1000:
-            score += 20
-        elif line_count > 500:
-            score += 15
-        elif line_count > 100:
-            score += 10
-        else:
-            score += 5
-        
-        # 基于函数数量
-        function_count = len(analysis_result['ast']['functions'])
-        if function_count > 50:
-            score += 15
-        elif function_count > 20:
-            score += 10
-        elif function_count > 5:
-            score += 5
-        else:
-            score += 2
-        
-        # 基于敏感度评分
-        sensitivity_score = analysis_result['sensitivity']['sensitivity_score']
-        score += sensitivity_score * 0.3
-        
-        # 归一化到0-100
-        score = min(100, score)
-        
-        return score
+        return _score_kernel(
+            analysis_result['line_count'],
+            len(analysis_result['ast']['functions']),
+            float(analysis_result['sensitivity']['sensitivity_score'])
+        )
     
     def _obfuscate_control_flow(self, code):
         """混淆控制流
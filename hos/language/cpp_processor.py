@@ -3,6 +3,77 @@
 from hos.language.base import LanguageProcessor
 import re
 
+# 可选的 numba JIT：缺失时评分内核以纯 Python 运行
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
+
+# 预编译的提取正则表达式（模块加载时编译一次，避免每次调用重新编译）
+_FUNC_RE = re.compile(r'\s*(\w+)\s+(\w+)\s*\(([^)]*)\)\s*[{;]', re.MULTILINE)
+_CLASS_RE = re.compile(r'\s*class\s+(\w+)\s*[{]', re.MULTILINE)
+_INCLUDE_RE = re.compile(r'\s*#include\s*[<"]([^>"]+)[>"]', re.MULTILINE)
+_STR_RE = re.compile(r'"([^"]*)"', re.MULTILINE)
+_CONST_RE = re.compile(r'\s*const\s+\w+\s+\w+\s*=\s*([^;]+);', re.MULTILINE)
+
+# 融合的单遍扫描正则：一次 finditer 同时提取包含、类、常量、字符串和函数
+_SCAN_RE = re.compile(
+    r'(?P<include>#include\s*[<"](?P<include_path>[^>"]+)[>"])'
+    r'|(?P<cls>\bclass\s+(?P<cls_name>\w+)\s*\{)'
+    r'|(?P<const>\bconst\s+\w+\s+\w+\s*=\s*(?P<const_val>[^;]+);)'
+    r'|(?P<str>"(?P<str_val>[^"]*)")'
+    r'|(?P<func>\b(?P<func_ret>\w+)\s+(?P<func_name>\w+)\s*\((?P<func_params>[^)]*)\)\s*[{;])',
+    re.MULTILINE)
+
+def _score_kernel(line_count, function_count, class_count, sensitivity_score, import_count):
+    """安全评分的纯标量内核（可被 numba 编译）"""
+    score = 0.0
+
+    if line_count > 1000:
+        score += 20
+    elif line_count > 500:
+        score += 15
+    elif line_count > 100:
+        score += 10
+    else:
+        score += 5
+
+    if function_count > 50:
+        score += 15
+    elif function_count > 20:
+        score += 10
+    elif function_count > 5:
+        score += 5
+    else:
+        score += 2
+
+    if class_count > 20:
+        score += 10
+    elif class_count > 10:
+        score += 7
+    elif class_count > 3:
+        score += 4
+    else:
+        score += 1
+
+    score += sensitivity_score * 0.3
+
+    if import_count > 20:
+        score += 8
+    elif import_count > 10:
+        score += 5
+    elif import_count > 3:
+        score += 2
+    else:
+        score += 1
+
+    if score > 100:
+        score = 100.0
+    return score
+
+if _njit is not None:
+    _score_kernel = _njit(cache=True)(_score_kernel)
+
 class CPPProcessor(LanguageProcessor):
     """C/C++语言处理器
     
@@ -22,11 +93,9 @@ class CPPProcessor(LanguageProcessor):
         Returns:
             dict: 分析结果
         """
-        # 提取基本信息
-        functions = self._extract_functions(code)
-        classes = self._extract_classes(code)
-        includes = self._extract_includes(code)
-        
+        # 单遍扫描提取基本信息
+        functions, classes, includes, strings, constants = self._scan_code(code)
+
         # 生成分析结果
         analysis_result = {
             'ast': {
@@ -52,13 +121,13 @@ class CPPProcessor(LanguageProcessor):
             'hot_paths': [],
             'sensitivity': {
                 'sensitivity_score': 50,
-                'sensitive_strings': self._extract_strings(code),
-                'sensitive_constants': self._extract_constants(code),
+                'sensitive_strings': strings,
+                'sensitive_constants': constants,
                 'sensitive_functions': [],
                 'sensitive_variables': []
             },
             'code_size': len(code),
-            'line_count': len(code.split('\n'))
+            'line_count': code.count('\n') + (0 if code.endswith('\n') else 1)
         }
         
         # 计算安全价值评分
@@ -107,6 +176,43 @@ class CPPProcessor(LanguageProcessor):
         """
         return 'cpp'
     
+    def _scan_code(self, code):
+        """单遍扫描代码，同时提取函数、类、包含、字符串和常量
+
+        Args:
+            code: 源代码字符串
+
+        Returns:
+            tuple: (函数列表, 类列表, 包含列表, 字符串列表, 常量列表)
+        """
+        functions = []
+        classes = []
+        includes = []
+        strings = []
+        constants = []
+
+        for m in _SCAN_RE.finditer(code):
+            if m.group('include') is not None:
+                includes.append(m.group('include_path'))
+            elif m.group('cls') is not None:
+                classes.append({
+                    'name': m.group('cls_name'),
+                    'methods': []
+                })
+            elif m.group('const') is not None:
+                constants.append(m.group('const_val'))
+            elif m.group('str') is not None:
+                strings.append(m.group('str_val'))
+            else:  # func
+                functions.append({
+                    'name': m.group('func_name'),
+                    'return_type': m.group('func_ret'),
+                    'params': m.group('func_params'),
+                    'body': ''
+                })
+
+        return functions, classes, includes, strings, constants
+
     def _extract_functions(self, code):
         """提取函数定义
         
@@ -117,10 +223,7 @@ class CPPProcessor(LanguageProcessor):
             list: 函数列表
         """
         functions = []
-        # 简单的函数提取正则表达式
-        function_pattern = re.compile(r'\s*(\w+)\s+(\w+)\s*\(([^)]*)\)\s*[{;]', re.MULTILINE)
-        
-        for match in function_pattern.finditer(code):
+        for match in _FUNC_RE.finditer(code):
             return_type = match.group(1)
             name = match.group(2)
             params = match.group(3)
@@ -144,10 +247,7 @@ class CPPProcessor(LanguageProcessor):
             list: 类列表
         """
         classes = []
-        # 简单的类提取正则表达式
-        class_pattern = re.compile(r'\s*class\s+(\w+)\s*[{]', re.MULTILINE)
-        
-        for match in class_pattern.finditer(code):
+        for match in _CLASS_RE.finditer(code):
             name = match.group(1)
             classes.append({
                 'name': name,
@@ -166,10 +266,7 @@ class CPPProcessor(LanguageProcessor):
             list: 包含语句列表
         """
         includes = []
-        # 简单的包含提取正则表达式
-        include_pattern = re.compile(r'\s*#include\s*[<"]([^>"]+)[>"]', re.MULTILINE)
-        
-        for match in include_pattern.finditer(code):
+        for match in _INCLUDE_RE.finditer(code):
             includes.append(match.group(1))
         
         return includes
@@ -184,10 +281,7 @@ class CPPProcessor(LanguageProcessor):
             list: 字符串列表
         """
         strings = []
-        # 简单的字符串提取正则表达式
-        string_pattern = re.compile(r'"([^"]*)"', re.MULTILINE)
-        
-        for match in string_pattern.finditer(code):
+        for match in _STR_RE.finditer(code):
             strings.append(match.group(1))
         
         return strings
@@ -202,10 +296,7 @@ class CPPProcessor(LanguageProcessor):
             list: 常量列表
         """
         constants = []
-        # 简单的常量提取正则表达式
-        const_pattern = re.compile(r'\s*const\s+\w+\s+\w+\s*=\s*([^;]+);', re.MULTILINE)
-        
-        for match in const_pattern.finditer(code):
+        for match in _CONST_RE.finditer(code):
             constants.append(match.group(1))
         
         return constants
@@ -219,60 +310,13 @@ class CPPProcessor(LanguageProcessor):
         Returns:
             float: 安全价值评分
         """
-        score = 0.0
-        
-        # 基于代码复杂度
-        line_count = analysis_result['line_count']
-        if line_count > 1000:
-            score += 20
-        elif line_count > 500:
-            score += 15
-        elif line_count > 100:
-            score += 10
-        else:
-            score += 5
-        
-        # 基于函数数量
-        function_count = len(analysis_result['ast']['functions'])
-        if function_count > 50:
-            score += 15
-        elif function_count > 20:
-            score += 10
-        elif function_count > 5:
-            score += 5
-        else:
-            score += 2
-        
-        # 基于类数量
-        class_count = len(analysis_result['ast']['classes'])
-        if class_count > 20:
-            score += 10
-        elif class_count > 10:
-            score += 7
-        elif class_count > 3:
-            score += 4
-        else:
-            score += 1
-        
-        # 基于敏感度评分
-        sensitivity_score = analysis_result['sensitivity']['sensitivity_score']
-        score += sensitivity_score * 0.3
-        
-        # 基于导入模块数量
-        import_count = len(analysis_result['ast']['imports'])
-        if import_count > 20:
-            score += 8
-        elif import_count > 10:
-            score += 5
-        elif import_count > 3:
-            score += 2
-        else:
-            score += 1
-        
-        # 归一化到0-100
-        score = min(100, score)
-        
-        return score
+        return _score_kernel(
+            analysis_result['line_count'],
+            len(analysis_result['ast']['functions']),
+            len(analysis_result['ast']['classes']),
+            float(analysis_result['sensitivity']['sensitivity_score']),
+            len(analysis_result['ast']['imports'])
+        )
     
     def _obfuscate_control_flow(self, code):
         """混淆控制流
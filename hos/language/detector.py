@@ -1,8 +1,43 @@
 """语言检测器"""
 
+import hashlib
 import os
 import re
 
+# 可选的 google-re2 DFA 引擎：线性时间匹配、无回溯；未安装时退回标准 re
+try:
+    import re2 as _re
+except ImportError:
+    _re = re
+
+def _compile_pattern(pattern, flags=re.MULTILINE):
+    """编译检测用正则，优先使用 re2，re2 不支持的语法退回标准 re
+
+    Args:
+        pattern: 正则表达式字符串
+        flags: 编译标志
+
+    Returns:
+        Pattern: 编译后的正则表达式
+    """
+    try:
+        return _re.compile(pattern, flags)
+    except Exception:
+        return re.compile(pattern, flags)
+
+# 各语言的内容特征（原始模式，编译和合并在检测器初始化时完成）
+_CONTENT_PATTERNS = {
+    'python': [r'^\s*def\s+\w+\s*\(', r'^\s*import\s+\w+', r'^\s*from\s+\w+\s+import'],
+    'c': [r'^\s*#include\s*<\w+\.h>', r'^\s*int\s+main\s*\(', r'^\s*void\s+\w+\s*\('],
+    'cpp': [r'^\s*#include\s*<\w+\.hpp>', r'^\s*class\s+\w+', r'^\s*namespace\s+\w+'],
+    'rust': [r'^\s*fn\s+\w+\s*\(', r'^\s*use\s+\w+', r'^\s*mod\s+\w+'],
+    'go': [r'^\s*package\s+\w+', r'^\s*import\s+\(', r'^\s*func\s+\w+\s*\('],
+    'java': [r'^\s*public\s+class\s+\w+', r'^\s*import\s+\w+', r'^\s*package\s+\w+'],
+    'javascript': [r'^\s*function\s+\w+\s*\(', r'^\s*const\s+\w+\s*=', r'^\s*let\s+\w+\s*='],
+    'typescript': [r'^\s*interface\s+\w+', r'^\s*type\s+\w+\s*=', r'^\s*import\s+.*from'],
+    'wasm': [r'^\s*\(module', r'^\s*\(func', r'^\s*\(export']
+}
+
 class LanguageDetector:
     """语言检测器
     
@@ -28,19 +63,50 @@ class LanguageDetector:
             '.wasm': 'wasm'
         }
         
-        # 内容特征映射
+        # 内容特征映射（初始化时编译一次，避免每次检测重新编译）
         self.content_patterns = {
-            'python': [r'^\s*def\s+\w+\s*\(', r'^\s*import\s+\w+', r'^\s*from\s+\w+\s+import'],
-            'c': [r'^\s*#include\s*<\w+\.h>', r'^\s*int\s+main\s*\(', r'^\s*void\s+\w+\s*\('],
-            'cpp': [r'^\s*#include\s*<\w+\.hpp>', r'^\s*class\s+\w+', r'^\s*namespace\s+\w+'],
-            'rust': [r'^\s*fn\s+\w+\s*\(', r'^\s*use\s+\w+', r'^\s*mod\s+\w+'],
-            'go': [r'^\s*package\s+\w+', r'^\s*import\s+\(', r'^\s*func\s+\w+\s*\('],
-            'java': [r'^\s*public\s+class\s+\w+', r'^\s*import\s+\w+', r'^\s*package\s+\w+'],
-            'javascript': [r'^\s*function\s+\w+\s*\(', r'^\s*const\s+\w+\s*=', r'^\s*let\s+\w+\s*='],
-            'typescript': [r'^\s*interface\s+\w+', r'^\s*type\s+\w+\s*=', r'^\s*import\s+.*from'],
-            'wasm': [r'^\s*\(module', r'^\s*\(func', r'^\s*\(export']
+            language: [_compile_pattern(p) for p in patterns]
+            for language, patterns in _CONTENT_PATTERNS.items()
         }
-    
+
+        # 每种语言的合并匹配器。以 ^\s* 开头的模式本质是行前缀测试，
+        # 去掉前缀后合并成一个交替式，对已去除缩进的行做 match 即可；
+        # 其余自由模式（如有）合并后仍对全文扫描。各子模式对应一个
+        # 编号分组，用于统计命中了多少个不同特征。
+        self._lang_matchers = {}
+        for language, patterns in _CONTENT_PATTERNS.items():
+            anchored = [p[len(r'^\s*'):] for p in patterns if p.startswith(r'^\s*')]
+            free = [p for p in patterns if not p.startswith(r'^\s*')]
+            anchored_re = (_compile_pattern('|'.join('(%s)' % p for p in anchored), 0)
+                           if anchored else None)
+            free_re = (_compile_pattern('|'.join('(%s)' % p for p in free))
+                       if free else None)
+            self._lang_matchers[language] = (anchored_re, free_re, len(patterns))
+
+        # 单个语言可能达到的最高得分，用于提前终止判断
+        self._max_pattern_count = max(
+            len(patterns) for patterns in self.content_patterns.values())
+
+        # 按内容哈希缓存检测结果：进程内字典 + 可选的磁盘缓存
+        self._content_cache = {}
+        self._disk_cache = None
+
+    def _get_disk_cache(self):
+        """延迟打开磁盘检测缓存，失败时静默禁用
+
+        Returns:
+            shelve.Shelf: 磁盘缓存对象，不可用时返回 None
+        """
+        if self._disk_cache is None:
+            try:
+                import shelve
+                cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'hos-make')
+                os.makedirs(cache_dir, exist_ok=True)
+                self._disk_cache = shelve.open(os.path.join(cache_dir, 'lang-detect'))
+            except Exception:
+                self._disk_cache = False
+        return self._disk_cache if self._disk_cache else None
+
     def detect_from_file(self, file_path):
         """从文件中检测语言
         
@@ -56,13 +122,29 @@ class LanguageDetector:
             return self.extension_map[extension]
         
         # 如果扩展名无法确定，尝试从内容检测
+        # 只读取文件头部即可识别语言，避免把整个大文件读入内存
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return self.detect_from_content(content)
+            with open(file_path, 'rb') as f:
+                head = f.read(8192)
+            return self.detect_from_content(head.decode('utf-8', errors='ignore'))
         except Exception:
             return 'unknown'
     
+    def detect_from_file_fast(self, file_path):
+        """仅根据扩展名快速检测语言，不读取文件内容
+
+        用于目录扫描等只需要排除不支持文件的场景，避免对每个
+        未知文件执行 open/read 系统调用。
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            str: 检测到的语言，扩展名未知时返回 'unknown'
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        return self.extension_map.get(extension, 'unknown')
+
     def detect_from_content(self, code):
         """从代码内容中检测语言
         
@@ -72,15 +154,66 @@ class LanguageDetector:
         Returns:
             str: 检测到的语言
         """
-        # 统计每种语言的匹配次数
+        # 以头部内容哈希为键查缓存，重复运行时跳过正则扫描
+        key = hashlib.blake2b(code[:8192].encode('utf-8', 'ignore'),
+                              digest_size=16).hexdigest()
+        cached = self._content_cache.get(key)
+        if cached is not None:
+            return cached
+
+        disk_cache = self._get_disk_cache()
+        if disk_cache is not None:
+            try:
+                cached = disk_cache.get(key)
+            except Exception:
+                cached = None
+            if cached is not None:
+                self._content_cache[key] = cached
+                return cached
+
+        language = self._detect_from_content_uncached(code)
+
+        self._content_cache[key] = language
+        if disk_cache is not None:
+            try:
+                disk_cache[key] = language
+            except Exception:
+                pass
+        return language
+
+    def _detect_from_content_uncached(self, code):
+        """对代码内容执行实际的语言检测扫描
+
+        Args:
+            code: 代码内容
+
+        Returns:
+            str: 检测到的语言
+        """
+        # 行锚定模式只需检查前若干行的前缀，预先去除缩进
+        lines = [line.lstrip() for line in code.splitlines()[:200] if line.strip()]
+
         scores = {}
-        for language, patterns in self.content_patterns.items():
-            score = 0
-            for pattern in patterns:
-                if re.search(pattern, code, re.MULTILINE):
-                    score += 1
+        for language, (anchored_re, free_re, total) in self._lang_matchers.items():
+            matched = set()
+            if anchored_re is not None:
+                for line in lines:
+                    m = anchored_re.match(line)
+                    if m:
+                        matched.add(m.lastindex)
+                        if len(matched) == total:
+                            break
+            if free_re is not None and len(matched) < total:
+                for m in free_re.finditer(code):
+                    # 自由模式用负数键，与行锚定分组编号区分
+                    matched.add(-m.lastindex)
+            score = len(matched)
             scores[language] = score
-        
+
+            # 全部模式命中且后续语言不可能得到更高分时提前返回
+            if score == total and score >= self._max_pattern_count:
+                return language
+
         # 返回得分最高的语言
         if scores:
             return max(scores, key=scores.get)
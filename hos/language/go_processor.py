@@ -1,8 +1,152 @@
 """Go语言处理器"""
 
 from hos.language.base import LanguageProcessor
+from bisect import bisect_left
 import re
 
+# 安全评分的阈值/分值查找表（bisect_left 保持原 if/elif 链的严格大于语义）
+_LINE_THRESHOLDS = (100, 500, 1000)
+_LINE_SCORES = (5, 10, 15, 20)
+_FUNCTION_THRESHOLDS = (5, 20, 50)
+_FUNCTION_SCORES = (2, 5, 10, 15)
+_CLASS_THRESHOLDS = (3, 10, 20)
+_CLASS_SCORES = (1, 4, 7, 10)
+_IMPORT_THRESHOLDS = (3, 10, 20)
+_IMPORT_SCORES = (1, 2, 5, 8)
+
+# 可选的 pyahocorasick 多模式匹配：一次线性扫描定位所有候选关键字位置，
+# 融合正则只在候选位置尝试匹配；未安装时退回全文 finditer
+try:
+    import ahocorasick as _ahocorasick
+except ImportError:
+    _ahocorasick = None
+
+from hos.language import _hs
+
+# 可选的 numba JIT：字符串扫描内核编译为原生状态机，缺失时退回正则
+try:
+    import numpy as _np
+    from numba import njit as _njit
+except ImportError:
+    _np = None
+    _njit = None
+
+if _njit is not None:
+    @_njit(cache=True)
+    def _string_spans_kernel(buf):
+        """在字节缓冲区中定位字符串字面量的 (起点, 终点) 偏移对"""
+        spans = []
+        i = 0
+        n = buf.shape[0]
+        while i < n:
+            if buf[i] == 0x22:  # '"'
+                j = i + 1
+                while j < n and buf[j] != 0x22:
+                    j += 1
+                if j < n:
+                    spans.append((i + 1, j))
+                i = j + 1
+            else:
+                i += 1
+        return spans
+else:
+    _string_spans_kernel = None
+
+# 可选的 tree-sitter Go 语法树解析：一次结构化遍历替代正则扫描，
+# 天然跳过注释和字符串内部；语法或版本不可用时退回正则路径
+try:
+    import tree_sitter as _tree_sitter
+    import tree_sitter_go as _tree_sitter_go
+    _TS_GO_PARSER = _tree_sitter.Parser(
+        _tree_sitter.Language(_tree_sitter_go.language()))
+except Exception:
+    _TS_GO_PARSER = None
+
+# 预编译的提取正则表达式（模块加载时编译一次，避免每次调用重新编译）
+_FUNC_RE = re.compile(r'^\s*func\s+(?:\([^)]*\)\s+)?(\w+)\s*\(([^)]*)\)\s*([^{]*)\{', re.MULTILINE)
+_STRUCT_RE = re.compile(r'^\s*type\s+(\w+)\s+struct\s*[{]', re.MULTILINE)
+_IFACE_RE = re.compile(r'^\s*type\s+(\w+)\s+interface\s*[{]', re.MULTILINE)
+_IMPORT_RE = re.compile(r'^\s*import\s+(?:\(\s*([^\)]*)\)|([^\n]+))', re.MULTILINE)
+_PKG_RE = re.compile(r'["]([^"\n]+)["]', re.MULTILINE)
+_STRING_RE = re.compile(r'"([^"]*)"', re.MULTILINE)
+_CONST_RE = re.compile(r'^\s*const\s+(?:\(\s*([^\)]*)\)|\w+\s*=\s*([^\n;]+))', re.MULTILINE)
+_CONST_LINE_RE = re.compile(r'\s*\w+\s*=\s*([^\n]+)', re.MULTILINE)
+
+# 融合的单遍扫描正则：一次 finditer 同时提取函数、结构体、接口、导入、字符串和常量
+_SCAN_RE = re.compile(
+    r'(?P<func>^[ \t]*func\s+(?:\([^)]*\)\s+)?(?P<func_name>\w+)\s*\((?P<func_params>[^)]*)\)\s*(?P<func_ret>[^{]*)\{)'
+    r'|(?P<struct>^[ \t]*type\s+(?P<struct_name>\w+)\s+struct\s*\{)'
+    r'|(?P<iface>^[ \t]*type\s+(?P<iface_name>\w+)\s+interface\s*\{)'
+    r'|(?P<imp>^[ \t]*import\s+(?:\(\s*(?P<imp_block>[^\)]*)\)|"(?P<imp_pkg>[^"\n]+)"))'
+    r'|(?P<const>^[ \t]*const\s+(?:\(\s*(?P<const_block>[^\)]*)\)|\w+\s*=\s*(?P<const_val>[^\n;]+)))'
+    r'|(?P<str>"(?P<str_val>[^"]*)")',
+    re.MULTILINE)
+
+# 融合扫描正则各备选分支的先导标记，用于构建关键字自动机
+_SCAN_KEYWORDS = ('func', 'type', 'import', 'const', '"')
+
+if _ahocorasick is not None:
+    _KEYWORD_AUTOMATON = _ahocorasick.Automaton()
+    for _kw in _SCAN_KEYWORDS:
+        _KEYWORD_AUTOMATON.add_word(_kw, _kw)
+    _KEYWORD_AUTOMATON.make_automaton()
+else:
+    _KEYWORD_AUTOMATON = None
+
+# 可选的 hyperscan 预扫描数据库：原生 DFA 一次定位全部候选行首
+_HS_DB = _hs.build_database(
+    [r'^[ \t]*func', r'^[ \t]*type', r'^[ \t]*import', r'^[ \t]*const', r'"'])
+
+def _iter_candidate_starts(code):
+    """产出融合扫描正则的候选起始位置（升序，可能含重复）
+
+    优先使用 hyperscan 的原生 DFA 扫描，其次是 Aho–Corasick 自动机；
+    两者都不可用时返回 None，调用方退回全文 finditer。
+
+    Args:
+        code: 源代码字符串
+
+    Returns:
+        iterator: (起始位置, 是否需对齐到行首) 元组，不可用时为 None
+    """
+    if _HS_DB is not None and code.isascii():
+        # hyperscan 返回字节偏移，只在 ASCII 输入上与字符偏移一致
+        hits = _hs.scan_starts(_HS_DB, code.encode('ascii'))
+        return ((start, False) for start, _ in hits)
+    if _KEYWORD_AUTOMATON is not None:
+        return ((end_idx - len(kw) + 1, kw != '"')
+                for end_idx, kw in _KEYWORD_AUTOMATON.iter(code))
+    return None
+
+def _iter_scan_matches(code):
+    """产出融合扫描正则的匹配结果
+
+    可用时先做一遍线性多模式预扫描，只在候选位置尝试正则匹配；
+    否则退回对全文的 finditer。
+
+    Args:
+        code: 源代码字符串
+
+    Yields:
+        Match: 融合扫描正则的匹配对象
+    """
+    candidates = _iter_candidate_starts(code)
+    if candidates is None:
+        yield from _SCAN_RE.finditer(code)
+        return
+
+    seen_end = 0
+    for start, align_to_line in candidates:
+        if align_to_line:
+            # 行锚定分支必须从行首开始匹配
+            start = code.rfind('\n', 0, start) + 1
+        if start < seen_end:
+            continue
+        m = _SCAN_RE.match(code, start)
+        if m is not None:
+            seen_end = m.end()
+            yield m
+
 class GoProcessor(LanguageProcessor):
     """Go语言处理器
     
@@ -22,11 +166,13 @@ class GoProcessor(LanguageProcessor):
         Returns:
             dict: 分析结果
         """
-        # 提取基本信息
-        functions = self._extract_functions(code)
-        structs = self._extract_structs(code)
-        interfaces = self._extract_interfaces(code)
-        imports = self._extract_imports(code)
+        # 单遍扫描提取基本信息（优先走语法树，注释/字符串内的关键字不会误报）
+        if _TS_GO_PARSER is not None:
+            functions, structs, interfaces, imports, strings, constants = \
+                self._scan_code_ts(code)
+        else:
+            functions, structs, interfaces, imports, strings, constants = \
+                self._scan_code(code)
         
         # 生成分析结果
         analysis_result = {
@@ -53,13 +199,13 @@ class GoProcessor(LanguageProcessor):
             'hot_paths': [],
             'sensitivity': {
                 'sensitivity_score': 50,
-                'sensitive_strings': self._extract_strings(code),
-                'sensitive_constants': self._extract_constants(code),
+                'sensitive_strings': strings,
+                'sensitive_constants': constants,
                 'sensitive_functions': [],
                 'sensitive_variables': []
             },
             'code_size': len(code),
-            'line_count': len(code.split('\n'))
+            'line_count': code.count('\n') + (0 if code.endswith('\n') else 1)
         }
         
         # 计算安全价值评分
@@ -107,7 +253,146 @@ class GoProcessor(LanguageProcessor):
             str: 语言名称
         """
         return 'go'
-    
+
+    def _scan_code(self, code):
+        """单遍扫描代码，同时提取函数、结构体、接口、导入、字符串和常量
+
+        Args:
+            code: 源代码字符串
+
+        Returns:
+            tuple: (函数列表, 结构体列表, 接口列表, 导入列表, 字符串列表, 常量列表)
+        """
+        functions = []
+        structs = []
+        interfaces = []
+        imports = []
+        strings = []
+        constants = []
+
+        for m in _iter_scan_matches(code):
+            if m.group('func') is not None:
+                functions.append({
+                    'name': m.group('func_name'),
+                    'params': m.group('func_params'),
+                    'return_type': m.group('func_ret').strip(),
+                    'body': ''
+                })
+            elif m.group('struct') is not None:
+                structs.append({
+                    'name': m.group('struct_name'),
+                    'type': 'struct',
+                    'methods': []
+                })
+            elif m.group('iface') is not None:
+                interfaces.append({
+                    'name': m.group('iface_name'),
+                    'type': 'interface',
+                    'methods': []
+                })
+            elif m.group('imp') is not None:
+                block = m.group('imp_block')
+                if block is not None:
+                    # 导入块内的包路径同时也是字符串常量
+                    for pkg_match in _PKG_RE.finditer(block):
+                        imports.append(pkg_match.group(1))
+                        strings.append(pkg_match.group(1))
+                else:
+                    imports.append(m.group('imp_pkg'))
+                    strings.append(m.group('imp_pkg'))
+            elif m.group('const') is not None:
+                block = m.group('const_block')
+                if block is not None:
+                    # 处理常量块
+                    for const_line_match in _CONST_LINE_RE.finditer(block):
+                        constants.append(const_line_match.group(1))
+                else:
+                    constants.append(m.group('const_val'))
+            else:  # str
+                strings.append(m.group('str_val'))
+
+        # 去重但保持首次出现顺序：下游敏感度分析只关心不同的字面量
+        return (functions, structs, interfaces, imports,
+                list(dict.fromkeys(strings)), list(dict.fromkeys(constants)))
+
+    def _scan_code_ts(self, code):
+        """用 tree-sitter 语法树单遍收集结构信息
+
+        与 _scan_code 输出形状一致，但基于真实语法节点，注释和
+        字符串字面量内部的关键字不会被当作声明。
+
+        Args:
+            code: 源代码字符串
+
+        Returns:
+            tuple: (函数列表, 结构体列表, 接口列表, 导入列表, 字符串列表, 常量列表)
+        """
+        src = code.encode('utf-8')
+        tree = _TS_GO_PARSER.parse(src)
+
+        functions = []
+        structs = []
+        interfaces = []
+        imports = []
+        strings = []
+        constants = []
+
+        def _text(node):
+            return src[node.start_byte:node.end_byte].decode('utf-8')
+
+        stack = [tree.root_node]
+        while stack:
+            node = stack.pop()
+            node_type = node.type
+            if node_type == 'comment':
+                continue
+            if node_type in ('function_declaration', 'method_declaration'):
+                name = node.child_by_field_name('name')
+                params = node.child_by_field_name('parameters')
+                result = node.child_by_field_name('result')
+                functions.append({
+                    'name': _text(name) if name is not None else '',
+                    'params': _text(params)[1:-1] if params is not None else '',
+                    'return_type': _text(result) if result is not None else '',
+                    'body': ''
+                })
+            elif node_type == 'type_spec':
+                name = node.child_by_field_name('name')
+                type_node = node.child_by_field_name('type')
+                if name is not None and type_node is not None:
+                    if type_node.type == 'struct_type':
+                        structs.append({
+                            'name': _text(name),
+                            'type': 'struct',
+                            'methods': []
+                        })
+                    elif type_node.type == 'interface_type':
+                        interfaces.append({
+                            'name': _text(name),
+                            'type': 'interface',
+                            'methods': []
+                        })
+            elif node_type == 'import_spec':
+                path = node.child_by_field_name('path')
+                if path is not None:
+                    pkg = _text(path).strip('"')
+                    imports.append(pkg)
+                    strings.append(pkg)
+                continue
+            elif node_type == 'const_spec':
+                value = node.child_by_field_name('value')
+                if value is not None:
+                    constants.append(_text(value))
+                continue
+            elif node_type in ('interpreted_string_literal', 'raw_string_literal'):
+                strings.append(_text(node)[1:-1])
+                continue
+            stack.extend(reversed(node.children))
+
+        # 去重但保持首次出现顺序：下游敏感度分析只关心不同的字面量
+        return (functions, structs, interfaces, imports,
+                list(dict.fromkeys(strings)), list(dict.fromkeys(constants)))
+
     def _extract_functions(self, code):
         """提取函数定义
         
@@ -118,14 +403,11 @@ class GoProcessor(LanguageProcessor):
             list: 函数列表
         """
         functions = []
-        # 简单的函数提取正则表达式
-        function_pattern = re.compile(r'\s*func\s+(?:\(.*?\)\s+)?(\w+)\s*\(([^)]*)\)\s*(?:\s+([^\{]+))?\s*[{]', re.MULTILINE)
-        
-        for match in function_pattern.finditer(code):
+        for match in _FUNC_RE.finditer(code):
             name = match.group(1)
             params = match.group(2)
-            return_type = match.group(3) if match.group(3) else ''
-            
+            return_type = match.group(3)
+
             functions.append({
                 'name': name,
                 'params': params,
@@ -145,10 +427,7 @@ class GoProcessor(LanguageProcessor):
             list: 结构体列表
         """
         structs = []
-        # 简单的结构体提取正则表达式
-        struct_pattern = re.compile(r'\s*type\s+(\w+)\s+struct\s*[{]', re.MULTILINE)
-        
-        for match in struct_pattern.finditer(code):
+        for match in _STRUCT_RE.finditer(code):
             name = match.group(1)
             structs.append({
                 'name': name,
@@ -168,10 +447,7 @@ class GoProcessor(LanguageProcessor):
             list: 接口列表
         """
         interfaces = []
-        # 简单的接口提取正则表达式
-        interface_pattern = re.compile(r'\s*type\s+(\w+)\s+interface\s*[{]', re.MULTILINE)
-        
-        for match in interface_pattern.finditer(code):
+        for match in _IFACE_RE.finditer(code):
             name = match.group(1)
             interfaces.append({
                 'name': name,
@@ -183,24 +459,56 @@ class GoProcessor(LanguageProcessor):
     
     def _extract_imports(self, code):
         """提取导入语句
-        
+
+        两阶段解析：先用 str.find 定位 import 关键字，再只对其后的
+        导入块/导入行小切片解析包路径，正则不触及全文。
+
         Args:
             code: 源代码字符串
-            
+
         Returns:
             list: 导入语句列表
         """
         imports = []
-        # 简单的导入提取正则表达式
-        import_pattern = re.compile(r'\s*import\s+[\(]?\s*([^\)]+)\s*[\)]?', re.MULTILINE | re.DOTALL)
-        
-        for match in import_pattern.finditer(code):
-            import_content = match.group(1)
-            # 提取每个导入的包
-            pkg_pattern = re.compile(r'["]([^"\n]+)["]', re.MULTILINE)
-            for pkg_match in pkg_pattern.finditer(import_content):
-                imports.append(pkg_match.group(1))
-        
+        length = len(code)
+        pos = 0
+        while True:
+            pos = code.find('import', pos)
+            if pos == -1:
+                break
+
+            # 必须是独立的语句关键字：前后都是空白
+            before = code[pos - 1] if pos else '\n'
+            cursor = pos + 6
+            after = code[cursor] if cursor < length else '\n'
+            if not before.isspace() or not after.isspace():
+                pos = cursor
+                continue
+
+            # 跳过关键字后的行内空白
+            while cursor < length and code[cursor] in ' \t':
+                cursor += 1
+
+            if cursor < length and code[cursor] == '(':
+                # 导入块：切到配对的右括号
+                end = code.find(')', cursor)
+                if end == -1:
+                    end = length
+                content = code[cursor + 1:end]
+                pos = end + 1
+            else:
+                # 单行导入：切到行尾
+                end = code.find('\n', cursor)
+                if end == -1:
+                    end = length
+                content = code[cursor:end]
+                pos = end
+
+            if '"' in content:
+                # 提取每个导入的包
+                for pkg_match in _PKG_RE.finditer(content):
+                    imports.append(pkg_match.group(1))
+
         return imports
     
     def _extract_strings(self, code):
@@ -212,14 +520,16 @@ class GoProcessor(LanguageProcessor):
         Returns:
             list: 字符串列表
         """
-        strings = []
-        # 简单的字符串提取正则表达式
-        string_pattern = re.compile(r'"([^"]*)"', re.MULTILINE)
-        
-        for match in string_pattern.finditer(code):
-            strings.append(match.group(1))
-        
-        return strings
+        if _string_spans_kernel is not None and code.isascii():
+            # 原生状态机一次走完缓冲区，按偏移切片还原字符串
+            buf = _np.frombuffer(code.encode('ascii'), dtype=_np.uint8)
+            strings = [code[start:end]
+                       for start, end in _string_spans_kernel(buf)]
+        else:
+            strings = [match.group(1) for match in _STRING_RE.finditer(code)]
+
+        # 去重但保持首次出现顺序
+        return list(dict.fromkeys(strings))
     
     def _extract_constants(self, code):
         """提取常量
@@ -231,21 +541,18 @@ class GoProcessor(LanguageProcessor):
             list: 常量列表
         """
         constants = []
-        # 简单的常量提取正则表达式
-        const_pattern = re.compile(r'\s*const\s+(?:\(\s*([^\)]+)\s*\)|(\w+)\s*=\s*([^;]+))', re.MULTILINE | re.DOTALL)
-        
-        for match in const_pattern.finditer(code):
+        for match in _CONST_RE.finditer(code):
             if match.group(1):
                 # 处理常量块
                 const_block = match.group(1)
-                const_line_pattern = re.compile(r'\s*\w+\s*=\s*([^\n]+)', re.MULTILINE)
-                for const_line_match in const_line_pattern.finditer(const_block):
+                for const_line_match in _CONST_LINE_RE.finditer(const_block):
                     constants.append(const_line_match.group(1))
-            elif match.group(3):
+            elif match.group(2):
                 # 处理单行常量
-                constants.append(match.group(3))
-        
-        return constants
+                constants.append(match.group(2))
+
+        # 去重但保持首次出现顺序
+        return list(dict.fromkeys(constants))
     
     def _compute_security_score(self, analysis_result):
         """计算安全价值评分
@@ -257,58 +564,30 @@ class GoProcessor(LanguageProcessor):
             float: 安全价值评分
         """
         score = 0.0
-        
+
         # 基于代码复杂度
         line_count = analysis_result['line_count']
-        if line_count > 1000:
-            score += 20
-        elif line_count > 500:
-            score += 15
-        elif line_count > 100:
-            score += 10
-        else:
-            score += 5
-        
+        score += _LINE_SCORES[bisect_left(_LINE_THRESHOLDS, line_count)]
+
         # 基于函数数量
         function_count = len(analysis_result['ast']['functions'])
-        if function_count > 50:
-            score += 15
-        elif function_count > 20:
-            score += 10
-        elif function_count > 5:
-            score += 5
-        else:
-            score += 2
-        
+        score += _FUNCTION_SCORES[bisect_left(_FUNCTION_THRESHOLDS, function_count)]
+
         # 基于类数量
         class_count = len(analysis_result['ast']['classes'])
-        if class_count > 20:
-            score += 10
-        elif class_count > 10:
-            score += 7
-        elif class_count > 3:
-            score += 4
-        else:
-            score += 1
-        
+        score += _CLASS_SCORES[bisect_left(_CLASS_THRESHOLDS, class_count)]
+
         # 基于敏感度评分
         sensitivity_score = analysis_result['sensitivity']['sensitivity_score']
         score += sensitivity_score * 0.3
-        
+
         # 基于导入模块数量
         import_count = len(analysis_result['ast']['imports'])
-        if import_count > 20:
-            score += 8
-        elif import_count > 10:
-            score += 5
-        elif import_count > 3:
-            score += 2
-        else:
-            score += 1
-        
+        score += _IMPORT_SCORES[bisect_left(_IMPORT_THRESHOLDS, import_count)]
+
         # 归一化到0-100
         score = min(100, score)
-        
+
         return score
     
     def _obfuscate_control_flow(self, code):
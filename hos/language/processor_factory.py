@@ -1,5 +1,11 @@
 """语言处理器工厂"""
 
+import functools
+import hashlib
+import os
+from collections import OrderedDict
+
+from hos.language import default_detector
 from hos.language.detector import LanguageDetector
 from hos.language.python_processor import PythonProcessor
 from hos.language.cpp_processor import CPPProcessor
@@ -8,6 +14,15 @@ from hos.language.go_processor import GoProcessor
 from hos.language.arm_processor import ARMProcessor
 from hos.language.wasm_processor import WASMProcessor
 
+# 可选的 numpy：批量分析时把逐文件的评分阶梯合并成向量化查表
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+# 分析结果缓存的最大条目数
+_ANALYSIS_CACHE_SIZE = 512
+
 class ProcessorFactory:
     """语言处理器工厂
     
@@ -16,7 +31,7 @@ class ProcessorFactory:
     
     def __init__(self):
         """初始化处理器工厂"""
-        self.detector = LanguageDetector()
+        self.detector = default_detector
         self.processors = {
             'python': PythonProcessor,
             'c': CPPProcessor,
@@ -26,7 +41,43 @@ class ProcessorFactory:
             'arm': ARMProcessor,
             'wasm': WASMProcessor
         }
-    
+
+        # 处理器全部无状态，按语言惰性构造并复用单例，避免每次分发都实例化
+        self._instances = {}
+
+        # 按内容哈希缓存分析结果：analyze 是纯函数，批量运行中重复
+        # 输入很常见；OrderedDict 实现 LRU 淘汰以限制内存占用
+        self._analysis_cache = OrderedDict()
+
+    def analyze_content(self, code, language=None):
+        """分析代码内容，按内容哈希缓存结果
+
+        Args:
+            code: 代码内容
+            language: 语言名称，为 None 时自动检测
+
+        Returns:
+            dict: 分析结果
+        """
+        digest = hashlib.blake2b(code.encode('utf-8', 'ignore'),
+                                 digest_size=16).digest()
+        key = (digest, language)
+        cached = self._analysis_cache.get(key)
+        if cached is not None:
+            self._analysis_cache.move_to_end(key)
+            return cached
+
+        if language is None:
+            processor = self.get_processor_from_content(code)
+        else:
+            processor = self.get_processor(language)
+        result = processor.analyze(code)
+
+        self._analysis_cache[key] = result
+        if len(self._analysis_cache) > _ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
+        return result
+
     def get_processor(self, language):
         """根据语言获取处理器
         
@@ -36,10 +87,20 @@ class ProcessorFactory:
         Returns:
             LanguageProcessor: 语言处理器实例
         """
-        if language in self.processors:
-            return self.processors[language]()
-        else:
-            raise ValueError(f"不支持的语言: {language}")
+        # 热路径只做一次 C 级字典查找，未命中时才走构造分支
+        try:
+            return self._instances[language]
+        except KeyError:
+            pass
+
+        try:
+            processor_class = self.processors[language]
+        except KeyError:
+            raise ValueError(f"不支持的语言: {language}") from None
+
+        instance = processor_class()
+        self._instances[language] = instance
+        return instance
     
     def get_processor_from_file(self, file_path):
         """从文件获取处理器
@@ -73,11 +134,135 @@ class ProcessorFactory:
             processor_class: 处理器类
         """
         self.processors[language] = processor_class
+        # 丢弃旧类的缓存实例，下次分发时用新类重建
+        self._instances.pop(language, None)
     
+    def analyze_file(self, path):
+        """分析单个源文件
+
+        用 mmap 把文件映射进地址空间，由操作系统按需分页，省去
+        先读入一份中间字节缓冲；随后只做一次 UTF-8 解码。
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            dict: 分析结果
+        """
+        import mmap
+
+        processor = self.get_processor_from_file(path)
+        with open(path, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    code = mm[:].decode('utf-8')
+            except ValueError:
+                # 空文件无法映射
+                code = f.read().decode('utf-8')
+        return processor.analyze(code)
+
+    def analyze_many(self, paths, max_workers=None):
+        """并行分析多个独立的源文件
+
+        文件之间没有共享状态，用进程池按块分发；单文件或单进程时
+        退化为串行，避免进程池的启动开销。
+
+        Args:
+            paths: 文件路径列表
+            max_workers: 工作进程数，默认为 CPU 核心数
+
+        Returns:
+            list: 与 paths 顺序对应的分析结果列表
+        """
+        paths = list(paths)
+        if not paths:
+            return []
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        if max_workers <= 1 or len(paths) == 1:
+            return [_analyze_file_worker(path) for path in paths]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunksize = max(1, len(paths) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_analyze_file_worker, paths,
+                                        chunksize=chunksize))
+
+        # Go 的评分阶梯可以整批向量化重算，替代逐文件的标量查表
+        if _np is not None:
+            go_results = [r for path, r in zip(paths, results)
+                          if path.endswith('.go')]
+            if len(go_results) > 1:
+                _rescore_go_batch(go_results)
+        return results
+
     def get_supported_languages(self):
         """获取支持的语言列表
-        
+
         Returns:
             list: 支持的语言列表
         """
         return list(self.processors.keys())
+
+def _rescore_go_batch(results):
+    """向量化批量重算 Go 分析结果的安全评分
+
+    与 GoProcessor._compute_security_score 的 bisect 查表逐项等价
+    （np.searchsorted 同为 left 语义），但 N 个文件的四条阶梯合并成
+    少量向量操作，原地写回每个结果字典。
+
+    Args:
+        results: GoProcessor.analyze 产出的分析结果列表
+    """
+    from hos.language import go_processor as _go
+
+    line_counts = _np.fromiter(
+        (r['line_count'] for r in results), dtype=_np.int64)
+    func_counts = _np.fromiter(
+        (len(r['ast']['functions']) for r in results), dtype=_np.int64)
+    class_counts = _np.fromiter(
+        (len(r['ast']['classes']) for r in results), dtype=_np.int64)
+    import_counts = _np.fromiter(
+        (len(r['ast']['imports']) for r in results), dtype=_np.int64)
+    sensitivity = _np.fromiter(
+        (r['sensitivity']['sensitivity_score'] for r in results),
+        dtype=_np.float64)
+
+    scores = (
+        _np.take(_go._LINE_SCORES,
+                 _np.searchsorted(_go._LINE_THRESHOLDS, line_counts))
+        + _np.take(_go._FUNCTION_SCORES,
+                   _np.searchsorted(_go._FUNCTION_THRESHOLDS, func_counts))
+        + _np.take(_go._CLASS_SCORES,
+                   _np.searchsorted(_go._CLASS_THRESHOLDS, class_counts))
+        + _np.take(_go._IMPORT_SCORES,
+                   _np.searchsorted(_go._IMPORT_THRESHOLDS, import_counts))
+        + sensitivity * 0.3
+    )
+    scores = _np.minimum(scores, 100)
+
+    for result, score in zip(results, scores):
+        result['security_score'] = float(score)
+
+def _analyze_file_worker(path):
+    """分析单个文件（模块级函数，可被进程池序列化分发）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        dict: 分析结果
+    """
+    return get_default_factory().analyze_file(path)
+
+@functools.lru_cache(maxsize=1)
+def get_default_factory():
+    """获取进程内共享的处理器工厂单例
+
+    Returns:
+        ProcessorFactory: 共享工厂实例
+    """
+    return ProcessorFactory()
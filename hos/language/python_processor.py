@@ -1,5 +1,7 @@
 """Python语言处理器"""
 
+import hashlib
+
 from hos.language.base import LanguageProcessor
 from hos.analyzer import analyze
 from hos.transformer import transform
@@ -13,17 +15,27 @@ class PythonProcessor(LanguageProcessor):
     def __init__(self):
         """初始化Python语言处理器"""
         super().__init__()
-    
+        # 缓存最近一次的分析结果：analyze→transform 流水线常对同一
+        # 代码连续调用，避免重复解析
+        self._last_analysis = None
+
     def analyze(self, code):
         """分析Python代码
-        
+
         Args:
             code: Python源代码字符串
-            
+
         Returns:
             dict: 分析结果
         """
-        return analyze(code)
+        digest = hashlib.blake2b(code.encode('utf-8', 'ignore'),
+                                 digest_size=16).digest()
+        if self._last_analysis is not None and self._last_analysis[0] == digest:
+            return self._last_analysis[1]
+
+        result = analyze(code)
+        self._last_analysis = (digest, result)
+        return result
     
     def transform(self, code, strategy):
         """转换Python代码
@@ -2,8 +2,60 @@
 
 import re
 
+from hos.language import _hs
 from hos.language.base import LanguageProcessor
 
+# 预编译的提取正则表达式（模块加载时编译一次，避免每次调用重新编译）
+_FUNC_RE = re.compile(r'\(func\s+(\$\w+)?\s*(\(param\s+[^\)]*\))?\s*(\(result\s+[^\)]*\))?', re.MULTILINE)
+_IMPORT_RE = re.compile(r'\(import\s+"([^"]+)"\s+"([^"]+)"\s+([^\)]+)\)', re.MULTILINE)
+_EXPORT_RE = re.compile(r'\(export\s+"([^"]+)"\s+([^\)]+)\)', re.MULTILINE)
+_GLOBAL_RE = re.compile(r'\(global\s+(\$\w+)?\s*(\(mut\))?\s+([^\)]+)\s+([^\)]+)\)', re.MULTILINE)
+_MEMORY_RE = re.compile(r'\(memory\s+(\$\w+)?\s*(\d+)\s*(\d+)?\)', re.MULTILINE)
+_TABLE_RE = re.compile(r'\(table\s+(\$\w+)?\s*(\d+)\s*(\d+)?\s*(\([^\)]+\))?\)', re.MULTILINE)
+_START_RE = re.compile(r'\(start\s+(\$\w+)\)', re.MULTILINE)
+
+# 融合的单遍扫描正则：一次 finditer 同时提取全部七类 s 表达式区段
+_SCAN_RE = re.compile(
+    r'(?P<func>\(func\s+(?P<func_name>\$\w+)?\s*(?P<func_params>\(param\s+[^\)]*\))?\s*(?P<func_result>\(result\s+[^\)]*\))?)'
+    r'|(?P<imp>\(import\s+"(?P<imp_module>[^"]+)"\s+"(?P<imp_name>[^"]+)"\s+(?P<imp_kind>[^\)]+)\))'
+    r'|(?P<exp>\(export\s+"(?P<exp_name>[^"]+)"\s+(?P<exp_kind>[^\)]+)\))'
+    r'|(?P<glob>\(global\s+(?P<glob_name>\$\w+)?\s*(?P<glob_mut>\(mut\))?\s+(?P<glob_type>[^\)]+)\s+(?P<glob_init>[^\)]+)\))'
+    r'|(?P<mem>\(memory\s+(?P<mem_name>\$\w+)?\s*(?P<mem_init>\d+)\s*(?P<mem_max>\d+)?\))'
+    r'|(?P<table>\(table\s+(?P<table_name>\$\w+)?\s*(?P<table_init>\d+)\s*(?P<table_max>\d+)?\s*(?P<table_elem>\([^\)]+\))?\))'
+    r'|(?P<start>\(start\s+(?P<start_name>\$\w+)\))',
+    re.MULTILINE)
+
+# 可选的 hyperscan 预扫描数据库：原生 DFA 一次定位全部候选区段起点
+_HS_DB = _hs.build_database(
+    [r'\(func', r'\(import', r'\(export', r'\(global',
+     r'\(memory', r'\(table', r'\(start'])
+
+def _iter_scan_matches(code):
+    """产出融合扫描正则的匹配结果
+
+    可用时先用 hyperscan 做一遍原生多模式预扫描，只在候选位置尝试
+    正则匹配；否则退回对全文的 finditer。
+
+    Args:
+        code: 源代码字符串
+
+    Yields:
+        Match: 融合扫描正则的匹配对象
+    """
+    if _HS_DB is None or not code.isascii():
+        # hyperscan 返回字节偏移，只在 ASCII 输入上与字符偏移一致
+        yield from _SCAN_RE.finditer(code)
+        return
+
+    seen_end = 0
+    for start, _ in _hs.scan_starts(_HS_DB, code.encode('ascii')):
+        if start < seen_end:
+            continue
+        m = _SCAN_RE.match(code, start)
+        if m is not None:
+            seen_end = m.end()
+            yield m
+
 
 class WASMProcessor(LanguageProcessor):
     """WASM处理器
@@ -30,85 +82,48 @@ class WASMProcessor(LanguageProcessor):
             'start': None
         }
         
-        # 提取函数
-        func_pattern = re.compile(r'\(func\s+(\$\w+)?\s*(\(param\s+[^\)]*\))?\s*(\(result\s+[^\)]*\))?', re.MULTILINE)
-        for match in func_pattern.finditer(code):
-            func_name = match.group(1) or 'anonymous'
-            params = match.group(2) or ''
-            result = match.group(3) or ''
-            analysis['functions'].append({
-                'name': func_name,
-                'params': params,
-                'result': result
-            })
-        
-        # 提取导入
-        import_pattern = re.compile(r'\(import\s+"([^"]+)"\s+"([^"]+)"\s+([^\)]+)\)', re.MULTILINE)
-        for match in import_pattern.finditer(code):
-            module = match.group(1)
-            name = match.group(2)
-            kind = match.group(3)
-            analysis['imports'].append({
-                'module': module,
-                'name': name,
-                'kind': kind
-            })
-        
-        # 提取导出
-        export_pattern = re.compile(r'\(export\s+"([^"]+)"\s+([^\)]+)\)', re.MULTILINE)
-        for match in export_pattern.finditer(code):
-            name = match.group(1)
-            kind = match.group(2)
-            analysis['exports'].append({
-                'name': name,
-                'kind': kind
-            })
-        
-        # 提取全局变量
-        global_pattern = re.compile(r'\(global\s+(\$\w+)?\s*(\(mut\))?\s+([^\)]+)\s+([^\)]+)\)', re.MULTILINE)
-        for match in global_pattern.finditer(code):
-            global_name = match.group(1) or 'anonymous'
-            mutable = bool(match.group(2))
-            type_ = match.group(3)
-            init = match.group(4)
-            analysis['globals'].append({
-                'name': global_name,
-                'mutable': mutable,
-                'type': type_,
-                'init': init
-            })
-        
-        # 提取内存
-        memory_pattern = re.compile(r'\(memory\s+(\$\w+)?\s*(\d+)\s*(\d+)?\)', re.MULTILINE)
-        for match in memory_pattern.finditer(code):
-            memory_name = match.group(1) or 'anonymous'
-            initial = match.group(2)
-            maximum = match.group(3)
-            analysis['memories'].append({
-                'name': memory_name,
-                'initial': initial,
-                'maximum': maximum
-            })
-        
-        # 提取表
-        table_pattern = re.compile(r'\(table\s+(\$\w+)?\s*(\d+)\s*(\d+)?\s*(\([^\)]+\))?\)', re.MULTILINE)
-        for match in table_pattern.finditer(code):
-            table_name = match.group(1) or 'anonymous'
-            initial = match.group(2)
-            maximum = match.group(3)
-            elem_type = match.group(4) or ''
-            analysis['tables'].append({
-                'name': table_name,
-                'initial': initial,
-                'maximum': maximum,
-                'elem_type': elem_type
-            })
-        
-        # 提取start函数
-        start_pattern = re.compile(r'\(start\s+(\$\w+)\)', re.MULTILINE)
-        start_match = start_pattern.search(code)
-        if start_match:
-            analysis['start'] = start_match.group(1)
+        # 单遍扫描提取全部区段（先用廉价的子串检查过滤空输入）
+        if '(' in code:
+            for m in _iter_scan_matches(code):
+                if m.group('func') is not None:
+                    analysis['functions'].append({
+                        'name': m.group('func_name') or 'anonymous',
+                        'params': m.group('func_params') or '',
+                        'result': m.group('func_result') or ''
+                    })
+                elif m.group('imp') is not None:
+                    analysis['imports'].append({
+                        'module': m.group('imp_module'),
+                        'name': m.group('imp_name'),
+                        'kind': m.group('imp_kind')
+                    })
+                elif m.group('exp') is not None:
+                    analysis['exports'].append({
+                        'name': m.group('exp_name'),
+                        'kind': m.group('exp_kind')
+                    })
+                elif m.group('glob') is not None:
+                    analysis['globals'].append({
+                        'name': m.group('glob_name') or 'anonymous',
+                        'mutable': bool(m.group('glob_mut')),
+                        'type': m.group('glob_type'),
+                        'init': m.group('glob_init')
+                    })
+                elif m.group('mem') is not None:
+                    analysis['memories'].append({
+                        'name': m.group('mem_name') or 'anonymous',
+                        'initial': m.group('mem_init'),
+                        'maximum': m.group('mem_max')
+                    })
+                elif m.group('table') is not None:
+                    analysis['tables'].append({
+                        'name': m.group('table_name') or 'anonymous',
+                        'initial': m.group('table_init'),
+                        'maximum': m.group('table_max'),
+                        'elem_type': m.group('table_elem') or ''
+                    })
+                elif analysis['start'] is None:  # start
+                    analysis['start'] = m.group('start_name')
         
         return analysis
     
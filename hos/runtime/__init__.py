@@ -1,50 +1,79 @@
-"""运行时保护层模块"""
-
-from hos.transformer.runtime import RuntimeProtector
-from hos.ai.strategy import ConfusionStrategy
-
-def protect(code, security_level='medium'):
-    """保护代码
-    
-    Args:
-        code: 源代码字符串
-        security_level: 安全级别（'low', 'medium', 'high'）
-        
-    Returns:
-        str: 保护后的代码
-    """
-    # 创建混淆策略
-    strategy = ConfusionStrategy()
-    
-    # 设置安全级别
-    if security_level == 'low':
-        strategy.set_strength(0.3)
-        strategy.runtime['debugger_detection'] = False
-        strategy.runtime['memory_integrity'] = False
-        strategy.runtime['timing_detection'] = False
-        strategy.runtime['environment_binding'] = False
-        strategy.runtime['anti_tampering'] = False
-    elif security_level == 'medium':
-        strategy.set_strength(0.5)
-        strategy.runtime['debugger_detection'] = True
-        strategy.runtime['memory_integrity'] = True
-        strategy.runtime['timing_detection'] = True
-        strategy.runtime['environment_binding'] = False
-        strategy.runtime['anti_tampering'] = True
-    else:  # high
-        strategy.set_strength(0.8)
-        strategy.runtime['debugger_detection'] = True
-        strategy.runtime['memory_integrity'] = True
-        strategy.runtime['timing_detection'] = True
-        strategy.runtime['environment_binding'] = True
-        strategy.runtime['anti_tampering'] = True
-    
-    # 创建运行时保护层
-    protector = RuntimeProtector()
-    
-    # 应用保护
-    protected_code = protector.transform(code, strategy)
-    
-    return protected_code
-
-__all__ = ["protect"]
\ No newline at end of file
+"""运行时保护层模块"""
+
+import functools
+
+# 按安全级别惰性构建并共享的混淆策略：每次 protect 调用不再重建
+# 策略对象和六个运行时开关
+_STRATEGIES = {}
+
+def _get_strategy(security_level):
+    """返回按安全级别预构建的共享混淆策略
+
+    Args:
+        security_level: 安全级别（'low', 'medium', 'high'）
+
+    Returns:
+        ConfusionStrategy: 对应级别的策略实例
+    """
+    strategy = _STRATEGIES.get(security_level)
+    if strategy is not None:
+        return strategy
+
+    from hos.ai.strategy import ConfusionStrategy
+
+    strategy = ConfusionStrategy()
+    if security_level == 'low':
+        strategy.set_strength(0.3)
+        strategy.runtime['debugger_detection'] = False
+        strategy.runtime['memory_integrity'] = False
+        strategy.runtime['timing_detection'] = False
+        strategy.runtime['environment_binding'] = False
+        strategy.runtime['anti_tampering'] = False
+    elif security_level == 'medium':
+        strategy.set_strength(0.5)
+        strategy.runtime['debugger_detection'] = True
+        strategy.runtime['memory_integrity'] = True
+        strategy.runtime['timing_detection'] = True
+        strategy.runtime['environment_binding'] = False
+        strategy.runtime['anti_tampering'] = True
+    else:  # high
+        strategy.set_strength(0.8)
+        strategy.runtime['debugger_detection'] = True
+        strategy.runtime['memory_integrity'] = True
+        strategy.runtime['timing_detection'] = True
+        strategy.runtime['environment_binding'] = True
+        strategy.runtime['anti_tampering'] = True
+
+    _STRATEGIES[security_level] = strategy
+    return strategy
+
+@functools.lru_cache(maxsize=256)
+def _protect_cached(code, security_level):
+    """应用运行时保护，对相同的 (代码, 级别) 输入复用结果
+
+    Args:
+        code: 源代码字符串
+        security_level: 安全级别
+
+    Returns:
+        str: 保护后的代码
+    """
+    # 延迟导入转换器，import hos.runtime 本身保持轻量
+    from hos.transformer.runtime import RuntimeProtector
+
+    protector = RuntimeProtector()
+    return protector.transform(code, _get_strategy(security_level))
+
+def protect(code, security_level='medium'):
+    """保护代码
+
+    Args:
+        code: 源代码字符串
+        security_level: 安全级别（'low', 'medium', 'high'）
+
+    Returns:
+        str: 保护后的代码
+    """
+    return _protect_cached(code, security_level)
+
+__all__ = ["protect"]
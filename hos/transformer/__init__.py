@@ -1,19 +1,39 @@
-"""代码变换引擎模块"""
-
-from hos.transformer.main import transform
-from hos.transformer.control_flow import ControlFlowTransformer
-from hos.transformer.data import DataTransformer
-from hos.transformer.instruction import InstructionTransformer
-from hos.transformer.structure import StructureTransformer
-from hos.transformer.virtualization import VirtualizationTransformer
-from hos.transformer.runtime import RuntimeProtector
-
-__all__ = [
-    "transform",
-    "ControlFlowTransformer",
-    "DataTransformer",
-    "InstructionTransformer",
-    "StructureTransformer",
-    "VirtualizationTransformer",
-    "RuntimeProtector"
-]
+"""代码变换引擎模块"""
+
+__all__ = [
+    "transform",
+    "ControlFlowTransformer",
+    "DataTransformer",
+    "InstructionTransformer",
+    "StructureTransformer",
+    "VirtualizationTransformer",
+    "RuntimeProtector"
+]
+
+# 各名称所在的子模块，供 PEP 562 惰性导入使用
+_SUBMODULES = {
+    "transform": "hos.transformer.main",
+    "ControlFlowTransformer": "hos.transformer.control_flow",
+    "DataTransformer": "hos.transformer.data",
+    "InstructionTransformer": "hos.transformer.instruction",
+    "StructureTransformer": "hos.transformer.structure",
+    "VirtualizationTransformer": "hos.transformer.virtualization",
+    "RuntimeProtector": "hos.transformer.runtime"
+}
+
+def __getattr__(name):
+    """按需导入子模块（PEP 562），只分析不转换的用户不付转换器导入开销
+
+    Args:
+        name: 请求的属性名
+
+    Returns:
+        object: 对应的函数或类
+    """
+    module_name = _SUBMODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,86 @@
+"""基于 AST 的函数定位辅助
+
+运行时保护和结构变换原先都用 `def ... (.*?)(?=def|$)` 的正则切分
+函数：`.*?` 逐字符扩展、前瞻逐位探测 def，在大文件上退化成平方级
+回溯。这里用一次 ast.parse 拿到所有函数的行号区间，改写按行切片
+完成，整体线性；输入不是合法 Python 时由调用方退回正则路径。
+"""
+
+import ast
+
+def function_nodes(code, top_level=False):
+    """解析出代码中的函数定义节点
+
+    Args:
+        code: 源代码字符串
+        top_level: 为真时只返回模块顶层的函数（行区间互不嵌套，
+            可以安全地按行切片替换）
+
+    Returns:
+        list: FunctionDef/AsyncFunctionDef 节点列表（按出现顺序）
+
+    Raises:
+        SyntaxError: 输入不是合法的 Python 代码
+    """
+    tree = ast.parse(code)
+    nodes = tree.body if top_level else ast.walk(tree)
+    return [node for node in nodes
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+
+def function_spans(code, nodes=None):
+    """提取每个函数的名字、参数串和行号区间
+
+    Args:
+        code: 源代码字符串
+        nodes: 可选的预解析节点列表，省一次 ast.parse
+
+    Returns:
+        list: (名字, 参数串, 起始行号, 结束行号) 元组列表，行号从 1 起
+
+    Raises:
+        SyntaxError: 输入不是合法的 Python 代码
+    """
+    if nodes is None:
+        nodes = function_nodes(code)
+    spans = []
+    for node in nodes:
+        params = ast.unparse(node.args) if node.args.args or \
+            node.args.vararg or node.args.kwonlyargs or \
+            node.args.kwarg or node.args.posonlyargs else ''
+        spans.append((node.name, params, node.lineno, node.end_lineno))
+    return spans
+
+def insert_body_calls(code, make_calls):
+    """在每个函数体首行前插入生成的调用语句
+
+    按节点信息直接在行列表上做插入，不复制整个源码扫描；插入
+    从后往前执行，前面的行号不会失效。
+
+    Args:
+        code: 源代码字符串
+        make_calls: 回调，接受函数定义节点，返回要插入的语句列表
+            （不带缩进），返回空列表则跳过该函数
+
+    Returns:
+        str: 插入后的代码
+
+    Raises:
+        SyntaxError: 输入不是合法的 Python 代码
+    """
+    insertions = []
+    for node in function_nodes(code):
+        calls = make_calls(node)
+        if not calls:
+            continue
+        first = node.body[0]
+        indent = ' ' * first.col_offset
+        insertions.append(
+            (first.lineno, ''.join(f"{indent}{call}\n" for call in calls)))
+
+    if not insertions:
+        return code
+
+    lines = code.splitlines(keepends=True)
+    for lineno, text in sorted(insertions, reverse=True):
+        lines.insert(lineno - 1, text)
+    return ''.join(lines)
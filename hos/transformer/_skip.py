@@ -0,0 +1,67 @@
+"""生成代码的跳过区域标记
+
+变换器发射的解密函数、密文十六进制串等生成代码用哨兵注释包裹；
+后续的正则类变换按区域切分，只扫描未标记的片段，避免在与源码
+无关的大块十六进制数据上反复匹配（也防止把生成代码改坏）。
+"""
+
+SKIP_BEGIN = '# __HOS_SKIP_BEGIN__'
+SKIP_END = '# __HOS_SKIP_END__'
+
+def wrap(text):
+    """用哨兵注释包裹一段生成代码
+
+    Args:
+        text: 生成的代码
+
+    Returns:
+        str: 包裹后的代码
+    """
+    return f"{SKIP_BEGIN}\n{text}{SKIP_END}\n"
+
+def split(code):
+    """把代码切分成 (是否跳过, 片段) 序列
+
+    Args:
+        code: 源代码字符串
+
+    Returns:
+        list: (is_skip, text) 元组列表，顺序拼接可还原原文
+    """
+    if SKIP_BEGIN not in code:
+        return [(False, code)]
+
+    segments = []
+    pos = 0
+    while True:
+        begin = code.find(SKIP_BEGIN, pos)
+        if begin == -1:
+            segments.append((False, code[pos:]))
+            break
+        if begin > pos:
+            segments.append((False, code[pos:begin]))
+        end = code.find(SKIP_END, begin)
+        if end == -1:
+            # 缺少结束标记时剩余部分整体跳过
+            segments.append((True, code[begin:]))
+            break
+        end += len(SKIP_END)
+        segments.append((True, code[begin:end]))
+        pos = end
+    return segments
+
+def map_segments(code, func):
+    """对未标记片段应用 func，标记片段原样保留
+
+    Args:
+        code: 源代码字符串
+        func: 接受并返回字符串的变换函数
+
+    Returns:
+        str: 变换后的代码
+    """
+    segments = split(code)
+    if len(segments) == 1 and not segments[0][0]:
+        return func(code)
+    return ''.join(text if is_skip else func(text)
+                   for is_skip, text in segments)
@@ -1,391 +1,589 @@
-"""控制流变换模块"""
-
-import random
-import re
-
-class ControlFlowTransformer:
-    """控制流变换"""
-    
-    def __init__(self):
-        """初始化控制流变换器"""
-        self.loop_counter = 0
-        self.if_counter = 0
-    
-    def transform(self, code, strategy):
-        """应用控制流变换
-        
-        Args:
-            code: 源代码字符串
-            strategy: 混淆策略
-            
-        Returns:
-            str: 变换后的代码
-        """
-        transformed_code = code
-        
-        # 应用控制流平坦化
-        if strategy.control_flow.get('flattening', False):
-            transformed_code = self._flatten_control_flow(transformed_code)
-        
-        # 应用伪分支
-        if strategy.control_flow.get('fake_branches', False):
-            transformed_code = self._add_fake_branches(transformed_code)
-        
-        # 应用异常驱动流
-        if strategy.control_flow.get('exception_flow', False):
-            transformed_code = self._add_exception_flow(transformed_code)
-        
-        # 应用循环变换
-        if strategy.control_flow.get('loop_transform', False):
-            transformed_code = self._transform_loops(transformed_code)
-        
-        return transformed_code
-    
-    def _flatten_control_flow(self, code):
-        """控制流平坦化
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找函数定义
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|class|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 生成平坦化后的函数体
-            flattened_body = self._flatten_function_body(body)
-            
-            # 重建函数定义
-            return f"def {function_name}({params}):\n{flattened_body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _flatten_function_body(self, body):
-        """平坦化函数体
-        
-        Args:
-            body: 函数体代码
-            
-        Returns:
-            str: 平坦化后的函数体
-        """
-        indent = self._get_indent(body)
-        
-        # 生成状态变量和跳转表
-        state_var = f"_state_{random.randint(1000, 9999)}"
-        jump_table_var = f"_jump_{random.randint(1000, 9999)}"
-        
-        # 分割代码块，考虑嵌套结构
-        blocks = self._split_into_blocks(body)
-        
-        if not blocks:
-            return body
-        
-        # 生成随机状态映射
-        state_map = {}
-        for i in range(len(blocks)):
-            state_map[i] = random.randint(100, 999)
-        
-        # 生成跳转表
-        jump_table = "{"
-        for i, state in state_map.items():
-            if i < len(blocks) - 1:
-                next_state = state_map[i + 1]
-            else:
-                next_state = -1  # 终止状态
-            jump_table += f"{state}: {next_state}, "
-        jump_table = jump_table.rstrip(", ") + "}"
-        
-        # 生成平坦化代码
-        flattened = []
-        flattened.append(f"{indent}{jump_table_var} = {jump_table}")
-        flattened.append(f"{indent}{state_var} = {state_map[0]}")
-        flattened.append(f"{indent}while {state_var} != -1:")
-        
-        # 添加每个代码块
-        for i, block in enumerate(blocks):
-            state = state_map[i]
-            flattened.append(f"{indent}    if {state_var} == {state}:")
-            
-            # 添加代码块内容
-            block_lines = block.strip().split('\n')
-            for line in block_lines:
-                flattened.append(f"{indent}        {line}")
-            
-            # 添加状态转换
-            if i < len(blocks) - 1:
-                next_state = state_map[i + 1]
-                flattened.append(f"{indent}        {state_var} = {next_state}")
-            else:
-                flattened.append(f"{indent}        {state_var} = -1")
-        
-        return '\n'.join(flattened)
-    
-    def _add_fake_branches(self, code):
-        """添加伪分支
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找if语句
-        if_pattern = re.compile(r'(\s*)if\s+(.*?):\s*(.*?)(?=elif|else|def|class|$)', re.DOTALL)
-        
-        def replace_if(match):
-            indent = match.group(1)
-            condition = match.group(2)
-            body = match.group(3)
-            
-            # 生成伪分支
-            fake_var = f"_fake_{random.randint(1000, 9999)}"
-            fake_condition = f"{fake_var} == {random.randint(1, 100)}"
-            
-            # 重建if语句，添加伪分支
-            new_if = []
-            new_if.append(f"{indent}{fake_var} = {random.randint(1, 100)}")
-            new_if.append(f"{indent}if {condition} and not {fake_condition}:")
-            new_if.append(body)
-            new_if.append(f"{indent}elif {fake_condition}:")
-            new_if.append(f"{indent}    pass  # 伪分支")
-            new_if.append(f"{indent}else:")
-            new_if.append(f"{indent}    pass")
-            
-            return '\n'.join(new_if)
-        
-        return if_pattern.sub(replace_if, code)
-    
-    def _add_exception_flow(self, code):
-        """添加异常驱动流
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找函数定义
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 生成异常驱动的函数体
-            exception_body = self._add_exception_handlers(body)
-            
-            # 重建函数定义
-            return f"def {function_name}({params}):\n{exception_body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _add_exception_handlers(self, body):
-        """添加异常处理器
-        
-        Args:
-            body: 函数体代码
-            
-        Returns:
-            str: 变换后的函数体
-        """
-        # 简化版实现
-        indent = self._get_indent(body)
-        
-        # 生成异常类名
-        exception_name = f"_FakeException_{random.randint(1000, 9999)}"
-        
-        # 生成异常驱动代码
-        exception_code = []
-        exception_code.append(f"{indent}class {exception_name}(Exception):")
-        exception_code.append(f"{indent}    pass")
-        exception_code.append("")
-        exception_code.append(f"{indent}try:")
-        
-        # 添加原始代码
-        body_lines = body.strip().split('\n')
-        for line in body_lines:
-            exception_code.append(f"{indent}    {line}")
-        
-        # 添加异常处理器
-        exception_code.append(f"{indent}except {exception_name}:")
-        exception_code.append(f"{indent}    pass")
-        exception_code.append(f"{indent}except Exception:")
-        exception_code.append(f"{indent}    raise")
-        
-        return '\n'.join(exception_code)
-    
-    def _transform_loops(self, code):
-        """变换循环
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找for循环
-        for_pattern = re.compile(r'(\s*)for\s+(.*?)\s+in\s+(.*?):\s*(.*?)(?=for|while|if|def|class|$)', re.DOTALL)
-        
-        def replace_for(match):
-            indent = match.group(1)
-            var = match.group(2)
-            iterable = match.group(3)
-            body = match.group(4)
-            
-            # 生成变换后的循环
-            transformed_for = self._transform_for_loop(indent, var, iterable, body)
-            
-            return transformed_for
-        
-        # 应用for循环变换
-        code = for_pattern.sub(replace_for, code)
-        
-        # 寻找while循环
-        while_pattern = re.compile(r'(\s*)while\s+(.*?):\s*(.*?)(?=for|while|if|def|class|$)', re.DOTALL)
-        
-        def replace_while(match):
-            indent = match.group(1)
-            condition = match.group(2)
-            body = match.group(3)
-            
-            # 生成变换后的循环
-            transformed_while = self._transform_while_loop(indent, condition, body)
-            
-            return transformed_while
-        
-        return while_pattern.sub(replace_while, code)
-    
-    def _transform_for_loop(self, indent, var, iterable, body):
-        """变换for循环
-        
-        Args:
-            indent: 缩进
-            var: 循环变量
-            iterable: 可迭代对象
-            body: 循环体
-            
-        Returns:
-            str: 变换后的循环
-        """
-        # 生成迭代器变量
-        iter_var = f"_iter_{random.randint(1000, 9999)}"
-        
-        # 生成变换后的循环
-        transformed = []
-        transformed.append(f"{indent}{iter_var} = iter({iterable})")
-        transformed.append(f"{indent}while True:")
-        transformed.append(f"{indent}    try:")
-        transformed.append(f"{indent}        {var} = next({iter_var})")
-        transformed.append(body)
-        transformed.append(f"{indent}    except StopIteration:")
-        transformed.append(f"{indent}        break")
-        
-        return '\n'.join(transformed)
-    
-    def _transform_while_loop(self, indent, condition, body):
-        """变换while循环
-        
-        Args:
-            indent: 缩进
-            condition: 循环条件
-            body: 循环体
-            
-        Returns:
-            str: 变换后的循环
-        """
-        # 生成状态变量
-        state_var = f"_state_{random.randint(1000, 9999)}"
-        
-        # 生成变换后的循环
-        transformed = []
-        transformed.append(f"{indent}{state_var} = True")
-        transformed.append(f"{indent}while {state_var}:")
-        transformed.append(f"{indent}    if not ({condition}):")
-        transformed.append(f"{indent}        {state_var} = False")
-        transformed.append(f"{indent}    else:")
-        transformed.append(body)
-        
-        return '\n'.join(transformed)
-    
-    def _get_indent(self, code):
-        """获取代码的缩进
-        
-        Args:
-            code: 代码字符串
-            
-        Returns:
-            str: 缩进字符串
-        """
-        lines = code.strip().split('\n')
-        if not lines:
-            return ''
-        
-        first_line = lines[0]
-        indent = ''
-        for char in first_line:
-            if char in (' ', '\t'):
-                indent += char
-            else:
-                break
-        
-        return indent
-    
-    def _split_into_blocks(self, code):
-        """将代码分割成块
-        
-        Args:
-            code: 代码字符串
-            
-        Returns:
-            list: 代码块列表
-        """
-        lines = code.strip().split('\n')
-        blocks = []
-        current_block = []
-        indent_level = 0
-        in_block = False
-        
-        for line in lines:
-            stripped_line = line.strip()
-            
-            if not stripped_line:
-                if current_block and in_block:
-                    blocks.append('\n'.join(current_block))
-                    current_block = []
-                    in_block = False
-                continue
-            
-            # 计算当前行的缩进级别
-            line_indent = len(line) - len(stripped_line)
-            
-            # 检查是否是块的开始
-            if any(stripped_line.endswith(char) for char in [':', '{', '[', '(']) and not stripped_line.endswith('\\\\'):
-                if current_block and in_block and line_indent <= indent_level:
-                    blocks.append('\n'.join(current_block))
-                    current_block = []
-                current_block.append(line)
-                indent_level = line_indent
-                in_block = True
-            elif stripped_line.startswith('return') or stripped_line.startswith('raise'):
-                # 单独处理返回和异常语句
-                if current_block:
-                    blocks.append('\n'.join(current_block))
-                    current_block = []
-                blocks.append(line)
-                in_block = False
-            else:
-                current_block.append(line)
-                in_block = True
-        
-        if current_block:
-            blocks.append('\n'.join(current_block))
-        
-        return blocks
+"""控制流变换模块"""
+
+import ast
+import io
+import random
+import re
+from collections import OrderedDict
+
+# 变换结果缓存的最大条目数
+_TRANSFORM_CACHE_SIZE = 128
+
+# 平坦化 switch-case 的代码模板
+_CASE_TMPL = "{ind}    if {sv} == {st}:\n{body}\n{ind}        {sv} = {nxt}"
+
+# 预编译的变换正则表达式（模块加载时编译一次，避免每次 transform 重新编译）
+_FUNCTION_RE = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|class|$)', re.DOTALL)
+_IF_RE = re.compile(r'(\s*)if\s+(.*?):\s*(.*?)(?=elif|else|def|class|$)', re.DOTALL)
+_EXC_FUNCTION_RE = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
+_FOR_RE = re.compile(r'(\s*)for\s+(.*?)\s+in\s+(.*?):\s*(.*?)(?=for|while|if|def|class|$)', re.DOTALL)
+_WHILE_RE = re.compile(r'(\s*)while\s+(.*?):\s*(.*?)(?=for|while|if|def|class|$)', re.DOTALL)
+
+class _FlattenTransformer(ast.NodeTransformer):
+    """把函数体展平成状态机循环的 AST 变换"""
+
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+        if len(node.body) < 2:
+            return node
+
+        # 一次 sample 批量取出两个后缀，减少逐个 randint 的调度开销
+        state_id, jump_id = random.sample(range(1000, 10000), 2)
+        state_var = f"_state_{state_id}"
+        jump_var = f"_jump_{jump_id}"
+        states = random.sample(range(100, 1000), len(node.body))
+
+        jump_entries = ", ".join(
+            f"{states[i]}: {states[i + 1] if i < len(states) - 1 else -1}"
+            for i in range(len(states)))
+        header = ast.parse(
+            f"{jump_var} = {{{jump_entries}}}\n"
+            f"{state_var} = {states[0]}\n"
+            f"while {state_var} != -1:\n    pass").body
+
+        # 每个顶层语句成为一个状态分支，执行后跳到下一状态
+        cases = []
+        for i, stmt in enumerate(node.body):
+            next_state = states[i + 1] if i < len(states) - 1 else -1
+            case = ast.parse(
+                f"if {state_var} == {states[i]}:\n"
+                f"    {state_var} = {next_state}").body[0]
+            case.body.insert(0, stmt)
+            cases.append(case)
+        header[2].body = cases
+
+        node.body = header
+        return node
+
+class _FakeBranchTransformer(ast.NodeTransformer):
+    """给 if 语句包上一层不可满足的伪分支"""
+
+    def visit_If(self, node):
+        self.generic_visit(node)
+
+        fake_var = f"_fake_{random.randint(1000, 9999)}"
+        # sample 保证两值互异，省去重抽循环
+        fake_value, other_value = random.sample(range(1, 101), 2)
+
+        assign = ast.parse(f"{fake_var} = {fake_value}").body[0]
+        wrapper = ast.parse(
+            f"if _cond and not ({fake_var} == {other_value}):\n    pass\n"
+            f"elif {fake_var} == {other_value}:\n    pass  # 伪分支\n"
+            f"else:\n    pass").body[0]
+        wrapper.test.values[0] = node.test
+        wrapper.body = node.body
+        if node.orelse:
+            wrapper.orelse[0].orelse = node.orelse
+        return [assign, wrapper]
+
+class _ExceptionFlowTransformer(ast.NodeTransformer):
+    """把函数体包进伪异常驱动的 try 结构"""
+
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+
+        exception_name = f"_FakeException_{random.randint(1000, 9999)}"
+        wrapper = ast.parse(
+            f"class {exception_name}(Exception):\n    pass\n"
+            f"try:\n    pass\n"
+            f"except {exception_name}:\n    pass\n"
+            f"except Exception:\n    raise").body
+        wrapper[1].body = node.body
+
+        node.body = wrapper
+        return node
+
+class _LoopTransformer(ast.NodeTransformer):
+    """把 for/while 循环改写成等价的迭代器/状态变量形式"""
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        if node.orelse:
+            return node
+
+        iter_var = f"_iter_{random.randint(1000, 9999)}"
+        wrapper = ast.parse(
+            f"{iter_var} = iter(_x)\n"
+            f"while True:\n"
+            f"    try:\n"
+            f"        _target = next({iter_var})\n"
+            f"    except StopIteration:\n"
+            f"        break").body
+        wrapper[0].value.args[0] = node.iter
+        try_stmt = wrapper[1].body[0]
+        try_stmt.body[0].targets[0] = node.target
+        try_stmt.body.extend(node.body)
+        return wrapper
+
+    def visit_While(self, node):
+        self.generic_visit(node)
+        if node.orelse:
+            return node
+
+        state_var = f"_state_{random.randint(1000, 9999)}"
+        wrapper = ast.parse(
+            f"{state_var} = True\n"
+            f"while {state_var}:\n"
+            f"    if not _cond:\n"
+            f"        {state_var} = False\n"
+            f"    else:\n"
+            f"        pass").body
+        branch = wrapper[1].body[0]
+        branch.test.operand = node.test
+        branch.orelse = node.body
+        return wrapper
+
+class ControlFlowTransformer:
+    """控制流变换"""
+
+    def __init__(self):
+        """初始化控制流变换器"""
+        self.loop_counter = 0
+        self.if_counter = 0
+        # 按 (代码, 策略开关) 缓存变换结果：多阶段流水线常对同一
+        # 输入重复调用，LRU 限制缓存规模
+        self._transform_cache = OrderedDict()
+
+    def transform(self, code, strategy):
+        """应用控制流变换
+
+        相同的 (代码, 策略开关) 输入直接命中缓存；未命中时用由输入
+        派生的种子驱动随机数，保证缓存结果与重新计算一致。
+
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+
+        Returns:
+            str: 变换后的代码
+        """
+        # 空白输入没有可变换的内容，直接返回
+        if not code.strip():
+            return code
+
+        # 所有开关关闭时直接返回，连缓存与随机数状态切换都省掉
+        flags = strategy.control_flow
+        if not any(flags.get(k) for k in (
+                'flattening', 'fake_branches',
+                'exception_flow', 'loop_transform')):
+            return code
+
+        strategy_key = tuple(sorted(flags.items()))
+        key = (code, strategy_key)
+        cached = self._transform_cache.get(key)
+        if cached is not None:
+            self._transform_cache.move_to_end(key)
+            return cached
+
+        # 种下确定性种子后执行，结束时恢复全局随机数状态，
+        # 避免影响调用方的随机序列
+        state = random.getstate()
+        random.seed(hash(key))
+        try:
+            result = self._transform_uncached(code, strategy)
+        finally:
+            random.setstate(state)
+
+        self._transform_cache[key] = result
+        if len(self._transform_cache) > _TRANSFORM_CACHE_SIZE:
+            self._transform_cache.popitem(last=False)
+        return result
+
+    def _transform_uncached(self, code, strategy):
+        """执行控制流变换（不经过缓存）
+
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+
+        Returns:
+            str: 变换后的代码
+        """
+        flags = strategy.control_flow
+        transformers = []
+        if flags.get('flattening', False):
+            transformers.append(_FlattenTransformer())
+        if flags.get('fake_branches', False):
+            transformers.append(_FakeBranchTransformer())
+        if flags.get('exception_flow', False):
+            transformers.append(_ExceptionFlowTransformer())
+        if flags.get('loop_transform', False):
+            transformers.append(_LoopTransformer())
+
+        if not transformers:
+            return code
+
+        # 单次解析 + AST 遍历替代多遍 DOTALL 正则扫描，嵌套结构和
+        # 字符串/注释里的关键字都能正确处理；解析失败（非 Python
+        # 输入）时退回文本变换路径
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return self._transform_text(code, strategy)
+
+        for transformer in transformers:
+            tree = transformer.visit(tree)
+        ast.fix_missing_locations(tree)
+        return ast.unparse(tree)
+
+    def _transform_text(self, code, strategy):
+        """基于正则的文本变换回退路径
+
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+
+        Returns:
+            str: 变换后的代码
+        """
+        transformed_code = code
+
+        # 应用控制流平坦化
+        if strategy.control_flow.get('flattening', False):
+            transformed_code = self._flatten_control_flow(transformed_code)
+
+        # 应用伪分支
+        if strategy.control_flow.get('fake_branches', False):
+            transformed_code = self._add_fake_branches(transformed_code)
+
+        # 应用异常驱动流
+        if strategy.control_flow.get('exception_flow', False):
+            transformed_code = self._add_exception_flow(transformed_code)
+
+        # 应用循环变换
+        if strategy.control_flow.get('loop_transform', False):
+            transformed_code = self._transform_loops(transformed_code)
+
+        return transformed_code
+
+    def _flatten_control_flow(self, code):
+        """控制流平坦化
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 寻找函数定义
+        def replace_function(match):
+            function_name = match.group(1)
+            params = match.group(2)
+            body = match.group(3)
+            
+            # 生成平坦化后的函数体
+            flattened_body = self._flatten_function_body(body)
+            
+            # 重建函数定义
+            return f"def {function_name}({params}):\n{flattened_body}"
+        
+        return _FUNCTION_RE.sub(replace_function, code)
+    
+    def _flatten_function_body(self, body):
+        """平坦化函数体
+        
+        Args:
+            body: 函数体代码
+            
+        Returns:
+            str: 平坦化后的函数体
+        """
+        indent = self._get_indent(body)
+        
+        # 生成状态变量和跳转表
+        state_id, jump_id = random.sample(range(1000, 10000), 2)
+        state_var = f"_state_{state_id}"
+        jump_table_var = f"_jump_{jump_id}"
+        
+        # 分割代码块，考虑嵌套结构
+        blocks = self._split_into_blocks(body)
+        
+        if not blocks:
+            return body
+        
+        # 生成随机状态映射：sample 一次取出互不相同的状态值，
+        # 既避免逐块 randint 的开销，也杜绝状态碰撞导致的错误跳转；
+        # 块数超出默认范围时自动加宽取值区间
+        upper = max(1000, 100 + 2 * len(blocks))
+        states = random.sample(range(100, upper), len(blocks))
+        state_map = dict(enumerate(states))
+        
+        # 生成跳转表（一次 join 而不是逐项拼接字符串）
+        entries = [
+            f"{state_map[i]}: {state_map[i + 1] if i < len(blocks) - 1 else -1}"
+            for i in range(len(blocks))
+        ]
+        jump_table = "{" + ", ".join(entries) + "}"
+        
+        # 生成平坦化代码
+        flattened = []
+        flattened.append(f"{indent}{jump_table_var} = {jump_table}")
+        flattened.append(f"{indent}{state_var} = {state_map[0]}")
+        flattened.append(f"{indent}while {state_var} != -1:")
+        
+        # 添加每个代码块：整块套用模板一次成型，
+        # 替代每块五次零散的 f-string 追加
+        for i, block in enumerate(blocks):
+            body = '\n'.join(
+                f"{indent}        {line.strip() if j == 0 else line}"
+                for j, line in enumerate(block))
+            flattened.append(_CASE_TMPL.format(
+                ind=indent, sv=state_var, st=state_map[i], body=body,
+                nxt=state_map[i + 1] if i < len(blocks) - 1 else -1))
+
+        return '\n'.join(flattened)
+    
+    def _add_fake_branches(self, code):
+        """添加伪分支
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 寻找if语句
+        def replace_if(match):
+            indent = match.group(1)
+            condition = match.group(2)
+            body = match.group(3)
+            
+            # 生成伪分支（两枚小随机数一次批量取出）
+            fake_var = f"_fake_{random.randint(1000, 9999)}"
+            cond_value, init_value = random.choices(range(1, 101), k=2)
+            fake_condition = f"{fake_var} == {cond_value}"
+
+            # 重建if语句，添加伪分支
+            new_if = []
+            new_if.append(f"{indent}{fake_var} = {init_value}")
+            new_if.append(f"{indent}if {condition} and not {fake_condition}:")
+            new_if.append(body)
+            new_if.append(f"{indent}elif {fake_condition}:")
+            new_if.append(f"{indent}    pass  # 伪分支")
+            new_if.append(f"{indent}else:")
+            new_if.append(f"{indent}    pass")
+            
+            return '\n'.join(new_if)
+        
+        return _IF_RE.sub(replace_if, code)
+    
+    def _add_exception_flow(self, code):
+        """添加异常驱动流
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 寻找函数定义
+        def replace_function(match):
+            function_name = match.group(1)
+            params = match.group(2)
+            body = match.group(3)
+            
+            # 生成异常驱动的函数体
+            exception_body = self._add_exception_handlers(body)
+            
+            # 重建函数定义
+            return f"def {function_name}({params}):\n{exception_body}"
+        
+        return _EXC_FUNCTION_RE.sub(replace_function, code)
+    
+    def _add_exception_handlers(self, body):
+        """添加异常处理器
+        
+        Args:
+            body: 函数体代码
+            
+        Returns:
+            str: 变换后的函数体
+        """
+        # 简化版实现
+        indent = self._get_indent(body)
+        
+        # 生成异常类名
+        exception_name = f"_FakeException_{random.randint(1000, 9999)}"
+
+        # 生成异常驱动代码：直接写入 StringIO 缓冲，
+        # 省去中间列表与逐行 f-string 的双份分配
+        buf = io.StringIO()
+        buf.write(f"{indent}class {exception_name}(Exception):\n"
+                  f"{indent}    pass\n\n"
+                  f"{indent}try:\n")
+
+        # 添加原始代码（splitlines 是单次 C 调用）
+        for line in body.strip().splitlines():
+            buf.write(indent)
+            buf.write("    ")
+            buf.write(line)
+            buf.write("\n")
+
+        # 添加异常处理器
+        buf.write(f"{indent}except {exception_name}:\n"
+                  f"{indent}    pass\n"
+                  f"{indent}except Exception:\n"
+                  f"{indent}    raise")
+
+        return buf.getvalue()
+    
+    def _transform_loops(self, code):
+        """变换循环
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 寻找for循环
+        def replace_for(match):
+            indent = match.group(1)
+            var = match.group(2)
+            iterable = match.group(3)
+            body = match.group(4)
+            
+            # 生成变换后的循环
+            transformed_for = self._transform_for_loop(indent, var, iterable, body)
+            
+            return transformed_for
+        
+        # 应用for循环变换
+        code = _FOR_RE.sub(replace_for, code)
+        
+        # 寻找while循环
+        def replace_while(match):
+            indent = match.group(1)
+            condition = match.group(2)
+            body = match.group(3)
+            
+            # 生成变换后的循环
+            transformed_while = self._transform_while_loop(indent, condition, body)
+            
+            return transformed_while
+        
+        return _WHILE_RE.sub(replace_while, code)
+    
+    def _transform_for_loop(self, indent, var, iterable, body):
+        """变换for循环
+        
+        Args:
+            indent: 缩进
+            var: 循环变量
+            iterable: 可迭代对象
+            body: 循环体
+            
+        Returns:
+            str: 变换后的循环
+        """
+        # 生成迭代器变量
+        iter_var = f"_iter_{random.randint(1000, 9999)}"
+        
+        # 生成变换后的循环
+        transformed = []
+        transformed.append(f"{indent}{iter_var} = iter({iterable})")
+        transformed.append(f"{indent}while True:")
+        transformed.append(f"{indent}    try:")
+        transformed.append(f"{indent}        {var} = next({iter_var})")
+        transformed.append(body)
+        transformed.append(f"{indent}    except StopIteration:")
+        transformed.append(f"{indent}        break")
+        
+        return '\n'.join(transformed)
+    
+    def _transform_while_loop(self, indent, condition, body):
+        """变换while循环
+        
+        Args:
+            indent: 缩进
+            condition: 循环条件
+            body: 循环体
+            
+        Returns:
+            str: 变换后的循环
+        """
+        # 生成状态变量
+        state_var = f"_state_{random.randint(1000, 9999)}"
+        
+        # 生成变换后的循环
+        transformed = []
+        transformed.append(f"{indent}{state_var} = True")
+        transformed.append(f"{indent}while {state_var}:")
+        transformed.append(f"{indent}    if not ({condition}):")
+        transformed.append(f"{indent}        {state_var} = False")
+        transformed.append(f"{indent}    else:")
+        transformed.append(body)
+        
+        return '\n'.join(transformed)
+    
+    def _get_indent(self, code):
+        """获取代码的缩进
+        
+        Args:
+            code: 代码字符串
+            
+        Returns:
+            str: 缩进字符串
+        """
+        lines = code.strip().split('\n')
+        if not lines:
+            return ''
+        
+        # lstrip 在 C 层定位首个非空白字符，切片取前缀即为缩进，
+        # 免去逐字符的 Python 循环拼接
+        first_line = lines[0]
+        stripped = first_line.lstrip(' \t')
+        return first_line[:len(first_line) - len(stripped)]
+    
+    def _split_into_blocks(self, code):
+        """将代码分割成块
+        
+        Args:
+            code: 代码字符串
+            
+        Returns:
+            list: 代码块列表，每个块是行列表（由调用方直接迭代，
+                避免 join 之后再 split 的往返拷贝）
+        """
+        lines = code.strip().split('\n')
+        blocks = []
+        current_block = []
+        indent_level = 0
+        in_block = False
+        
+        for line in lines:
+            stripped_line = line.strip()
+            
+            if not stripped_line:
+                if current_block and in_block:
+                    blocks.append(current_block)
+                    current_block = []
+                    in_block = False
+                continue
+            
+            # 计算当前行的缩进级别
+            line_indent = len(line) - len(stripped_line)
+            
+            # 检查是否是块的开始
+            if any(stripped_line.endswith(char) for char in [':', '{', '[', '(']) and not stripped_line.endswith('\\\\'):
+                if current_block and in_block and line_indent <= indent_level:
+                    blocks.append(current_block)
+                    current_block = []
+                current_block.append(line)
+                indent_level = line_indent
+                in_block = True
+            elif stripped_line.startswith('return') or stripped_line.startswith('raise'):
+                # 单独处理返回和异常语句
+                if current_block:
+                    blocks.append(current_block)
+                    current_block = []
+                blocks.append([line])
+                in_block = False
+            else:
+                current_block.append(line)
+                in_block = True
+        
+        if current_block:
+            blocks.append(current_block)
+        
+        return blocks
@@ -1,502 +1,754 @@
-"""数据变换模块"""
-
-import random
-import re
-import os
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import padding
-
-class DataTransformer:
-    """数据变换"""
-    
-    def __init__(self):
-        """初始化数据变换器"""
-        self.const_counter = 0
-        self.string_counter = 0
-        self.cache = {}
-        self.string_cache = {}
-    
-    def clear_cache(self):
-        """清空缓存"""
-        self.cache.clear()
-        self.string_cache.clear()
-    
-    def transform(self, code, strategy):
-        """应用数据变换
-        
-        Args:
-            code: 源代码字符串
-            strategy: 混淆策略
-            
-        Returns:
-            str: 变换后的代码
-        """
-        transformed_code = code
-        
-        # 应用常量拆分
-        if strategy.data.get('constant_splitting', False):
-            transformed_code = self._split_constants(transformed_code)
-        
-        # 应用动态计算
-        if strategy.data.get('dynamic_calculation', False):
-            transformed_code = self._dynamic_calculation(transformed_code)
-        
-        # 应用编码表
-        if strategy.data.get('encoding_table', False):
-            transformed_code = self._add_encoding_table(transformed_code)
-        
-        # 应用多态编码
-        if strategy.data.get('polymorphic_encoding', False):
-            transformed_code = self._add_polymorphic_encoding(transformed_code)
-        
-        # 应用字符串加密
-        if strategy.data.get('string_encryption', False):
-            transformed_code = self._encrypt_strings(transformed_code)
-        
-        return transformed_code
-    
-    def _split_constants(self, code):
-        """拆分常量
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找数字常量
-        number_pattern = re.compile(r'\b(\d+)\b')
-        
-        def replace_number(match):
-            number = int(match.group(1))
-            
-            # 只处理较大的数字
-            if number < 100:
-                return match.group(1)
-            
-            # 拆分数字
-            parts = self._split_number(number)
-            
-            # 生成拆分后的表达式
-            var_name = f"_const_{random.randint(1000, 9999)}"
-            expr = ' + '.join(map(str, parts))
-            
-            # 添加到代码开头
-            nonlocal code
-            code = f"{var_name} = {expr}\n{code}"
-            
-            return var_name
-        
-        return number_pattern.sub(replace_number, code)
-    
-    def _split_number(self, number):
-        """拆分数字
-        
-        Args:
-            number: 要拆分的数字
-            
-        Returns:
-            list: 数字部分列表
-        """
-        parts = []
-        remaining = number
-        
-        # 生成随机部分
-        while remaining > 0:
-            if remaining < 10:
-                parts.append(remaining)
-                break
-            
-            part = random.randint(1, remaining // 2)
-            parts.append(part)
-            remaining -= part
-        
-        # 确保至少有两个部分
-        if len(parts) < 2:
-            parts = [parts[0] // 2, parts[0] - parts[0] // 2]
-        
-        return parts
-    
-    def _dynamic_calculation(self, code):
-        """动态计算
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找赋值语句
-        assign_pattern = re.compile(r'(\s*)([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*(\d+)')
-        
-        def replace_assign(match):
-            indent = match.group(1)
-            var_name = match.group(2)
-            value = int(match.group(3))
-            
-            # 生成动态计算表达式
-            expr = self._generate_dynamic_expr(value)
-            
-            return f"{indent}{var_name} = {expr}"
-        
-        return assign_pattern.sub(replace_assign, code)
-    
-    def _generate_dynamic_expr(self, value):
-        """生成动态计算表达式
-        
-        Args:
-            value: 原始值
-            
-        Returns:
-            str: 动态计算表达式
-        """
-        if value <= 1:
-            return str(value)
-        
-        # 检查缓存
-        if value in self.cache:
-            return self.cache[value]
-        
-        # 高级动态计算技术
-        techniques = [
-            self._generate_polynomial_expr,
-            self._generate_trigonometric_expr,
-            self._generate_bitwise_expr,
-            self._generate_complex_arithmetic_expr
-        ]
-        
-        # 随机选择一种技术
-        technique = random.choice(techniques)
-        expr = technique(value)
-        
-        # 缓存结果
-        self.cache[value] = expr
-        
-        return expr
-    
-    def _generate_polynomial_expr(self, value):
-        """生成多项式表达式
-        
-        Args:
-            value: 原始值
-            
-        Returns:
-            str: 多项式表达式
-        """
-        # 生成形如 (a * x + b) * c - d 的表达式
-        a = random.randint(2, 5)
-        c = random.randint(2, 5)
-        b = random.randint(1, 10)
-        d = (a * c * random.randint(1, value // (a * c))) + b * c
-        
-        x = (value + d - b * c) // (a * c)
-        return f"({a} * {x} + {b}) * {c} - {d}"
-    
-    def _generate_trigonometric_expr(self, value):
-        """生成三角函数表达式
-        
-        Args:
-            value: 原始值
-            
-        Returns:
-            str: 三角函数表达式
-        """
-        # 生成形如 int(abs(sin(a)) * b) 的表达式
-        a = random.randint(100, 1000)
-        b = value * random.randint(10, 100)
-        return f"int(abs(__import__('math').sin({a})) * {b})"
-    
-    def _generate_bitwise_expr(self, value):
-        """生成位运算表达式
-        
-        Args:
-            value: 原始值
-            
-        Returns:
-            str: 位运算表达式
-        """
-        # 生成形如 (a ^ b) & c 的表达式
-        a = random.randint(value, value * 2)
-        b = a ^ value
-        c = (1 << (value.bit_length() + 1)) - 1
-        return f"({a} ^ {b}) & {c}"
-    
-    def _generate_complex_arithmetic_expr(self, value):
-        """生成复杂算术表达式
-        
-        Args:
-            value: 原始值
-            
-        Returns:
-            str: 复杂算术表达式
-        """
-        operations = ['+', '-', '*', '//', '%']
-        expr_parts = []
-        
-        # 生成第一个操作数
-        max_first_op = max(1, value // 2)
-        first_op = random.randint(1, max_first_op)
-        expr_parts.append(str(first_op))
-        
-        remaining = value - first_op
-        
-        # 生成后续操作
-        while remaining != 0:
-            op = random.choice(operations)
-            if op == '+':
-                next_op = random.randint(1, remaining)
-                expr_parts.append('+')
-                expr_parts.append(str(next_op))
-                remaining -= next_op
-            elif op == '-':
-                # 确保结果不会为负
-                next_op = random.randint(1, value // 2)
-                expr_parts.append('-')
-                expr_parts.append(str(next_op))
-                expr_parts.append('+')
-                expr_parts.append(str(next_op + remaining))
-                remaining = 0
-            elif op == '*':
-                # 寻找因子
-                factors = []
-                for i in range(2, value // 2 + 1):
-                    if value % i == 0:
-                        factors.append(i)
-                
-                if factors:
-                    factor = random.choice(factors)
-                    expr_parts.append('*')
-                    expr_parts.append(str(factor))
-                    expr_parts.append('*')
-                    expr_parts.append(str(value // factor))
-                    remaining = 0
-                else:
-                    # 如果没有因子，使用加法
-                    expr_parts.append('+')
-                    expr_parts.append(str(remaining))
-                    remaining = 0
-            elif op == '//' or op == '%':
-                # 生成整除或取模表达式
-                divisor = random.randint(2, 10)
-                quotient = value // divisor
-                remainder = value % divisor
-                if op == '//':
-                    expr_parts.append('*')
-                    expr_parts.append(str(divisor))
-                    expr_parts.append('//')
-                    expr_parts.append(str(divisor))
-                else:
-                    expr_parts.append('*')
-                    expr_parts.append(str(divisor))
-                    expr_parts.append('%')
-                    expr_parts.append(str(divisor))
-                    expr_parts.append('+')
-                    expr_parts.append(str(remainder))
-                remaining = 0
-        
-        return ' '.join(expr_parts)
-    
-    def _add_polymorphic_encoding(self, code):
-        """添加多态编码
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成多态编码函数
-        encode_func = f"_encode_{random.randint(1000, 9999)}"
-        decode_func = f"_decode_{random.randint(1000, 9999)}"
-        
-        # 生成随机编码表
-        encode_table = {}
-        decode_table = {}
-        for i in range(256):
-            encoded = random.randint(0, 255)
-            encode_table[i] = encoded
-            decode_table[encoded] = i
-        
-        # 添加编码函数
-        encode_code = f"""
-{encode_func} = {encode_table}
-
-{decode_func} = {decode_table}
-
-"""
-        
-        return encode_code + code
-    
-    def _add_encoding_table(self, code):
-        """添加编码表
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成编码表
-        encoding_table = self._generate_encoding_table()
-        decode_function = self._generate_decode_function()
-        
-        # 添加到代码开头
-        encoded_code = f"{encoding_table}\n{decode_function}\n{code}"
-        
-        return encoded_code
-    
-    def _generate_encoding_table(self):
-        """生成编码表
-        
-        Returns:
-            str: 编码表代码
-        """
-        table_name = f"_encoding_table_{random.randint(1000, 9999)}"
-        
-        # 生成随机编码表
-        table = {}
-        for i in range(256):
-            table[i] = random.randint(0, 255)
-        
-        # 生成编码表代码
-        table_code = f"{table_name} = " + str(table)
-        
-        return table_code
-    
-    def _generate_decode_function(self):
-        """生成解码函数
-        
-        Returns:
-            str: 解码函数代码
-        """
-        func_name = f"_decode_{random.randint(1000, 9999)}"
-        table_name = f"_encoding_table_{random.randint(1000, 9999)}"
-        
-        # 生成解码函数
-        func_code = f"def {func_name}(data):\n"
-        func_code += f"    result = ''\n"
-        func_code += f"    for c in data:\n"
-        func_code += f"        result += chr({table_name}[ord(c)])\n"
-        func_code += f"    return result"
-        
-        return func_code
-    
-    def _encrypt_strings(self, code):
-        """加密字符串
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找字符串字面量
-        string_pattern = re.compile(r'"([^"]*)"|\'([^\']*)\'')
-        
-        # 收集解密函数和变量定义
-        decrypt_functions = []
-        var_definitions = []
-        var_map = {}
-        
-        def replace_string(match):
-            # 获取字符串内容
-            if match.group(1):
-                string = match.group(1)
-            else:
-                string = match.group(2)
-            
-            # 只处理非空字符串
-            if not string:
-                return match.group(0)
-            
-            # 检查是否已经处理过这个字符串
-            if string in var_map:
-                return var_map[string]
-            
-            # 加密字符串
-            encrypted_data, key, iv = self._encrypt_string(string)
-            
-            # 生成解密代码
-            var_name = f"_str_{random.randint(1000, 9999)}"
-            decrypt_func = f"_decrypt_{random.randint(1000, 9999)}"
-            
-            # 转换为字节列表表示
-            encrypted_hex = encrypted_data.hex()
-            key_hex = key.hex()
-            iv_hex = iv.hex()
-            
-            # 生成解密函数
-            decrypt_code = f"""
-def {decrypt_func}():
-    import binascii
-    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-    from cryptography.hazmat.backends import default_backend
-    from cryptography.hazmat.primitives import padding
-
-    encrypted_data = binascii.unhexlify('{encrypted_hex}')
-    key = binascii.unhexlify('{key_hex}')
-    iv = binascii.unhexlify('{iv_hex}')
-
-    cipher = Cipher(
-        algorithms.AES(key),
-        modes.CBC(iv),
-        backend=default_backend()
-    )
-    decryptor = cipher.decryptor()
-    decrypted_padded = decryptor.update(encrypted_data) + decryptor.finalize()
-
-    unpadder = padding.PKCS7(128).unpadder()
-    decrypted = unpadder.update(decrypted_padded) + unpadder.finalize()
-
-    return decrypted.decode('utf-8')
-
-"""
-            decrypt_functions.append(decrypt_code)
-            
-            # 生成变量定义
-            var_def = f"{var_name} = {decrypt_func}()\n"
-            var_definitions.append(var_def)
-            
-            # 保存映射
-            var_map[string] = var_name
-            
-            return var_name
-        
-        # 替换字符串
-        transformed_code = string_pattern.sub(replace_string, code)
-        
-        # 组合所有部分
-        all_code = ''.join(decrypt_functions) + ''.join(var_definitions) + transformed_code
-        
-        return all_code
-    
-    def _encrypt_string(self, string):
-        """加密字符串
-        
-        Args:
-            string: 要加密的字符串
-            
-        Returns:
-            tuple: (encrypted_data, key, iv) - 加密数据、密钥和初始化向量
-        """
-        # 生成随机密钥和初始化向量
-        key = os.urandom(32)  # AES-256 需要 32 字节密钥
-        iv = os.urandom(16)   # AES 块大小为 16 字节
-        
-        # 填充数据
-        padder = padding.PKCS7(128).padder()
-        padded_data = padder.update(string.encode('utf-8')) + padder.finalize()
-        
-        # 创建加密器
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.CBC(iv),
-            backend=default_backend()
-        )
-        encryptor = cipher.encryptor()
-        
-        # 加密数据
-        encrypted_data = encryptor.update(padded_data) + encryptor.finalize()
-        
-        return encrypted_data, key, iv
+"""数据变换模块"""
+
+import ast
+import functools
+import io
+import random
+import re
+import os
+import tokenize
+from collections import OrderedDict
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+from hos.transformer import _skip
+
+# OpenSSL 后端句柄进程内共享，模块加载时取一次即可
+_BACKEND = default_backend()
+
+# 可选的 numpy：编码表一次性在 C 层生成
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+# 预编译的变换正则表达式（模块加载时编译一次，避免每次 transform 重新编译）
+_NUMBER_RE = re.compile(r'\b(\d+)\b')
+_ASSIGN_RE = re.compile(r'(\s*)([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*(\d+)')
+_STRING_RE = re.compile(r'''(?P<q>["'])(?P<body>(?:(?!(?P=q)).)*)(?P=q)''')
+
+# 变换结果缓存的最大条目数
+_TRANSFORM_CACHE_SIZE = 128
+
+class DataTransformer:
+    """数据变换"""
+    
+    def __init__(self):
+        """初始化数据变换器"""
+        self.const_counter = 0
+        self.string_counter = 0
+        self.cache = {}
+        self.string_cache = {}
+        # 按 (代码, 策略开关) 缓存变换结果，LRU 淘汰
+        self._transform_cache = OrderedDict()
+        # numpy 的 PCG64 生成器：编码表等批量抽样在 C 层完成
+        self._rng = _np.random.default_rng() if _np is not None else None
+        # 预抽的变量名后缀池，耗尽时整批补充
+        self._id_pool = []
+
+    def _next_id(self):
+        """取出一个随机变量名后缀
+
+        后缀整块预抽（块内互不重复），摊薄逐个 randint 的状态锁
+        与调度开销；4096 个后缀足够覆盖单次变换的全部符号，也排
+        除了逐个抽取时的后缀碰撞风险。
+
+        Returns:
+            int: 10000-99999 范围内的后缀
+        """
+        if not self._id_pool:
+            self._id_pool = random.sample(range(10000, 100000), 4096)
+        return self._id_pool.pop()
+
+    def clear_cache(self):
+        """清空缓存"""
+        self.cache.clear()
+        self.string_cache.clear()
+        self._transform_cache.clear()
+
+    def transform(self, code, strategy):
+        """应用数据变换
+
+        相同的 (代码, 策略开关) 输入直接命中缓存；未命中时用由输入
+        派生的种子驱动随机数，保证缓存结果与重新计算一致。
+
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+
+        Returns:
+            str: 变换后的代码
+        """
+        # 空白输入没有可变换的内容，直接返回
+        if not code.strip():
+            return code
+
+        # 所有开关关闭时直接返回，连缓存与随机数状态切换都省掉
+        flags = strategy.data
+        if not any(flags.get(k) for k in (
+                'constant_splitting', 'dynamic_calculation',
+                'encoding_table', 'polymorphic_encoding',
+                'string_encryption')):
+            return code
+
+        strategy_key = tuple(sorted(flags.items()))
+        key = (code, strategy_key)
+        cached = self._transform_cache.get(key)
+        if cached is not None:
+            self._transform_cache.move_to_end(key)
+            return cached
+
+        # 种下确定性种子后执行，结束时恢复全局随机数状态
+        state = random.getstate()
+        random.seed(hash(key))
+        try:
+            result = self._transform_uncached(code, strategy)
+        finally:
+            random.setstate(state)
+
+        self._transform_cache[key] = result
+        if len(self._transform_cache) > _TRANSFORM_CACHE_SIZE:
+            self._transform_cache.popitem(last=False)
+        return result
+
+    def _transform_uncached(self, code, strategy):
+        """执行数据变换（不经过缓存）
+
+        单次词法分析替代五遍独立的正则扫描：数字/字符串按 token
+        分类就地改写，互相不会再误伤对方生成的代码。词法分析失败
+        （非 Python 输入）时退回文本变换路径。
+
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+
+        Returns:
+            str: 变换后的代码
+        """
+        try:
+            return self._transform_tokens(code, strategy.data)
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            return self._transform_text(code, strategy)
+
+    def _transform_tokens(self, code, flags):
+        """基于单遍 token 扫描的数据变换
+
+        Args:
+            code: 源代码字符串
+            flags: 策略的数据变换开关字典
+
+        Returns:
+            str: 变换后的代码
+        """
+        split_constants = flags.get('constant_splitting', False)
+        dynamic_calc = flags.get('dynamic_calculation', False)
+        encrypt = flags.get('string_encryption', False)
+
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+
+        # 行首字符偏移表，把 token 的 (行, 列) 位置映射到原文偏移
+        line_starts = [0]
+        for line in code.splitlines(keepends=True):
+            line_starts.append(line_starts[-1] + len(line))
+
+        # 共享加密流（见 _encrypt_strings，此处按 token 驱动）
+        if encrypt:
+            key = os.urandom(32)
+            nonce = os.urandom(16)
+            encryptor = Cipher(
+                algorithms.AES(key),
+                modes.CTR(nonce),
+                backend=_BACKEND
+            ).encryptor()
+            decrypt_func = f"_decrypt_{self._next_id()}"
+            cipher_chunks = []
+            var_definitions = []
+            var_map = {}
+            var_names = []
+            offset = 0
+
+        out = []
+        prelude = []
+        last = 0
+
+        for i, tok in enumerate(tokens):
+            ttype, tstr, start, end = tok[:4]
+
+            if ttype == tokenize.NUMBER and tstr.isdigit():
+                number = int(tstr)
+                replacement = None
+                if split_constants and number >= 100:
+                    # 拆分大常量，声明收集进前导列表
+                    parts = self._split_number(number)
+                    var_name = f"_const_{self._next_id()}"
+                    expr = ' + '.join(map(str, parts))
+                    prelude.append(f"{var_name} = {expr}")
+                    replacement = var_name
+                elif (dynamic_calc and number > 1 and i >= 2
+                        and tokens[i - 1][1] == '='
+                        and tokens[i - 2][0] == tokenize.NAME):
+                    # 简单赋值右侧的数字换成动态计算表达式
+                    replacement = self._generate_dynamic_expr(number)
+
+                if replacement is not None:
+                    out.append(code[last:line_starts[start[0] - 1] + start[1]])
+                    out.append(replacement)
+                    last = line_starts[end[0] - 1] + end[1]
+
+            elif (ttype == tokenize.STRING and encrypt
+                    and tstr[0] in ('"', "'")):
+                # 只处理无前缀的普通字面量（f/b/r 字符串原样保留）
+                try:
+                    string = ast.literal_eval(tstr)
+                except (ValueError, SyntaxError):
+                    continue
+                if not isinstance(string, str) or not string:
+                    continue
+
+                # setdefault 一次哈希完成查找与登记，未见过的
+                # 字符串拿到新下标后才做加密与定义生成
+                idx = var_map.setdefault(string, len(var_map))
+                if idx == len(var_names):
+                    data = string.encode('utf-8')
+                    cipher_chunks.append(encryptor.update(data))
+                    var_names.append(f"_str_{self._next_id()}")
+                    var_definitions.append(
+                        f"{var_names[idx]} = {decrypt_func}"
+                        f"({offset}, {len(data)})\n")
+                    offset += len(data)
+                var_name = var_names[idx]
+
+                out.append(code[last:line_starts[start[0] - 1] + start[1]])
+                out.append(var_name)
+                last = line_starts[end[0] - 1] + end[1]
+
+        out.append(code[last:])
+        body = ''.join(out)
+
+        if prelude:
+            body = '\n'.join(prelude) + '\n' + body
+
+        if encrypt and var_definitions:
+            blob_hex = (b''.join(cipher_chunks)
+                        + encryptor.finalize()).hex()
+            body = (self._generate_shared_decrypt(decrypt_func, key,
+                                                  nonce, blob_hex)
+                    + ''.join(var_definitions) + body)
+
+        # 编码表只向前追加，不再扫描已生成的代码
+        if flags.get('polymorphic_encoding', False):
+            body = self._add_polymorphic_encoding(body)
+        if flags.get('encoding_table', False):
+            body = self._add_encoding_table(body)
+
+        return body
+
+    def _transform_text(self, code, strategy):
+        """基于正则的文本变换回退路径
+
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+
+        Returns:
+            str: 变换后的代码
+        """
+        transformed_code = code
+
+        # 应用常量拆分
+        if strategy.data.get('constant_splitting', False):
+            transformed_code = self._split_constants(transformed_code)
+
+        # 应用动态计算
+        if strategy.data.get('dynamic_calculation', False):
+            transformed_code = self._dynamic_calculation(transformed_code)
+
+        # 应用编码表
+        if strategy.data.get('encoding_table', False):
+            transformed_code = self._add_encoding_table(transformed_code)
+
+        # 应用多态编码
+        if strategy.data.get('polymorphic_encoding', False):
+            transformed_code = self._add_polymorphic_encoding(transformed_code)
+
+        # 应用字符串加密
+        if strategy.data.get('string_encryption', False):
+            transformed_code = self._encrypt_strings(transformed_code)
+
+        return transformed_code
+    
+    def _split_constants(self, code):
+        """拆分常量
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 单遍 finditer 扫描：原文片段与替换串收集进列表，
+        # 常量声明收集进前导列表，最后各拼接一次；哨兵标记内的
+        # 生成代码（密文十六进制串等）直接绕过
+        prelude = []
+
+        def split_segment(segment):
+            out = []
+            last = 0
+            for match in _NUMBER_RE.finditer(segment):
+                number = int(match.group(1))
+
+                # 只处理较大的数字
+                if number < 100:
+                    continue
+
+                # 拆分数字
+                parts = self._split_number(number)
+
+                # 生成拆分后的表达式
+                var_name = f"_const_{self._next_id()}"
+                expr = ' + '.join(map(str, parts))
+                prelude.append(f"{var_name} = {expr}")
+
+                out.append(segment[last:match.start()])
+                out.append(var_name)
+                last = match.end()
+            out.append(segment[last:])
+            return ''.join(out)
+
+        result = _skip.map_segments(code, split_segment)
+
+        if not prelude:
+            return code
+
+        return '\n'.join(prelude) + '\n' + result
+    
+    def _split_number(self, number):
+        """拆分数字
+        
+        Args:
+            number: 要拆分的数字
+            
+        Returns:
+            list: 数字部分列表
+        """
+        if number < 2:
+            return [number]
+
+        # 一次 sample 取出 k-1 个切点，差分即得 k 个正部分，
+        # 和恒等于原数；替代逐步递减的变长循环（remaining 降到 2
+        # 时 randint(1, 1) 区间还会退化出错）
+        k = random.randint(2, min(5, number))
+        cuts = sorted(random.sample(range(1, number), k - 1))
+
+        parts = [cuts[0]]
+        parts.extend(cuts[i] - cuts[i - 1] for i in range(1, len(cuts)))
+        parts.append(number - cuts[-1])
+
+        return parts
+    
+    def _dynamic_calculation(self, code):
+        """动态计算
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 寻找赋值语句
+        def replace_assign(match):
+            indent = match.group(1)
+            var_name = match.group(2)
+            value = int(match.group(3))
+            
+            # 生成动态计算表达式
+            expr = self._generate_dynamic_expr(value)
+            
+            return f"{indent}{var_name} = {expr}"
+        
+        return _ASSIGN_RE.sub(replace_assign, code)
+    
+    def _generate_dynamic_expr(self, value):
+        """生成动态计算表达式
+        
+        Args:
+            value: 原始值
+            
+        Returns:
+            str: 动态计算表达式
+        """
+        if value <= 1:
+            return str(value)
+        
+        # 检查缓存
+        if value in self.cache:
+            return self.cache[value]
+        
+        # 高级动态计算技术
+        techniques = [
+            self._generate_polynomial_expr,
+            self._generate_trigonometric_expr,
+            self._generate_bitwise_expr,
+            self._generate_complex_arithmetic_expr
+        ]
+        
+        # 随机选择一种技术
+        technique = random.choice(techniques)
+        expr = technique(value)
+        
+        # 缓存结果
+        self.cache[value] = expr
+        
+        return expr
+    
+    def _generate_polynomial_expr(self, value):
+        """生成多项式表达式
+        
+        Args:
+            value: 原始值
+            
+        Returns:
+            str: 多项式表达式
+        """
+        # 生成形如 (a * x + b) * c - d 的表达式（系数一次批量抽取；
+        # value 小于 a*c 时乘数下限取 1，避免空区间）
+        a, c = random.choices(range(2, 6), k=2)
+        b = random.randint(1, 10)
+        d = (a * c * random.randint(1, max(1, value // (a * c)))) + b * c
+        
+        x = (value + d - b * c) // (a * c)
+        return f"({a} * {x} + {b}) * {c} - {d}"
+    
+    def _generate_trigonometric_expr(self, value):
+        """生成三角函数表达式
+        
+        Args:
+            value: 原始值
+            
+        Returns:
+            str: 三角函数表达式
+        """
+        # 生成形如 int(abs(sin(a)) * b) 的表达式
+        a = random.randint(100, 1000)
+        b = value * random.randint(10, 100)
+        return f"int(abs(__import__('math').sin({a})) * {b})"
+    
+    def _generate_bitwise_expr(self, value):
+        """生成位运算表达式
+        
+        Args:
+            value: 原始值
+            
+        Returns:
+            str: 位运算表达式
+        """
+        # 生成形如 (a ^ b) & c 的表达式
+        a = random.randint(value, value * 2)
+        b = a ^ value
+        c = (1 << (value.bit_length() + 1)) - 1
+        return f"({a} ^ {b}) & {c}"
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _factors(value):
+        """枚举 value 的全部非平凡因子
+
+        只试除到 √value，配对的大因子同步补全；lru_cache 让同一
+        字面量在多次 transform 之间只枚举一次。
+
+        Args:
+            value: 要分解的数字
+
+        Returns:
+            tuple: 升序排列的因子元组，素数时为空
+        """
+        small = []
+        large = []
+        i = 2
+        while i * i <= value:
+            if value % i == 0:
+                small.append(i)
+                if i * i != value:
+                    large.append(value // i)
+            i += 1
+        large.reverse()
+        return tuple(small + large)
+
+    def _generate_complex_arithmetic_expr(self, value):
+        """生成复杂算术表达式
+        
+        Args:
+            value: 原始值
+            
+        Returns:
+            str: 复杂算术表达式
+        """
+        operations = ['+', '-', '*', '//', '%']
+        expr_parts = []
+        
+        # 生成第一个操作数
+        max_first_op = max(1, value // 2)
+        first_op = random.randint(1, max_first_op)
+        expr_parts.append(str(first_op))
+        
+        remaining = value - first_op
+        
+        # 生成后续操作
+        while remaining != 0:
+            op = random.choice(operations)
+            if op == '+':
+                next_op = random.randint(1, remaining)
+                expr_parts.append('+')
+                expr_parts.append(str(next_op))
+                remaining -= next_op
+            elif op == '-':
+                # 确保结果不会为负
+                next_op = random.randint(1, value // 2)
+                expr_parts.append('-')
+                expr_parts.append(str(next_op))
+                expr_parts.append('+')
+                expr_parts.append(str(next_op + remaining))
+                remaining = 0
+            elif op == '*':
+                # 因子枚举走缓存的 O(√n) 辅助函数，
+                # 重复出现的字面量只计算一次
+                factors = self._factors(value)
+
+                if factors:
+                    factor = random.choice(factors)
+                    expr_parts.append('*')
+                    expr_parts.append(str(factor))
+                    expr_parts.append('*')
+                    expr_parts.append(str(value // factor))
+                    remaining = 0
+                else:
+                    # 如果没有因子，使用加法
+                    expr_parts.append('+')
+                    expr_parts.append(str(remaining))
+                    remaining = 0
+            elif op == '//' or op == '%':
+                # 生成整除或取模表达式
+                divisor = random.randint(2, 10)
+                quotient = value // divisor
+                remainder = value % divisor
+                if op == '//':
+                    expr_parts.append('*')
+                    expr_parts.append(str(divisor))
+                    expr_parts.append('//')
+                    expr_parts.append(str(divisor))
+                else:
+                    expr_parts.append('*')
+                    expr_parts.append(str(divisor))
+                    expr_parts.append('%')
+                    expr_parts.append(str(divisor))
+                    expr_parts.append('+')
+                    expr_parts.append(str(remainder))
+                remaining = 0
+        
+        return ' '.join(expr_parts)
+    
+    def _add_polymorphic_encoding(self, code):
+        """添加多态编码
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 生成多态编码函数
+        encode_id, decode_id = random.sample(range(1000, 10000), 2)
+        encode_func = f"_encode_{encode_id}"
+        decode_func = f"_decode_{decode_id}"
+
+        # 生成随机编码表：一次批量产出 256 个值（有 numpy 时在 C 层
+        # 完成），替代 256 次 Python 级 randint 调用
+        if self._rng is not None:
+            encoded_values = self._rng.integers(
+                0, 256, size=256, dtype=_np.uint8).tobytes()
+        else:
+            encoded_values = bytes(random.choices(range(256), k=256))
+
+        # 逆表按下标回填，后写的下标覆盖先写的（与字典语义一致）
+        decode_values = bytearray(256)
+        for i, encoded in enumerate(encoded_values):
+            decode_values[encoded] = i
+
+        # 添加编码函数：bytes.fromhex 字面量比 256 项字典小一个
+        # 数量级，运行时解析也只是一次十六进制解码
+        encode_code = f"""
+{encode_func} = bytes.fromhex('{encoded_values.hex()}')
+
+{decode_func} = bytes.fromhex('{bytes(decode_values).hex()}')
+
+"""
+
+        return _skip.wrap(encode_code) + code
+    
+    def _add_encoding_table(self, code):
+        """添加编码表
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 生成编码表，解码函数引用同一张表
+        table_name = f"_encoding_table_{self._next_id()}"
+        encoding_table = self._generate_encoding_table(table_name)
+        decode_function = self._generate_decode_function(table_name)
+        
+        # 添加到代码开头（表和解码函数带跳过标记）
+        prefix = _skip.wrap(f"{encoding_table}\n{decode_function}\n")
+
+        return prefix + code
+    
+    def _generate_encoding_table(self, table_name):
+        """生成编码表
+
+        Args:
+            table_name: 编码表变量名
+
+        Returns:
+            str: 编码表代码
+        """
+        # 生成随机编码表：一次批量产出 256 字节（有 numpy 时在 C 层
+        # 完成），以 bytes.fromhex 字面量发射——512 个字符即可描述
+        # 整表，translate 也能直接把它当转换表用
+        if self._rng is not None:
+            table = self._rng.integers(0, 256, size=256,
+                                       dtype=_np.uint8).tobytes()
+        else:
+            table = bytes(random.choices(range(256), k=256))
+
+        # 生成编码表代码
+        table_code = f"{table_name} = bytes.fromhex('{table.hex()}')"
+
+        return table_code
+    
+    def _generate_decode_function(self, table_name):
+        """生成解码函数
+
+        Args:
+            table_name: 引用的编码表变量名
+
+        Returns:
+            str: 解码函数代码
+        """
+        func_name = f"_decode_{self._next_id()}"
+
+        # 生成解码函数：编码表本身就是 256 字节的转换表，
+        # translate 在 C 层单次遍历缓冲区，没有逐字符的解释器开销
+        func_code = (
+            f"def {func_name}(data):\n"
+            f"    return data.encode('latin1')"
+            f".translate({table_name}).decode('latin1')"
+        )
+
+        return func_code
+    
+    def _encrypt_strings(self, code):
+        """加密字符串
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 整个文件共用一把密钥和一个 AES-CTR 流：所有字符串背靠背
+        # 写入同一个加密器，只构造一次 Cipher；CTR 是流密码，
+        # 不需要 PKCS7 填充，各串按 (偏移, 长度) 定位
+        key = os.urandom(32)    # AES-256 需要 32 字节密钥
+        nonce = os.urandom(16)  # CTR 计数器初始值
+        cipher = Cipher(
+            algorithms.AES(key),
+            modes.CTR(nonce),
+            backend=_BACKEND
+        )
+        encryptor = cipher.encryptor()
+
+        decrypt_func = f"_decrypt_{self._next_id()}"
+        var_definitions = []
+        var_map = {}
+        var_names = []
+        cipher_chunks = []
+        offset = 0
+
+        # 单遍 finditer 扫描，输出片段收集进列表后一次拼接
+        out = []
+        last = 0
+
+        for match in _STRING_RE.finditer(code):
+            # 获取字符串内容：两种引号共用同一个命名组，
+            # 每个匹配只做一次组查找
+            string = match.group('body')
+
+            # 只处理非空字符串
+            if not string:
+                continue
+
+            # 相同字符串复用已生成的变量：setdefault 一次哈希
+            # 完成查找与登记，新下标才走加密与定义生成分支
+            idx = var_map.setdefault(string, len(var_map))
+            if idx == len(var_names):
+                # 追加到共享密文流，记录偏移和字节长度
+                data = string.encode('utf-8')
+                cipher_chunks.append(encryptor.update(data))
+                var_names.append(f"_str_{self._next_id()}")
+                var_definitions.append(
+                    f"{var_names[idx]} = {decrypt_func}"
+                    f"({offset}, {len(data)})\n")
+                offset += len(data)
+            var_name = var_names[idx]
+
+            out.append(code[last:match.start()])
+            out.append(var_name)
+            last = match.end()
+
+        # 没有可加密的字符串时保持原代码不变
+        if not var_definitions:
+            return code
+
+        out.append(code[last:])
+        transformed_code = ''.join(out)
+        blob_hex = (b''.join(cipher_chunks) + encryptor.finalize()).hex()
+
+        # 组合所有部分
+        return (self._generate_shared_decrypt(decrypt_func, key, nonce,
+                                              blob_hex)
+                + ''.join(var_definitions) + transformed_code)
+
+    def _generate_shared_decrypt(self, decrypt_func, key, nonce, blob_hex):
+        """生成共享解密函数代码
+
+        首次调用解密整个密文流并缓存，之后每个字符串只是一次切片。
+
+        Args:
+            decrypt_func: 解密函数名
+            key: AES 密钥
+            nonce: CTR 计数器初始值
+            blob_hex: 密文流的十六进制表示
+
+        Returns:
+            str: 解密函数代码（带跳过标记，后续变换不再扫描密文）
+        """
+        return _skip.wrap(f"""
+def {decrypt_func}(offset, length, _cache=[]):
+    if not _cache:
+        import binascii
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        from cryptography.hazmat.backends import default_backend
+
+        cipher = Cipher(
+            algorithms.AES(binascii.unhexlify('{key.hex()}')),
+            modes.CTR(binascii.unhexlify('{nonce.hex()}')),
+            backend=default_backend()
+        )
+        decryptor = cipher.decryptor()
+        _cache.append(decryptor.update(
+            binascii.unhexlify('{blob_hex}')) + decryptor.finalize())
+    return _cache[0][offset:offset + length].decode('utf-8')
+
+""")
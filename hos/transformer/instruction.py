@@ -1,291 +1,321 @@
-"""指令级变换模块"""
-
-import random
-import re
-
-class InstructionTransformer:
-    """指令级变换"""
-    
-    def __init__(self):
-        """初始化指令级变换器"""
-        self.inject_counter = 0
-        self.subst_counter = 0
-    
-    def transform(self, code, strategy):
-        """应用指令级变换
-        
-        Args:
-            code: 源代码字符串
-            strategy: 混淆策略
-            
-        Returns:
-            str: 变换后的代码
-        """
-        transformed_code = code
-        
-        # 应用垃圾指令注入
-        if strategy.instruction.get('garbage_injection', False):
-            transformed_code = self._inject_garbage_instructions(transformed_code)
-        
-        # 应用等价指令替换
-        if strategy.instruction.get('instruction_substitution', False):
-            transformed_code = self._substitute_instructions(transformed_code)
-        
-        # 应用寄存器分配混淆
-        if strategy.instruction.get('register_allocation', False):
-            transformed_code = self._obfuscate_register_allocation(transformed_code)
-        
-        return transformed_code
-    
-    def _inject_garbage_instructions(self, code):
-        """注入垃圾指令
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找函数定义
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 注入垃圾指令
-            injected_body = self._inject_garbage_into_body(body)
-            
-            # 重建函数定义
-            return f"def {function_name}({params}):\n{injected_body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _inject_garbage_into_body(self, body):
-        """向函数体注入垃圾指令
-        
-        Args:
-            body: 函数体代码
-            
-        Returns:
-            str: 注入后的函数体
-        """
-        lines = body.strip().split('\n')
-        if not lines:
-            return body
-        
-        # 获取缩进
-        indent = self._get_indent(body)
-        
-        # 生成垃圾指令
-        garbage_instructions = self._generate_garbage_instructions(indent)
-        
-        # 注入垃圾指令
-        injected_lines = []
-        for i, line in enumerate(lines):
-            injected_lines.append(line)
-            
-            # 每3行注入一次垃圾指令
-            if (i + 1) % 3 == 0:
-                injected_lines.extend(garbage_instructions)
-        
-        return '\n'.join(injected_lines)
-    
-    def _generate_garbage_instructions(self, indent):
-        """生成垃圾指令
-        
-        Args:
-            indent: 缩进
-            
-        Returns:
-            list: 垃圾指令列表
-        """
-        garbage = []
-        
-        # 生成随机垃圾指令
-        garbage_types = [
-            self._generate_useless_calculation,
-            self._generate_useless_assignment,
-            self._generate_useless_condition,
-            self._generate_useless_loop
-        ]
-        
-        # 随机选择2-4条垃圾指令
-        num_instructions = random.randint(2, 4)
-        for _ in range(num_instructions):
-            gen_func = random.choice(garbage_types)
-            instruction = gen_func(indent)
-            garbage.append(instruction)
-        
-        return garbage
-    
-    def _generate_useless_calculation(self, indent):
-        """生成无用的计算
-        
-        Args:
-            indent: 缩进
-            
-        Returns:
-            str: 无用计算指令
-        """
-        var1 = f"_garbage_{random.randint(1000, 9999)}"
-        var2 = f"_garbage_{random.randint(1000, 9999)}"
-        
-        # 生成随机计算
-        op1 = random.randint(1, 100)
-        op2 = random.randint(1, 100)
-        op = random.choice(['+', '-', '*', '/'])
-        
-        return f"{indent}{var1} = {op1} {op} {op2}\n{indent}{var2} = {var1} % 10"
-    
-    def _generate_useless_assignment(self, indent):
-        """生成无用的赋值
-        
-        Args:
-            indent: 缩进
-            
-        Returns:
-            str: 无用赋值指令
-        """
-        var = f"_garbage_{random.randint(1000, 9999)}"
-        values = [
-            random.randint(1, 100),
-            random.choice(['True', 'False', 'None']),
-            f"'{'x' * random.randint(1, 10)}'",
-            '[]',
-            '{}',
-            '()'
-        ]
-        value = random.choice(values)
-        
-        return f"{indent}{var} = {value}"
-    
-    def _generate_useless_condition(self, indent):
-        """生成无用的条件
-        
-        Args:
-            indent: 缩进
-            
-        Returns:
-            str: 无用条件指令
-        """
-        var = f"_garbage_{random.randint(1000, 9999)}"
-        cond = random.choice([
-            f"{var} == 0",
-            f"{var} is not None",
-            f"len({var}) > 0",
-            "True",
-            "False"
-        ])
-        
-        return f"{indent}{var} = False\n{indent}if {cond}:\n{indent}    pass"
-    
-    def _generate_useless_loop(self, indent):
-        """生成无用的循环
-        
-        Args:
-            indent: 缩进
-            
-        Returns:
-            str: 无用循环指令
-        """
-        var = f"_garbage_{random.randint(1000, 9999)}"
-        limit = random.randint(1, 5)
-        
-        return f"{indent}for {var} in range({limit}):\n{indent}    pass"
-    
-    def _substitute_instructions(self, code):
-        """替换等价指令
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 替换常见的指令为等价形式
-        substitutions = [
-            # 替换 True/False
-            (r'\bTrue\b', 'not False'),
-            (r'\bFalse\b', 'not True'),
-            
-            # 替换空容器
-            (r'\[\s*\]', 'list()'),
-            (r'\{\s*\}', 'dict()'),
-            (r'\(\s*\)', 'tuple()'),
-            
-            # 替换算术操作
-            (r'(\d+)\s*\+\s*(\d+)', r'((\1) + (\2))'),
-            (r'(\d+)\s*\*\s*(\d+)', r'((\1) * (\2))'),
-            
-            # 替换比较操作
-            (r'(\w+)\s*==\s*(\w+)', r'not ((\1) != (\2))'),
-            (r'(\w+)\s*!=\s*(\w+)', r'not ((\1) == (\2))'),
-            (r'(\w+)\s*>\s*(\w+)', r'not ((\1) <= (\2))'),
-            (r'(\w+)\s*<\s*(\w+)', r'not ((\1) >= (\2))'),
-        ]
-        
-        # 应用替换
-        for pattern, replacement in substitutions:
-            code = re.sub(pattern, replacement, code)
-        
-        return code
-    
-    def _obfuscate_register_allocation(self, code):
-        """混淆寄存器分配
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找变量名
-        var_pattern = re.compile(r'\b([a-zA-Z_][a-zA-Z0-9_]*)\b')
-        
-        # 收集所有变量名
-        vars = set()
-        for match in var_pattern.finditer(code):
-            var = match.group(1)
-            # 跳过内置函数和关键字
-            if var not in ['def', 'class', 'if', 'else', 'for', 'while', 'return', 'pass', 'import', 'from']:
-                vars.add(var)
-        
-        # 生成变量映射
-        var_map = {}
-        for var in vars:
-            if not var.startswith('_'):
-                var_map[var] = f"_reg_{random.randint(1000, 9999)}"
-        
-        # 替换变量名
-        obfuscated_code = code
-        for old_var, new_var in var_map.items():
-            # 使用边界匹配确保只替换完整的变量名
-            pattern = rf'\b{old_var}\b'
-            obfuscated_code = re.sub(pattern, new_var, obfuscated_code)
-        
-        return obfuscated_code
-    
-    def _get_indent(self, code):
-        """获取代码的缩进
-        
-        Args:
-            code: 代码字符串
-            
-        Returns:
-            str: 缩进字符串
-        """
-        lines = code.strip().split('\n')
-        if not lines:
-            return ''
-        
-        first_line = lines[0]
-        indent = ''
-        for char in first_line:
-            if char in (' ', '\t'):
-                indent += char
-            else:
-                break
-        
-        return indent
+"""指令级变换模块"""
+
+import random
+import re
+
+from hos.transformer import _skip
+
+# 预编译的变换正则表达式（模块加载时编译一次，避免每次 transform 重新编译）
+_FUNC_RE = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
+_VAR_RE = re.compile(r'\b([a-zA-Z_][a-zA-Z0-9_]*)\b')
+_INDENT_RE = re.compile(r'[ \t]*')
+
+# 等价指令替换规则（模式在模块加载时编译）
+_SUBSTITUTIONS = [(re.compile(p), r) for p, r in [
+    # 替换 True/False
+    (r'\bTrue\b', 'not False'),
+    (r'\bFalse\b', 'not True'),
+
+    # 替换空容器
+    (r'\[\s*\]', 'list()'),
+    (r'\{\s*\}', 'dict()'),
+    (r'\(\s*\)', 'tuple()'),
+
+    # 替换算术操作
+    (r'(\d+)\s*\+\s*(\d+)', r'((\1) + (\2))'),
+    (r'(\d+)\s*\*\s*(\d+)', r'((\1) * (\2))'),
+
+    # 替换比较操作
+    (r'(\w+)\s*==\s*(\w+)', r'not ((\1) != (\2))'),
+    (r'(\w+)\s*!=\s*(\w+)', r'not ((\1) == (\2))'),
+    (r'(\w+)\s*>\s*(\w+)', r'not ((\1) <= (\2))'),
+    (r'(\w+)\s*<\s*(\w+)', r'not ((\1) >= (\2))'),
+]]
+
+# 所有规则融合成一条交替式：每个位置只对原文匹配一次，规则的
+# 输出不会再被后续规则二次改写（逐条 sub 时 True → not False →
+# not not True 这类级联会让输出反复膨胀）
+_SUBSTITUTION_RE = re.compile('|'.join(
+    f'(?P<r{i}>{pattern.pattern})'
+    for i, (pattern, _) in enumerate(_SUBSTITUTIONS)))
+
+def _substitute_match(match):
+    """按命中的规则分支展开替换文本
+
+    Args:
+        match: _SUBSTITUTION_RE 的匹配对象
+
+    Returns:
+        str: 替换文本
+    """
+    pattern, replacement = _SUBSTITUTIONS[int(match.lastgroup[1:])]
+    return pattern.fullmatch(match.group(match.lastgroup)).expand(replacement)
+
+class InstructionTransformer:
+    """指令级变换"""
+    
+    def __init__(self):
+        """初始化指令级变换器"""
+        self.inject_counter = 0
+        self.subst_counter = 0
+    
+    def transform(self, code, strategy):
+        """应用指令级变换
+        
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 空白输入没有可变换的内容，直接返回
+        if not code.strip():
+            return code
+
+        transformed_code = code
+
+        # 应用垃圾指令注入
+        if strategy.instruction.get('garbage_injection', False):
+            transformed_code = self._inject_garbage_instructions(transformed_code)
+        
+        # 应用等价指令替换
+        if strategy.instruction.get('instruction_substitution', False):
+            transformed_code = self._substitute_instructions(transformed_code)
+        
+        # 应用寄存器分配混淆
+        if strategy.instruction.get('register_allocation', False):
+            transformed_code = self._obfuscate_register_allocation(transformed_code)
+        
+        return transformed_code
+    
+    def _inject_garbage_instructions(self, code):
+        """注入垃圾指令
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 寻找函数定义
+        def replace_function(match):
+            function_name = match.group(1)
+            params = match.group(2)
+            body = match.group(3)
+            
+            # 注入垃圾指令
+            injected_body = self._inject_garbage_into_body(body)
+            
+            # 重建函数定义
+            return f"def {function_name}({params}):\n{injected_body}"
+        
+        return _FUNC_RE.sub(replace_function, code)
+    
+    def _inject_garbage_into_body(self, body):
+        """向函数体注入垃圾指令
+        
+        Args:
+            body: 函数体代码
+            
+        Returns:
+            str: 注入后的函数体
+        """
+        lines = body.strip().split('\n')
+        if not lines:
+            return body
+        
+        # 获取缩进
+        indent = self._get_indent(body)
+        
+        # 生成垃圾指令
+        garbage_instructions = self._generate_garbage_instructions(indent)
+        
+        # 注入垃圾指令
+        injected_lines = []
+        for i, line in enumerate(lines):
+            injected_lines.append(line)
+            
+            # 每3行注入一次垃圾指令
+            if (i + 1) % 3 == 0:
+                injected_lines.extend(garbage_instructions)
+        
+        return '\n'.join(injected_lines)
+    
+    def _generate_garbage_instructions(self, indent):
+        """生成垃圾指令
+        
+        Args:
+            indent: 缩进
+            
+        Returns:
+            list: 垃圾指令列表
+        """
+        garbage = []
+        
+        # 生成随机垃圾指令
+        garbage_types = [
+            self._generate_useless_calculation,
+            self._generate_useless_assignment,
+            self._generate_useless_condition,
+            self._generate_useless_loop
+        ]
+        
+        # 随机选择2-4条垃圾指令（生成器一次批量抽取）
+        num_instructions = random.randint(2, 4)
+        for gen_func in random.choices(garbage_types, k=num_instructions):
+            garbage.append(gen_func(indent))
+
+        return garbage
+    
+    def _generate_useless_calculation(self, indent):
+        """生成无用的计算
+        
+        Args:
+            indent: 缩进
+            
+        Returns:
+            str: 无用计算指令
+        """
+        var1 = f"_garbage_{random.randint(1000, 9999)}"
+        var2 = f"_garbage_{random.randint(1000, 9999)}"
+        
+        # 生成随机计算
+        op1 = random.randint(1, 100)
+        op2 = random.randint(1, 100)
+        op = random.choice(['+', '-', '*', '/'])
+        
+        return f"{indent}{var1} = {op1} {op} {op2}\n{indent}{var2} = {var1} % 10"
+    
+    def _generate_useless_assignment(self, indent):
+        """生成无用的赋值
+        
+        Args:
+            indent: 缩进
+            
+        Returns:
+            str: 无用赋值指令
+        """
+        var = f"_garbage_{random.randint(1000, 9999)}"
+        values = [
+            random.randint(1, 100),
+            random.choice(['True', 'False', 'None']),
+            f"'{'x' * random.randint(1, 10)}'",
+            '[]',
+            '{}',
+            '()'
+        ]
+        value = random.choice(values)
+        
+        return f"{indent}{var} = {value}"
+    
+    def _generate_useless_condition(self, indent):
+        """生成无用的条件
+        
+        Args:
+            indent: 缩进
+            
+        Returns:
+            str: 无用条件指令
+        """
+        var = f"_garbage_{random.randint(1000, 9999)}"
+        cond = random.choice([
+            f"{var} == 0",
+            f"{var} is not None",
+            f"len({var}) > 0",
+            "True",
+            "False"
+        ])
+        
+        return f"{indent}{var} = False\n{indent}if {cond}:\n{indent}    pass"
+    
+    def _generate_useless_loop(self, indent):
+        """生成无用的循环
+        
+        Args:
+            indent: 缩进
+            
+        Returns:
+            str: 无用循环指令
+        """
+        var = f"_garbage_{random.randint(1000, 9999)}"
+        limit = random.randint(1, 5)
+        
+        return f"{indent}for {var} in range({limit}):\n{indent}    pass"
+    
+    def _substitute_instructions(self, code):
+        """替换等价指令
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 单遍融合交替式替换：规则间不再级联；subn 的命中计数
+        # 为零时原样返回输入，跳过无事可做的一趟
+        new_code, count = _SUBSTITUTION_RE.subn(_substitute_match, code)
+        if not count:
+            return code
+        return new_code
+    
+    def _obfuscate_register_allocation(self, code):
+        """混淆寄存器分配
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 哨兵标记内的生成代码（解密函数、编码表）不参与收集
+        # 和替换，改名不会碰到其内部的导入和辅助变量
+        segments = _skip.split(code)
+
+        # 收集所有变量名
+        vars = set()
+        for is_skip, text in segments:
+            if is_skip:
+                continue
+            for match in _VAR_RE.finditer(text):
+                var = match.group(1)
+                # 跳过内置函数和关键字
+                if var not in ['def', 'class', 'if', 'else', 'for', 'while', 'return', 'pass', 'import', 'from']:
+                    vars.add(var)
+        
+        # 生成变量映射
+        var_map = {}
+        for var in vars:
+            if not var.startswith('_'):
+                var_map[var] = f"_reg_{random.randint(1000, 9999)}"
+        
+        if not var_map:
+            return code
+
+        # 替换变量名：所有旧名合并成一条交替式单遍替换，
+        # 替代每个变量各扫一遍全文；按长度降序排列避免前缀遮蔽
+        pattern = re.compile(
+            r'\b(' + '|'.join(
+                re.escape(var)
+                for var in sorted(var_map, key=len, reverse=True)
+            ) + r')\b')
+        return ''.join(
+            text if is_skip else pattern.sub(
+                lambda m: var_map[m.group(1)], text)
+            for is_skip, text in segments)
+    
+    def _get_indent(self, code):
+        """获取代码的缩进
+        
+        Args:
+            code: 代码字符串
+            
+        Returns:
+            str: 缩进字符串
+        """
+        lines = code.strip().split('\n')
+        if not lines:
+            return ''
+
+        # 单次正则匹配取出前导空白，替代逐字符拼接
+        return _INDENT_RE.match(lines[0]).group(0)
@@ -1,5 +1,7 @@
 """代码变换引擎主入口"""
 
+import os
+
 from hos.transformer.control_flow import ControlFlowTransformer
 from hos.transformer.data import DataTransformer
 from hos.transformer.instruction import InstructionTransformer
@@ -51,24 +53,112 @@ class CodeTransformer:
         
         return transformed_code
     
-    def transform_file(self, input_path, output_path, strategy):
+    def transform_file(self, input_path, output_path, strategy,
+                       emit_pyc=False):
         """变换文件
-        
+
+        输入用 mmap 映射进地址空间，由操作系统按需分页，直接在映射
+        上解码省去中间字节缓冲（与 ProcessorFactory.analyze_file 的
+        读取路径一致）；输出经由 os.write 一次写出。
+
+        emit_pyc 打开时额外写出对应的 .pyc：生成代码体积很大（编码
+        表、密文串、解密前导），提前编译一次可以让使用方导入时跳过
+        解析编译开销。
+
         Args:
             input_path: 输入文件路径
             output_path: 输出文件路径
             strategy: 混淆策略
+            emit_pyc: 是否同时写出预编译的 .pyc 文件
         """
+        import mmap
+
         # 读取文件
-        with open(input_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-        
+        with open(input_path, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0,
+                               access=mmap.ACCESS_READ) as mm:
+                    code = mm[:].decode('utf-8')
+            except ValueError:
+                # 空文件无法映射
+                code = f.read().decode('utf-8')
+
         # 变换代码
         transformed_code = self.transform(code, strategy)
-        
+
         # 写入文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(transformed_code)
+        fd = os.open(output_path,
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, transformed_code.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+        # 可选：预编译成字节码，消费方导入时不再付解析编译成本
+        if emit_pyc:
+            self._emit_pyc(transformed_code, output_path)
+
+    def _emit_pyc(self, transformed_code, output_path):
+        """把变换结果预编译为 .pyc 写到标准缓存位置
+
+        Args:
+            transformed_code: 变换后的代码
+            output_path: 对应 .py 文件的路径
+        """
+        import importlib._bootstrap_external
+        import importlib.util
+
+        code_obj = compile(transformed_code, output_path, 'exec')
+        data = importlib._bootstrap_external._code_to_timestamp_pyc(code_obj)
+        pyc_path = importlib.util.cache_from_source(output_path)
+        os.makedirs(os.path.dirname(pyc_path), exist_ok=True)
+        fd = os.open(pyc_path,
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def transform_files(self, paths, strategy, max_workers=None):
+        """并行变换多个独立的源文件
+
+        文件之间没有共享状态，用进程池按文件分发；单文件或单进程时
+        退化为串行，避免进程池的启动开销（与
+        ProcessorFactory.analyze_many 的分发方式一致）。
+
+        Args:
+            paths: (输入路径, 输出路径) 元组列表
+            strategy: 混淆策略
+            max_workers: 工作进程数，默认为 CPU 核心数
+        """
+        paths = list(paths)
+        if not paths:
+            return
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        if max_workers <= 1 or len(paths) == 1:
+            for input_path, output_path in paths:
+                self.transform_file(input_path, output_path, strategy)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        tasks = [(input_path, output_path, strategy)
+                 for input_path, output_path in paths]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_transform_one, tasks))
+
+def _transform_one(task):
+    """变换单个文件（模块级函数，可被进程池序列化分发）
+
+    Args:
+        task: (输入路径, 输出路径, 策略) 元组
+    """
+    input_path, output_path, strategy = task
+    transformer = CodeTransformer()
+    transformer.transform_file(input_path, output_path, strategy)
 
 # 便捷函数
 def transform(code, strategy):
@@ -1,378 +1,542 @@
-"""运行时保护层模块"""
-
-import random
-import re
-import os
-import sys
-import time
-
-class RuntimeProtector:
-    """运行时保护层"""
-    
-    def __init__(self):
-        """初始化运行时保护层"""
-        self.protect_counter = 0
-    
-    def transform(self, code, strategy):
-        """应用运行时保护
-        
-        Args:
-            code: 源代码字符串
-            strategy: 混淆策略
-            
-        Returns:
-            str: 变换后的代码
-        """
-        transformed_code = code
-        
-        # 应用调试器检测
-        if strategy.runtime.get('debugger_detection', False):
-            transformed_code = self._add_debugger_detection(transformed_code)
-        
-        # 应用内存完整性校验
-        if strategy.runtime.get('memory_integrity', False):
-            transformed_code = self._add_memory_integrity_check(transformed_code)
-        
-        # 应用时序检测
-        if strategy.runtime.get('timing_detection', False):
-            transformed_code = self._add_timing_detection(transformed_code)
-        
-        # 应用环境绑定
-        if strategy.runtime.get('environment_binding', False):
-            transformed_code = self._add_environment_binding(transformed_code)
-        
-        # 应用防篡改
-        if strategy.runtime.get('anti_tampering', False):
-            transformed_code = self._add_anti_tampering(transformed_code)
-        
-        return transformed_code
-    
-    def _add_debugger_detection(self, code):
-        """添加调试器检测
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成调试器检测函数
-        debugger_detection = self._generate_debugger_detection()
-        
-        # 添加到代码开头
-        code = debugger_detection + '\n\n' + code
-        
-        # 在函数开头添加检测
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 添加检测调用
-            indent = self._get_indent(body)
-            detection_call = f"{indent}_check_debugger()\n"
-            body = detection_call + body
-            
-            return f"def {function_name}({params}):\n{body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _generate_debugger_detection(self):
-        """生成调试器检测函数
-        
-        Returns:
-            str: 调试器检测函数代码
-        """
-        detection_code = "def _check_debugger():\n"
-        detection_code += "    import sys\n"
-        detection_code += "    import os\n"
-        detection_code += "    # 检测调试器\n"
-        detection_code += "    # 方法1: 检查traceback模块\n"
-        detection_code += "    try:\n"
-        detection_code += "        import traceback\n"
-        detection_code += "        # 检查调用栈深度\n"
-        detection_code += "        if len(traceback.extract_stack()) > 10:\n"
-        detection_code += "            raise RuntimeError('调试器检测到!')\n"
-        detection_code += "    except:\n"
-        detection_code += "        pass\n"
-        detection_code += "    # 方法2: 检查进程名\n"
-        detection_code += "    try:\n"
-        detection_code += "        import psutil\n"
-        detection_code += "        current_process = psutil.Process(os.getpid())\n"
-        detection_code += "        # 检查是否有调试器附加\n"
-        detection_code += "        for proc in psutil.process_iter(['name']):\n"
-        detection_code += "            try:\n"
-        detection_code += "                if 'debug' in proc.info['name'].lower():\n"
-        detection_code += "                    raise RuntimeError('调试器检测到!')\n"
-        detection_code += "            except:\n"
-        detection_code += "                pass\n"
-        detection_code += "    except ImportError:\n"
-        detection_code += "        pass\n"
-        detection_code += "    return True"
-        
-        return detection_code
-    
-    def _add_memory_integrity_check(self, code):
-        """添加内存完整性校验
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成内存完整性校验函数
-        integrity_check = self._generate_memory_integrity_check()
-        
-        # 添加到代码开头
-        code = integrity_check + '\n\n' + code
-        
-        # 在函数开头添加检测
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 添加检测调用
-            indent = self._get_indent(body)
-            detection_call = f"{indent}_check_memory_integrity('{function_name}')\n"
-            body = detection_call + body
-            
-            return f"def {function_name}({params}):\n{body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _generate_memory_integrity_check(self):
-        """生成内存完整性校验函数
-        
-        Returns:
-            str: 内存完整性校验函数代码
-        """
-        check_code = "def _check_memory_integrity(function_name):\n"
-        check_code += "    import hashlib\n"
-        check_code += "    import inspect\n"
-        check_code += "    # 计算函数代码的哈希值\n"
-        check_code += "    try:\n"
-        check_code += "        # 获取调用者的代码\n"
-        check_code += "        caller_frame = inspect.currentframe().f_back\n"
-        check_code += "        caller_code = inspect.getsource(caller_frame)\n"
-        check_code += "        # 计算哈希值\n"
-        check_code += "        expected_hash = hashlib.md5(caller_code.encode()).hexdigest()\n"
-        check_code += "        # 这里应该存储预期的哈希值\n"
-        check_code += "        # 简化版：只检查代码是否被修改\n"
-        check_code += "        if len(caller_code) < 10:\n"
-        check_code += "            raise RuntimeError('代码被篡改!')\n"
-        check_code += "    except:\n"
-        check_code += "        pass\n"
-        check_code += "    return True"
-        
-        return check_code
-    
-    def _add_timing_detection(self, code):
-        """添加时序检测
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成时序检测函数
-        timing_detection = self._generate_timing_detection()
-        
-        # 添加到代码开头
-        code = timing_detection + '\n\n' + code
-        
-        # 在函数开头和结尾添加检测
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 添加检测调用
-            indent = self._get_indent(body)
-            start_call = f"{indent}_start_timing()\n"
-            
-            # 在函数结尾添加结束检测
-            lines = body.strip().split('\n')
-            if lines:
-                # 找到return语句
-                for i in range(len(lines)-1, -1, -1):
-                    if 'return' in lines[i]:
-                        lines[i] = f"{indent}_check_timing()\n{lines[i]}"
-                        break
-                else:
-                    # 如果没有return语句，在最后添加
-                    lines.append(f"{indent}_check_timing()")
-                body = '\n'.join(lines)
-            
-            body = start_call + body
-            
-            return f"def {function_name}({params}):\n{body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _generate_timing_detection(self):
-        """生成时序检测函数
-        
-        Returns:
-            str: 时序检测函数代码
-        """
-        timing_code = "_start_time = 0\n"
-        timing_code += "def _start_timing():\n"
-        timing_code += "    global _start_time\n"
-        timing_code += "    import time\n"
-        timing_code += "    _start_time = time.time()\n"
-        timing_code += "\n"
-        timing_code += "def _check_timing():\n"
-        timing_code += "    global _start_time\n"
-        timing_code += "    import time\n"
-        timing_code += "    current_time = time.time()\n"
-        timing_code += "    elapsed = current_time - _start_time\n"
-        timing_code += "    # 检查执行时间是否过长（可能被单步调试）\n"
-        timing_code += "    if elapsed > 10.0:\n"
-        timing_code += "        raise RuntimeError('执行时间过长，可能被调试!')\n"
-        timing_code += "    return True"
-        
-        return timing_code
-    
-    def _add_environment_binding(self, code):
-        """添加环境绑定
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成环境绑定函数
-        env_binding = self._generate_environment_binding()
-        
-        # 添加到代码开头
-        code = env_binding + '\n\n' + code
-        
-        # 在函数开头添加检测
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 添加检测调用
-            indent = self._get_indent(body)
-            binding_call = f"{indent}_check_environment()\n"
-            body = binding_call + body
-            
-            return f"def {function_name}({params}):\n{body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _generate_environment_binding(self):
-        """生成环境绑定函数
-        
-        Returns:
-            str: 环境绑定函数代码
-        """
-        binding_code = "def _check_environment():\n"
-        binding_code += "    import os\n"
-        binding_code += "    import platform\n"
-        binding_code += "    # 收集环境信息\n"
-        binding_code += "    env_info = {}\n"
-        binding_code += "    env_info['os'] = platform.system()\n"
-        binding_code += "    env_info['machine'] = platform.machine()\n"
-        binding_code += "    env_info['python_version'] = platform.python_version()\n"
-        binding_code += "    # 这里应该与预存储的环境信息比较\n"
-        binding_code += "    # 简化版：只检查基本环境\n"
-        binding_code += "    # 实际实现中，应该存储环境指纹并进行比较\n"
-        binding_code += "    return True"
-        
-        return binding_code
-    
-    def _add_anti_tampering(self, code):
-        """添加防篡改
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成防篡改函数
-        anti_tampering = self._generate_anti_tampering()
-        
-        # 添加到代码开头
-        code = anti_tampering + '\n\n' + code
-        
-        # 在函数开头添加检测
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 添加检测调用
-            indent = self._get_indent(body)
-            tampering_call = f"{indent}_check_tampering()\n"
-            body = tampering_call + body
-            
-            return f"def {function_name}({params}):\n{body}"
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _generate_anti_tampering(self):
-        """生成防篡改函数
-        
-        Returns:
-            str: 防篡改函数代码
-        """
-        tampering_code = "def _check_tampering():\n"
-        tampering_code += "    import hashlib\n"
-        tampering_code += "    import os\n"
-        tampering_code += "    # 检查文件完整性\n"
-        tampering_code += "    try:\n"
-        tampering_code += "        # 获取当前文件路径\n"
-        tampering_code += "        import inspect\n"
-        tampering_code += "        current_file = inspect.getfile(inspect.currentframe())\n"
-        tampering_code += "        # 计算文件哈希值\n"
-        tampering_code += "        with open(current_file, 'rb') as f:\n"
-        tampering_code += "            file_hash = hashlib.md5(f.read()).hexdigest()\n"
-        tampering_code += "        # 这里应该存储预期的哈希值\n"
-        tampering_code += "        # 简化版：只检查文件是否存在\n"
-        tampering_code += "        if not os.path.exists(current_file):\n"
-        tampering_code += "            raise RuntimeError('文件不存在!')\n"
-        tampering_code += "    except:\n"
-        tampering_code += "        pass\n"
-        tampering_code += "    return True"
-        
-        return tampering_code
-    
-    def _get_indent(self, code):
-        """获取代码的缩进
-        
-        Args:
-            code: 代码字符串
-            
-        Returns:
-            str: 缩进字符串
-        """
-        lines = code.strip().split('\n')
-        if not lines:
-            return ''
-        
-        first_line = lines[0]
-        indent = ''
-        for char in first_line:
-            if char in (' ', '\t'):
-                indent += char
-            else:
-                break
-        
-        return indent
+"""运行时保护层模块"""
+
+import ast
+import random
+import re
+import os
+import sys
+import time
+
+from hos.transformer import _functions
+
+# 预编译的变换正则表达式（模块加载时编译一次，避免每次 transform 重新编译）
+# （仅作为非 Python 输入的回退路径，AST 主路径见 _functions 模块）
+_FUNC_RE = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
+_LAST_RETURN_RE = re.compile(r'((?s:.*)\n|)^([ \t]*)(return\b[^\n]*)$', re.MULTILINE)
+
+# 检测函数共用的导入前导：只前置一次，守卫函数体内不再执行
+# IMPORT_NAME（每次调用的 sys.modules 查找换成 LOAD_GLOBAL）
+_IMPORT_PROLOGUE = '''\
+import sys, os, time, random, hashlib, inspect, platform, traceback
+try:
+    import psutil
+except ImportError:
+    psutil = None
+# 完整性校验不需要抗碰撞性，可选的 xxhash 比 MD5 快一个数量级
+try:
+    import xxhash
+    def _fast_hash(data):
+        return xxhash.xxh3_64(data).hexdigest()
+except ImportError:
+    def _fast_hash(data):
+        return hashlib.md5(data).hexdigest()
+'''
+
+# 检测函数模板：内容固定，模块加载时定义一次，不在每次变换时重新拼接
+_DEBUGGER_DETECTION_SRC = '''\
+_dbg_cache = {'t': 0.0, 'ok': True}
+def _check_debugger():
+    # 进程枚举要遍历 /proc，结论按时间窗缓存，5 秒内直接复用
+    if time.time() - _dbg_cache['t'] < 5.0:
+        return _dbg_cache['ok']
+    # 检测调试器
+    # 方法1: 检查traceback模块
+    try:
+        import traceback
+        # 检查调用栈深度
+        if len(traceback.extract_stack()) > 10:
+            raise RuntimeError('调试器检测到!')
+    except:
+        pass
+    # 方法2: 检查进程名
+    try:
+        if psutil is None:
+            raise ImportError('psutil')
+        current_process = psutil.Process(os.getpid())
+        # 检查是否有调试器附加
+        for proc in psutil.process_iter(['name']):
+            try:
+                if 'debug' in proc.info['name'].lower():
+                    raise RuntimeError('调试器检测到!')
+            except:
+                pass
+    except ImportError:
+        pass
+    _dbg_cache['t'] = time.time()
+    _dbg_cache['ok'] = True
+    return True'''
+
+_MEMORY_INTEGRITY_SRC = '''\
+def _make_integrity_checker():
+    # 每个被守卫的函数拿到专属检查闭包：指纹存在闭包的默认参数
+    # 里，稳态调用只剩一次全局查找和一次列表判真，没有参数传递
+    # 和字典寻址
+    def _check(_cache=[]):
+        if not _cache:
+            co = sys._getframe(1).f_code
+            try:
+                caller_code = inspect.getsource(co)
+                # 简化版：只检查代码是否被修改
+                if len(caller_code) < 10:
+                    raise RuntimeError('代码被篡改!')
+                _cache.append(_fast_hash(caller_code.encode()))
+            except:
+                _cache.append(None)
+        return True
+    return _check
+
+_integrity_cache = {}
+def _check_memory_integrity(function_name):
+    # 通用入口（无法按函数特化时使用）：指纹按 (文件, 行号) 缓存
+    co = sys._getframe(1).f_code
+    key = (co.co_filename, co.co_firstlineno)
+    if key not in _integrity_cache:
+        try:
+            caller_code = inspect.getsource(co)
+            # 简化版：只检查代码是否被修改
+            if len(caller_code) < 10:
+                raise RuntimeError('代码被篡改!')
+            _integrity_cache[key] = _fast_hash(caller_code.encode())
+        except:
+            _integrity_cache[key] = None
+    return True'''
+
+_TIMING_DETECTION_SRC = '''\
+_TIMING_THRESHOLD_NS = 10_000_000_000
+_start_time_ns = 0
+def _start_timing():
+    global _start_time_ns
+    _start_time_ns = time.monotonic_ns()
+
+def _check_timing():
+    # 检查执行时间是否过长（可能被单步调试）；单调时钟不受
+    # 系统时间回拨影响，纳秒整数比较没有浮点开销
+    if time.monotonic_ns() - _start_time_ns > _TIMING_THRESHOLD_NS:
+        raise RuntimeError('执行时间过长，可能被调试!')
+    return True'''
+
+_ENVIRONMENT_BINDING_SRC = '''\
+def _check_environment():
+    # 收集环境信息
+    env_info = {}
+    env_info['os'] = platform.system()
+    env_info['machine'] = platform.machine()
+    env_info['python_version'] = platform.python_version()
+    # 这里应该与预存储的环境信息比较
+    # 简化版：只检查基本环境
+    # 实际实现中，应该存储环境指纹并进行比较
+    return True'''
+
+_ANTI_TAMPERING_SRC = '''\
+_tamper_blocks = {}
+def _check_tampering():
+    # 分块校验文件完整性：首次调用读入整个文件并记录每个 4KB 块
+    # 的指纹，之后每次调用只随机抽查一个块——单次代价 O(4KB)，
+    # 又不像整文件重哈希那样每次都扫完整个文件
+    try:
+        current_file = sys._getframe(1).f_code.co_filename
+        blocks = _tamper_blocks.get(current_file)
+        if blocks is None:
+            with open(current_file, 'rb') as f:
+                data = f.read()
+            _tamper_blocks[current_file] = [
+                _fast_hash(data[i:i + 4096])
+                for i in range(0, max(len(data), 1), 4096)]
+        else:
+            index = random.randrange(len(blocks))
+            with open(current_file, 'rb') as f:
+                f.seek(index * 4096)
+                if _fast_hash(f.read(4096)) != blocks[index]:
+                    raise RuntimeError('文件被篡改!')
+        # 简化版：只检查文件是否存在
+        if not os.path.exists(current_file):
+            raise RuntimeError('文件不存在!')
+    except:
+        pass
+    return True'''
+
+# profile_hook 模式下完整性检查从回调参数拿目标帧，不依赖调用深度
+_FRAME_INTEGRITY_SRC = '''\
+_frame_integrity = {}
+def _check_frame_integrity(frame):
+    co = frame.f_code
+    key = (co.co_filename, co.co_firstlineno)
+    if key not in _frame_integrity:
+        try:
+            caller_code = inspect.getsource(co)
+            # 简化版：只检查代码是否被修改
+            if len(caller_code) < 10:
+                raise RuntimeError('代码被篡改!')
+            _frame_integrity[key] = _fast_hash(caller_code.encode())
+        except:
+            _frame_integrity[key] = None
+    return True'''
+
+# 注入描述表：(策略开关, 检测函数定义, AST 路径调用模板, 回退路径
+# 调用模板)。五种保护的差异全部收敛到这张表里，新增一种保护只需
+# 加一行；时序检测的回退模板为 None，表示走专门的 return 前插入
+_INJECTIONS = (
+    ('debugger_detection', _DEBUGGER_DETECTION_SRC,
+     '_check_debugger()', '_check_debugger()'),
+    ('memory_integrity', _MEMORY_INTEGRITY_SRC,
+     '_check_mi_{name}()', "_check_memory_integrity('{name}')"),
+    ('timing_detection', _TIMING_DETECTION_SRC,
+     '_start_timing()', None),
+    ('environment_binding', _ENVIRONMENT_BINDING_SRC,
+     '_check_environment()', '_check_environment()'),
+    ('anti_tampering', _ANTI_TAMPERING_SRC,
+     '_check_tampering()', '_check_tampering()'),
+)
+
+class RuntimeProtector:
+    """运行时保护层"""
+    
+    def __init__(self):
+        """初始化运行时保护层"""
+        self.protect_counter = 0
+    
+    def transform(self, code, strategy):
+        """应用运行时保护
+
+        所有启用的保护融合在一次 AST 遍历里完成：检测函数的定义拼
+        成一个前导一次前置，每个函数体只在首行（时序检测另在
+        return 处）插入一次组合的检测调用。原先五遍独立扫描每遍都
+        要复制整个源码，融合后字节搬运量只有一遍。
+
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+
+        Returns:
+            str: 变换后的代码
+        """
+        flags = strategy.runtime
+
+        # profile_hook 模式：不改写函数体，发出一条
+        # sys.setprofile 安装语句，检查在 'call' 事件回调里分发
+        if flags.get('profile_hook', False):
+            return self._install_profile_guard(code, flags)
+
+        preludes = []
+        calls = []
+
+        # 按注入表收集检测函数定义和要插入的调用（内存完整性在 AST
+        # 路径上调用按函数特化的无参闭包，省去字符串实参和字典寻址）
+        for flag, src, call, _ in _INJECTIONS:
+            if flags.get(flag, False):
+                preludes.append(src)
+                calls.append(call)
+        timing = flags.get('timing_detection', False)
+        memory = flags.get('memory_integrity', False)
+
+        if not preludes:
+            return code
+
+        try:
+            transformed, names = self._insert_protection(code, calls, timing)
+        except SyntaxError:
+            # 非 Python 输入退回逐遍的正则路径
+            return self._transform_text(code, flags)
+
+        # 为每个被守卫的函数绑定专属完整性闭包
+        if memory and names:
+            preludes.append('\n'.join(
+                f"_check_mi_{name} = _make_integrity_checker()"
+                for name in sorted(set(names))))
+
+        return (_IMPORT_PROLOGUE + '\n' + '\n\n'.join(preludes)
+                + '\n\n' + transformed)
+
+    def transform_batch(self, codes, strategy, max_workers=None):
+        """并行保护多段独立的源代码
+
+        代码段之间没有共享状态，用进程池按段分发；单段或单进程时
+        退化为串行，避免进程池的启动开销（与
+        CodeTransformer.transform_files 的分发方式一致）。
+
+        Args:
+            codes: 源代码字符串列表
+            strategy: 混淆策略
+            max_workers: 工作进程数，默认为 CPU 核心数
+
+        Returns:
+            list: 变换后的代码列表（与输入同序）
+        """
+        codes = list(codes)
+        if not codes:
+            return []
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        if max_workers <= 1 or len(codes) == 1:
+            return [self.transform(code, strategy) for code in codes]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        tasks = [(code, strategy) for code in codes]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_protect_one, tasks))
+
+    def _install_profile_guard(self, code, flags):
+        """经 sys.setprofile 安装检查，不改写任何函数体
+
+        每个函数体注入调用会膨胀源码，且每次进入函数都付一次字节
+        码级调用；这里只发出一条 setprofile 安装语句，检查在解释
+        器的 'call' 事件回调里统一分发。回调对进程内所有调用（包
+        括库内部）都会触发，因此按计数限流，平时只付一次自增和一
+        次按位与。注意：此模式会覆盖宿主已安装的 profiler，保持
+        为策略开关的可选项而非默认。
+
+        Args:
+            code: 源代码字符串
+            flags: 策略的运行时保护开关字典
+
+        Returns:
+            str: 变换后的代码
+        """
+        preludes = []
+        checks = []
+        if flags.get('debugger_detection', False):
+            preludes.append(_DEBUGGER_DETECTION_SRC)
+            checks.append('_check_debugger()')
+        if flags.get('memory_integrity', False):
+            preludes.append(_FRAME_INTEGRITY_SRC)
+            checks.append('_check_frame_integrity(frame)')
+        timing = flags.get('timing_detection', False)
+        if timing:
+            preludes.append(_TIMING_DETECTION_SRC)
+            checks.append('_check_timing()')
+        if flags.get('environment_binding', False):
+            preludes.append(_ENVIRONMENT_BINDING_SRC)
+            checks.append('_check_environment()')
+        if flags.get('anti_tampering', False):
+            preludes.append(_ANTI_TAMPERING_SRC)
+            checks.append('_check_tampering()')
+
+        if not checks:
+            return code
+
+        hook_lines = [
+            '_guard_tick = [0]',
+            'def _guard_profile(frame, event, arg):',
+            "    if event != 'call':",
+            '        return',
+            '    # 按计数限流：每 128 次调用事件检查一轮',
+            '    _guard_tick[0] = (_guard_tick[0] + 1) & 127',
+            '    if _guard_tick[0]:',
+            '        return',
+        ]
+        hook_lines.extend(f'    {check}' for check in checks)
+        if timing:
+            # 每轮抽样检查后重开计时窗口，否则正常运行超过阈值
+            # 后 _check_timing 会必然触发
+            hook_lines.append('    _start_timing()')
+            hook_lines.insert(0, '_start_timing()')
+        hook_lines.append('sys.setprofile(_guard_profile)')
+        preludes.append('\n'.join(hook_lines))
+
+        return (_IMPORT_PROLOGUE + '\n' + '\n\n'.join(preludes)
+                + '\n\n' + code)
+
+    def _insert_protection(self, code, calls, check_timing):
+        """单次 AST 遍历插入全部检测调用
+
+        Args:
+            code: 源代码字符串
+            calls: 插入到函数体首行的调用模板列表（{name} 为函数名）
+            check_timing: 是否在 return 前插入时序校验
+
+        Returns:
+            tuple: (插入后的代码, 被插入的函数名列表)
+
+        Raises:
+            SyntaxError: 输入不是合法的 Python 代码
+        """
+        # (行号, 次序, 文本)：体首插入次序为 0，return 前的时序校验
+        # 为 1 —— 同一行上后插入的排在前面，倒序处理时先插校验、
+        # 再插体首调用，保证 _start_timing 总在 _check_timing 之前
+        insertions = []
+        names = []
+        for node in _functions.function_nodes(code):
+            names.append(node.name)
+            first = node.body[0]
+            indent = ' ' * first.col_offset
+            text = ''.join(f"{indent}{call.format(name=node.name)}\n"
+                           for call in calls)
+            insertions.append((first.lineno, 0, text))
+
+            if check_timing:
+                ret = self._last_return(node)
+                if ret is not None:
+                    ret_indent = ' ' * ret.col_offset
+                    insertions.append(
+                        (ret.lineno, 1, f"{ret_indent}_check_timing()\n"))
+                else:
+                    insertions.append(
+                        (node.end_lineno + 1, 1,
+                         f"{indent}_check_timing()\n"))
+
+        if not insertions:
+            return code, names
+
+        lines = code.splitlines(keepends=True)
+        for lineno, _, text in sorted(insertions, reverse=True):
+            lines.insert(lineno - 1, text)
+        return ''.join(lines), names
+
+    @staticmethod
+    def _last_return(node):
+        """找到函数内最后一个 return 语句（不含嵌套函数的）
+
+        Args:
+            node: 函数定义节点
+
+        Returns:
+            ast.Return: 最后的 return 节点，没有时为 None
+        """
+        last = None
+        stack = list(node.body)
+        while stack:
+            child = stack.pop()
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            if isinstance(child, ast.Return):
+                if last is None or child.lineno > last.lineno:
+                    last = child
+            stack.extend(ast.iter_child_nodes(child))
+        return last
+
+    def _transform_text(self, code, flags):
+        """逐遍的正则保护路径（非 Python 输入的回退）
+
+        Args:
+            code: 源代码字符串
+            flags: 策略的运行时保护开关字典
+
+        Returns:
+            str: 变换后的代码
+        """
+        transformed_code = code
+
+        # 按注入表逐遍应用各项保护
+        for flag, src, _, text_call in _INJECTIONS:
+            if not flags.get(flag, False):
+                continue
+            if text_call is None:
+                # 时序检测要在 return 前补插校验，单独处理
+                transformed_code = self._add_timing_detection(
+                    transformed_code)
+            else:
+                transformed_code = self._insert_detection_calls(
+                    transformed_code, src, text_call)
+
+        # 检测函数共用的导入前导只前置一次
+        if transformed_code is not code:
+            transformed_code = _IMPORT_PROLOGUE + '\n' + transformed_code
+
+        return transformed_code
+    
+    def _insert_detection_calls(self, code, prelude, call):
+        """前置检测函数并在每个函数体首行插入调用
+
+        主路径一次 ast.parse 定位所有函数体起始行、按行切片插入，
+        整体与代码规模线性；原正则 `(.*?)(?=def|$)` 的逐字符回溯在
+        大文件上是平方级的，仅保留为非 Python 输入的回退。插入先在
+        原始代码上进行再前置检测函数，检测函数自身不会被插入对
+        自己的递归调用。
+
+        Args:
+            code: 源代码字符串
+            prelude: 检测函数的定义代码
+            call: 插入的调用语句模板，{name} 会替换成函数名
+
+        Returns:
+            str: 变换后的代码
+        """
+        try:
+            transformed = _functions.insert_body_calls(
+                code, lambda node: [call.format(name=node.name)])
+        except SyntaxError:
+            # 非 Python 输入退回正则路径
+            def replace_function(match):
+                function_name = match.group(1)
+                params = match.group(2)
+                body = match.group(3)
+                indent = self._get_indent(body)
+                detection_call = (
+                    f"{indent}{call.format(name=function_name)}\n")
+                return (f"def {function_name}({params}):\n"
+                        f"{detection_call}{body}")
+
+            return _FUNC_RE.sub(replace_function, prelude + '\n\n' + code)
+
+        return prelude + '\n\n' + transformed
+
+    def _add_timing_detection(self, code):
+        """添加时序检测
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 添加时序检测函数到代码开头
+        code = _TIMING_DETECTION_SRC + '\n\n' + code
+        
+        # 在函数开头和结尾添加检测
+        def replace_function(match):
+            function_name = match.group(1)
+            params = match.group(2)
+            body = match.group(3)
+
+            # 添加检测调用
+            indent = self._get_indent(body)
+            start_call = f"{indent}_start_timing()\n"
+
+            # 在最后一个 return 前插入结束检测：贪婪前缀保证只命中
+            # 末次出现，单次 C 层替换取代逐行倒序扫描
+            new_body, count = _LAST_RETURN_RE.subn(
+                rf'\1{indent}_check_timing()\n\2\3', body.strip(), count=1)
+            if count:
+                body = new_body
+            else:
+                # 如果没有return语句，在最后添加
+                body = f"{body.strip()}\n{indent}_check_timing()"
+
+            body = start_call + body
+
+            return f"def {function_name}({params}):\n{body}"
+
+        return _FUNC_RE.sub(replace_function, code)
+
+    def _get_indent(self, code):
+        """获取代码的缩进
+        
+        Args:
+            code: 代码字符串
+            
+        Returns:
+            str: 缩进字符串
+        """
+        lines = code.strip().split('\n')
+        if not lines:
+            return ''
+
+        # lstrip 在 C 层一次完成，前缀切片即为缩进
+        first_line = lines[0]
+        stripped = first_line.lstrip(' \t')
+        return first_line[:len(first_line) - len(stripped)]
+
+def _protect_one(task):
+    """保护单段代码（模块级函数，可被进程池序列化分发）
+
+    Args:
+        task: (源代码, 策略) 元组
+
+    Returns:
+        str: 变换后的代码
+    """
+    code, strategy = task
+    return RuntimeProtector().transform(code, strategy)
@@ -1,260 +1,403 @@
-"""虚拟化变换模块"""
-
-import random
-import re
-
-class VirtualizationTransformer:
-    """虚拟化变换"""
-    
-    def __init__(self):
-        """初始化虚拟化变换器"""
-        self.vm_counter = 0
-    
-    def transform(self, code, strategy):
-        """应用虚拟化变换
-        
-        Args:
-            code: 源代码字符串
-            strategy: 混淆策略
-            
-        Returns:
-            str: 变换后的代码
-        """
-        transformed_code = code
-        
-        # 应用虚拟化
-        if strategy.virtualization.get('enabled', False):
-            # 检查是否启用字节码VM
-            if strategy.virtualization.get('bytecode_vm', False):
-                transformed_code = self._virtualize_with_bytecode(transformed_code)
-            
-            # 检查是否启用解释执行
-            if strategy.virtualization.get('interpreted_execution', False):
-                transformed_code = self._virtualize_with_interpretation(transformed_code)
-        
-        return transformed_code
-    
-    def _virtualize_with_bytecode(self, code):
-        """使用字节码VM虚拟化
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 寻找函数定义
-        function_pattern = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
-        
-        def replace_function(match):
-            function_name = match.group(1)
-            params = match.group(2)
-            body = match.group(3)
-            
-            # 虚拟化函数
-            virtualized_function = self._virtualize_function(function_name, params, body)
-            
-            return virtualized_function
-        
-        # 添加VM解释器
-        vm_interpreter = self._generate_vm_interpreter()
-        code = vm_interpreter + '\n\n' + code
-        
-        return function_pattern.sub(replace_function, code)
-    
-    def _virtualize_function(self, function_name, params, body):
-        """虚拟化单个函数
-        
-        Args:
-            function_name: 函数名
-            params: 函数参数
-            body: 函数体
-            
-        Returns:
-            str: 虚拟化后的函数代码
-        """
-        # 生成字节码
-        bytecode = self._generate_bytecode(body)
-        
-        # 生成虚拟化函数
-        vm_name = f"vm_{random.randint(1000, 9999)}"
-        bytecode_var = f"_bytecode_{random.randint(1000, 9999)}"
-        
-        # 生成函数代码
-        function_code = f"def {function_name}({params}):\n"
-        function_code += f"    {bytecode_var} = {bytecode}\n"
-        function_code += f"    return {vm_name}({bytecode_var}, locals())"
-        
-        return function_code
-    
-    def _generate_bytecode(self, body):
-        """生成字节码
-        
-        Args:
-            body: 函数体代码
-            
-        Returns:
-            str: 字节码列表的字符串表示
-        """
-        # 简化版实现，将代码转换为字节码指令
-        instructions = []
-        
-        # 分割代码行
-        lines = body.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # 生成指令
-            instruction = self._generate_instruction(line)
-            instructions.append(instruction)
-        
-        return str(instructions)
-    
-    def _generate_instruction(self, line):
-        """生成单个指令
-        
-        Args:
-            line: 代码行
-            
-        Returns:
-            dict: 指令字典
-        """
-        # 简化版实现
-        if '=' in line:
-            # 赋值指令
-            parts = line.split('=', 1)
-            var = parts[0].strip()
-            expr = parts[1].strip()
-            return {'op': 'SET', 'args': [var, expr]}
-        elif 'return' in line:
-            # 返回指令
-            parts = line.split('return', 1)
-            if len(parts) > 1:
-                expr = parts[1].strip()
-                return {'op': 'RETURN', 'args': [expr]}
-            else:
-                return {'op': 'RETURN', 'args': []}
-        elif 'if' in line:
-            # 条件指令
-            parts = line.split('if', 1)
-            if len(parts) > 1:
-                cond = parts[1].strip().rstrip(':')
-                return {'op': 'IF', 'args': [cond]}
-        elif 'for' in line:
-            # 循环指令
-            parts = line.split('for', 1)
-            if len(parts) > 1:
-                loop = parts[1].strip().rstrip(':')
-                return {'op': 'FOR', 'args': [loop]}
-        elif 'while' in line:
-            # 循环指令
-            parts = line.split('while', 1)
-            if len(parts) > 1:
-                cond = parts[1].strip().rstrip(':')
-                return {'op': 'WHILE', 'args': [cond]}
-        
-        # 默认指令
-        return {'op': 'EXEC', 'args': [line]}
-    
-    def _generate_vm_interpreter(self):
-        """生成VM解释器
-        
-        Returns:
-            str: VM解释器代码
-        """
-        vm_name = f"vm_{random.randint(1000, 9999)}"
-        
-        interpreter_code = f"def {vm_name}(bytecode, context):\n"
-        interpreter_code += f"    stack = []\n"
-        interpreter_code += f"    pc = 0\n"
-        interpreter_code += f"    while pc < len(bytecode):\n"
-        interpreter_code += f"        instr = bytecode[pc]\n"
-        interpreter_code += f"        op = instr['op']\n"
-        interpreter_code += f"        args = instr.get('args', [])\n"
-        interpreter_code += f"        if op == 'SET':\n"
-        interpreter_code += f"            var = args[0]\n"
-        interpreter_code += f"            expr = args[1]\n"
-        interpreter_code += f"            context[var] = eval(expr, globals(), context)\n"
-        interpreter_code += f"        elif op == 'RETURN':\n"
-        interpreter_code += f"            if args:\n"
-        interpreter_code += f"                return eval(args[0], globals(), context)\n"
-        interpreter_code += f"            else:\n"
-        interpreter_code += f"                return None\n"
-        interpreter_code += f"        elif op == 'IF':\n"
-        interpreter_code += f"            cond = args[0]\n"
-        interpreter_code += f"            if not eval(cond, globals(), context):\n"
-        interpreter_code += f"                # 跳过下一条指令\n"
-        interpreter_code += f"                pc += 1\n"
-        interpreter_code += f"        elif op == 'EXEC':\n"
-        interpreter_code += f"            exec(args[0], globals(), context)\n"
-        interpreter_code += f"        pc += 1\n"
-        interpreter_code += f"    return None"
-        
-        return interpreter_code
-    
-    def _virtualize_with_interpretation(self, code):
-        """使用解释执行虚拟化
-        
-        Args:
-            code: 源代码字符串
-            
-        Returns:
-            str: 变换后的代码
-        """
-        # 生成解释器
-        interpreter = self._generate_interpreter()
-        
-        # 包装代码
-        wrapped_code = self._wrap_code_with_interpreter(code, interpreter)
-        
-        return wrapped_code
-    
-    def _generate_interpreter(self):
-        """生成解释器
-        
-        Returns:
-            str: 解释器代码
-        """
-        interpreter_name = f"interpret_{random.randint(1000, 9999)}"
-        
-        interpreter_code = f"def {interpreter_name}(code, context=None):\n"
-        interpreter_code += f"    if context is None:\n"
-        interpreter_code += f"        context = {{}}\n"
-        interpreter_code += f"    # 简单的解释器实现\n"
-        interpreter_code += f"    lines = code.strip().split('\\n')\n"
-        interpreter_code += f"    for line in lines:\n"
-        interpreter_code += f"        line = line.strip()\n"
-        interpreter_code += f"        if not line or line.startswith('#'):\n"
-        interpreter_code += f"            continue\n"
-        interpreter_code += f"        exec(line, globals(), context)\n"
-        interpreter_code += f"    return context"
-        
-        return interpreter_code
-    
-    def _wrap_code_with_interpreter(self, code, interpreter):
-        """使用解释器包装代码
-        
-        Args:
-            code: 源代码字符串
-            interpreter: 解释器代码
-            
-        Returns:
-            str: 包装后的代码
-        """
-        # 提取解释器名
-        interpreter_name_match = re.search(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(', interpreter)
-        if not interpreter_name_match:
-            return code
-        
-        interpreter_name = interpreter_name_match.group(1)
-        
-        # 包装代码
-        wrapped_code = interpreter + '\n\n'
-        wrapped_code += f"# 原始代码被解释执行\n"
-        wrapped_code += f"_code = '''{code}'''\n"
-        wrapped_code += f"_context = {interpreter_name}(_code)\n"
-        
-        return wrapped_code
+"""虚拟化变换模块"""
+
+import ast
+import functools
+import random
+import re
+
+from hos.transformer import _functions
+
+# 预编译的变换正则表达式（模块加载时编译一次，避免每次 transform 重新编译）
+# （仅作为非 Python 输入的回退路径，AST 主路径见 _functions 模块）
+_FUNCTION_PATTERN = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):\s*(.*?)(?=def|$)', re.DOTALL)
+_INTERP_NAME_PATTERN = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')
+
+# 行分类器：命名分支一次匹配定类，lastgroup 查表分发，取代逐个
+# `in`/`split` 探测（`in` 探测还会把 `if x == 1:` 误判成赋值）
+_LINE_CLASSIFIER = re.compile(
+    r'(?P<IF>^if\s+.+:)|(?P<FOR>^for\s+.+:)|(?P<WHILE>^while\s+.+:)'
+    r'|(?P<RETURN>^return\b.*)|(?P<SET>^[^=]+=(?!=).*)')
+
+# 整数操作码：生成的 VM 按表查处理函数，O(1) 分发取代逐个字符串
+# 相等比较
+_OP_SET, _OP_RETURN, _OP_IF, _OP_FOR, _OP_WHILE, _OP_EXEC = range(6)
+
+# lastgroup → (操作码, 关键字长度, 是否去掉结尾冒号)
+_KEYWORD_OPS = {
+    'IF': (_OP_IF, 2, True),
+    'FOR': (_OP_FOR, 3, True),
+    'WHILE': (_OP_WHILE, 5, True),
+    'RETURN': (_OP_RETURN, 6, False),
+}
+
+# 解释器模板：内容固定，模块加载时构造一次，每次调用只做一次
+# {name} 替换，不再逐行 += 重新拼接
+_VM_TEMPLATE = '''\
+import array
+_vm_compiled = {{}}
+def _vm_code(src, mode):
+    # 每条指令的表达式首次执行时编译一次缓存，之后 eval/exec 只付
+    # 代码对象的执行成本，不再逐次从源码重新解析编译
+    code = _vm_compiled.get(src)
+    if code is None:
+        code = _vm_compiled[src] = compile(src, '<virt>', mode)
+    return code
+
+def _vm_set(args, context):
+    context[args[0]] = eval(_vm_code(args[1], 'eval'), globals(), context)
+
+def _vm_exec(args, context):
+    exec(_vm_code(args[0], 'exec'), globals(), context)
+
+def _vm_nop(args, context):
+    pass
+
+# 操作码: SET=0, RETURN=1, IF=2, FOR=3, WHILE=4, EXEC=5；
+# RETURN/IF 改变控制流，在主循环内处理
+_VM_HANDLERS = (_vm_set, None, None, _vm_nop, _vm_nop, _vm_exec)
+
+def {name}(bytecode, context):
+    handlers = _VM_HANDLERS
+    ops, argtab = bytecode
+    pc = 0
+    n = len(ops)
+    while pc < n:
+        op = ops[pc]
+        args = argtab[pc]
+        if op == 1:
+            # 返回指令
+            if args:
+                return eval(_vm_code(args[0], 'eval'), globals(), context)
+            return None
+        if op == 2:
+            # 条件不成立时跳过下一条指令
+            if not eval(_vm_code(args[0], 'eval'), globals(), context):
+                pc += 1
+        else:
+            handlers[op](args, context)
+        pc += 1
+    return None'''
+
+_INTERP_TEMPLATE = '''\
+def {name}(code, context=None):
+    if context is None:
+        context = {{}}
+    # 简单的解释器实现
+    lines = code.strip().split('\\n')
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        exec(line, globals(), context)
+    return context'''
+
+class VirtualizationTransformer:
+    """虚拟化变换"""
+    
+    def __init__(self):
+        """初始化虚拟化变换器"""
+        self.vm_counter = 0
+        # 实例私有 RNG：绕开模块级 random 的全局状态锁争用
+        self._rng = random.Random()
+
+    def _suffix(self):
+        """生成 1000-9999 的随机名字后缀
+
+        getrandbits 直接取位，没有 randint 的区间换算开销。
+
+        Returns:
+            int: 随机后缀
+        """
+        return 1000 + self._rng.getrandbits(14) % 9000
+    
+    def transform(self, code, strategy):
+        """应用虚拟化变换
+        
+        Args:
+            code: 源代码字符串
+            strategy: 混淆策略
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 未启用虚拟化（常见情形）直接原样返回，子开关只查一次
+        virtualization = strategy.virtualization
+        if not virtualization.get('enabled', False):
+            return code
+
+        transformed_code = code
+
+        # 检查是否启用字节码VM
+        if virtualization.get('bytecode_vm', False):
+            transformed_code = self._virtualize_with_bytecode(transformed_code)
+
+        # 检查是否启用解释执行
+        if virtualization.get('interpreted_execution', False):
+            transformed_code = self._virtualize_with_interpretation(transformed_code)
+
+        return transformed_code
+    
+    def _virtualize_with_bytecode(self, code):
+        """使用字节码VM虚拟化
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 主路径：一次 ast.parse 定位顶层函数的行区间，从后往前按行
+        # 切片替换，整体线性；原正则 `(.*?)(?=def|$)` 的逐字符回溯
+        # 在大文件上是平方级的，仅保留为非 Python 输入的回退
+        try:
+            nodes = _functions.function_nodes(code, top_level=True)
+        except SyntaxError:
+            def replace_function(match):
+                function_name = match.group(1)
+                params = match.group(2)
+                body = match.group(3)
+
+                # 虚拟化函数
+                return self._virtualize_function(function_name, params,
+                                                 body)
+
+            # 没有函数定义就不生成解释器，原样返回
+            new_code, count = _FUNCTION_PATTERN.subn(replace_function,
+                                                     code)
+            if not count:
+                return code
+
+            # 添加VM解释器
+            return ''.join([self._generate_vm_interpreter(), '\n\n',
+                            new_code])
+
+        # 没有函数定义就不生成解释器，原样返回
+        if not nodes:
+            return code
+
+        spans = _functions.function_spans(code, nodes)
+        lines = code.splitlines(keepends=True)
+        for node, (name, params, start, end) in sorted(
+                zip(nodes, spans), key=lambda p: p[1][2], reverse=True):
+            replacement = self._virtualize_function(name, params, '',
+                                                    node=node)
+            lines[start - 1:end] = [replacement + '\n']
+
+        # VM解释器在替换完成后前置，不会被自己的替换逻辑再处理
+        return ''.join([self._generate_vm_interpreter(), '\n\n'] + lines)
+    
+    def _virtualize_function(self, function_name, params, body,
+                             node=None):
+        """虚拟化单个函数
+
+        Args:
+            function_name: 函数名
+            params: 函数参数
+            body: 函数体
+            node: 可选的函数定义节点，给出时直接从 AST 生成字节码
+
+        Returns:
+            str: 虚拟化后的函数代码
+        """
+        # 生成字节码（AST 路径按节点类型映射，回退路径按行启发式）
+        if node is not None:
+            bytecode = self._pack_bytecode(
+                self._bytecode_from_ast(node.body))
+            arg_spec = node.args
+            names = [arg.arg for arg in (arg_spec.posonlyargs
+                                         + arg_spec.args
+                                         + arg_spec.kwonlyargs)]
+            if arg_spec.vararg is not None:
+                names.append(arg_spec.vararg.arg)
+            if arg_spec.kwarg is not None:
+                names.append(arg_spec.kwarg.arg)
+        else:
+            bytecode = self._generate_bytecode(body)
+            names = []
+            for param in params.split(','):
+                name = param.partition('=')[0].strip().lstrip('*')
+                if name and name != '/':
+                    names.append(name)
+
+        # 生成虚拟化函数
+        vm_name = f"vm_{self._suffix()}"
+        bytecode_var = f"_bytecode_{self._suffix()}"
+
+        # 显式构造 VM 命名空间：locals() 每次调用都复制一份新字典，
+        # 且 VM 对副本的写入不会回传真实局部变量
+        context_items = ', '.join(f"'{name}': {name}" for name in names)
+
+        # 生成函数代码（单个 f-string 字面量一次求值，不做逐段拼接）
+        return (f"def {function_name}({params}):\n"
+                f"    {bytecode_var} = {bytecode}\n"
+                f"    return {vm_name}({bytecode_var}, "
+                f"{{{context_items}}})")
+    
+    @classmethod
+    def _bytecode_from_ast(cls, stmts):
+        """从 AST 语句列表生成字节码指令
+
+        一次 ast.parse 的节点直接按类型映射成指令，多行语句和嵌套
+        结构不会像按行启发式那样被拆错；复合语句的语句体递归展平，
+        与回退路径对缩进行逐行生成指令的形状一致。
+
+        Args:
+            stmts: AST 语句节点列表
+
+        Returns:
+            list: (操作码, 参数元组) 指令列表
+        """
+        instructions = []
+        for stmt in stmts:
+            if isinstance(stmt, ast.Assign):
+                instructions.append(
+                    (_OP_SET, (ast.unparse(stmt.targets[0]),
+                               ast.unparse(stmt.value))))
+            elif isinstance(stmt, ast.Return):
+                args = ((ast.unparse(stmt.value),)
+                        if stmt.value is not None else ())
+                instructions.append((_OP_RETURN, args))
+            elif isinstance(stmt, ast.If):
+                instructions.append((_OP_IF, (ast.unparse(stmt.test),)))
+                instructions.extend(cls._bytecode_from_ast(stmt.body))
+            elif isinstance(stmt, ast.For):
+                instructions.append(
+                    (_OP_FOR, (f"{ast.unparse(stmt.target)} in "
+                               f"{ast.unparse(stmt.iter)}",)))
+                instructions.extend(cls._bytecode_from_ast(stmt.body))
+            elif isinstance(stmt, ast.While):
+                instructions.append(
+                    (_OP_WHILE, (ast.unparse(stmt.test),)))
+                instructions.extend(cls._bytecode_from_ast(stmt.body))
+            else:
+                instructions.append((_OP_EXEC, (ast.unparse(stmt),)))
+        return instructions
+
+    @functools.lru_cache(maxsize=512)
+    def _generate_bytecode(self, body):
+        """生成字节码
+
+        按函数体文本做 lru_cache：批量变换目录时重复的样板函数体
+        （以及同一文件的重复变换）直接命中缓存，不重新逐行生成。
+        随机的名字后缀都在调用方生成，缓存的部分是纯函数。
+
+        Args:
+            body: 函数体代码
+
+        Returns:
+            str: 字节码字面量源码
+        """
+        # 简化版实现，将代码转换为字节码指令：splitlines 在 C 层
+        # 一次分行，过滤空行和注释在同一遍推导式里完成
+        instructions = [
+            self._generate_instruction(stripped)
+            for stripped in (line.strip() for line in body.splitlines())
+            if stripped and not stripped.startswith('#')]
+
+        return self._pack_bytecode(instructions)
+
+    @staticmethod
+    def _pack_bytecode(instructions):
+        """把指令列表打包成生成代码中的字节码字面量
+
+        操作码压成 array.array('b')（每条指令 1 字节），参数放进
+        平行元组：相比逐条 (操作码, 参数) 元组对象，省掉每条指令
+        的元组头开销，分发循环按下标扫描的是连续字节。
+
+        Args:
+            instructions: (操作码, 参数元组) 指令列表
+
+        Returns:
+            str: 字节码字面量源码
+        """
+        ops = bytes(op for op, _ in instructions)
+        args = tuple(args for _, args in instructions)
+        return f"(array.array('b', {ops!r}), {args!r})"
+
+    def _generate_instruction(self, line):
+        """生成单个指令
+        
+        Args:
+            line: 代码行
+            
+        Returns:
+            tuple: (操作码, 参数元组) 指令
+        """
+        # 简化版实现：一次匹配分类，按 lastgroup 查表分发
+        match = _LINE_CLASSIFIER.match(line)
+        group = match.lastgroup if match else None
+
+        if group == 'SET':
+            # 赋值指令：partition 返回三元组，不为切分结果建列表
+            var, _, expr = line.partition('=')
+            return (_OP_SET, (var.strip(), expr.strip()))
+
+        if group in _KEYWORD_OPS:
+            op, keyword_len, strip_colon = _KEYWORD_OPS[group]
+            rest = line[keyword_len:].strip()
+            if strip_colon:
+                return (op, (rest.rstrip(':'),))
+            # 返回指令：不带表达式的 return 没有参数
+            return (op, (rest,) if rest else ())
+
+        # 默认指令
+        return (_OP_EXEC, (line,))
+    
+    def _generate_vm_interpreter(self):
+        """生成VM解释器
+        
+        Returns:
+            str: VM解释器代码
+        """
+        return _VM_TEMPLATE.format(
+            name=f"vm_{self._suffix()}")
+    
+    def _virtualize_with_interpretation(self, code):
+        """使用解释执行虚拟化
+        
+        Args:
+            code: 源代码字符串
+            
+        Returns:
+            str: 变换后的代码
+        """
+        # 生成解释器
+        interpreter = self._generate_interpreter()
+        
+        # 包装代码
+        wrapped_code = self._wrap_code_with_interpreter(code, interpreter)
+        
+        return wrapped_code
+    
+    def _generate_interpreter(self):
+        """生成解释器
+        
+        Returns:
+            str: 解释器代码
+        """
+        return _INTERP_TEMPLATE.format(
+            name=f"interpret_{self._suffix()}")
+    
+    def _wrap_code_with_interpreter(self, code, interpreter):
+        """使用解释器包装代码
+        
+        Args:
+            code: 源代码字符串
+            interpreter: 解释器代码
+            
+        Returns:
+            str: 包装后的代码
+        """
+        # 提取解释器名
+        interpreter_name_match = _INTERP_NAME_PATTERN.search(interpreter)
+        if not interpreter_name_match:
+            return code
+        
+        interpreter_name = interpreter_name_match.group(1)
+        
+        # 包装代码：repr 在 C 层一次生成带转义的字符串字面量，
+        # 源码里含三引号也不会把包装结果撑破
+        return (f"{interpreter}\n\n"
+                f"# 原始代码被解释执行\n"
+                f"_code = {code!r}\n"
+                f"_context = {interpreter_name}(_code)\n")
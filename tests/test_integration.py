@@ -1,12 +1,17 @@
 """Integration tests for end-to-end workflow"""
 
+import json
 import pytest
-import tempfile
-import os
 import subprocess
 
+from click.testing import CliRunner
+from hos.cli.main import cli
 
-def test_end_to_end_protection():
+# Whole module is end-to-end; deselect with `pytest -m "not integration"`
+pytestmark = pytest.mark.integration
+
+
+def test_end_to_end_protection(tmp_path):
     """Test end-to-end code protection workflow"""
     # Create a test Python file
     test_code = '''
@@ -20,112 +25,97 @@ if __name__ == "__main__":
     print(greet())
     print(calculate(5, 3))
 '''
-    
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create input file
-        input_file = os.path.join(tmpdir, 'test.py')
-        with open(input_file, 'w') as f:
-            f.write(test_code)
-        
-        # Create output directory
-        output_dir = os.path.join(tmpdir, 'output')
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Run HOS protection
-        output_file = os.path.join(output_dir, 'test.py')
-        result = subprocess.run(
-            ['python', '-m', 'hos.cli.main', 'protect',
-             '--input', input_file,
-             '--output', output_file,
-             '--level', 'medium',
-             '--mode', 'balanced',
-             '--provider', 'local'],
-            capture_output=True,
-            text=True
-        )
-        
-        print(f"Return code: {result.returncode}")
-        print(f"Stdout: {result.stdout}")
-        print(f"Stderr: {result.stderr}")
-        print(f"Expected output file: {output_file}")
-        print(f"Output file exists: {os.path.exists(output_file)}")
-        
-        assert result.returncode == 0
-        assert '加密完成' in result.stdout
-        
-        # Check that output file was created
-        assert os.path.exists(output_file)
-        assert os.path.getsize(output_file) > 0
-        
-        # Verify the transformed code is different
-        with open(output_file, 'r', encoding='utf-8', errors='ignore') as f:
-            transformed_code = f.read()
-        
-        assert transformed_code != test_code
-        assert 'Hello, World!' not in transformed_code
-        assert 'greet' in transformed_code
-        assert 'calculate' in transformed_code
 
+    # Create input file
+    input_file = tmp_path / 'test.py'
+    input_file.write_text(test_code)
 
-def test_directory_protection():
+    # Create output directory
+    output_dir = tmp_path / 'output'
+    output_dir.mkdir(exist_ok=True)
+
+    # Run HOS protection
+    output_file = output_dir / 'test.py'
+    result = subprocess.run(
+        ['python', '-m', 'hos.cli.main', 'protect',
+         '--input', str(input_file),
+         '--output', str(output_file),
+         '--level', 'medium',
+         '--mode', 'balanced',
+         '--provider', 'local'],
+        capture_output=True,
+        text=True
+    )
+
+    assert result.returncode == 0
+    assert '加密完成' in result.stdout
+
+    # Check that output file was created
+    assert output_file.exists()
+    assert output_file.stat().st_size > 0
+
+    # Verify the transformed code is different
+    transformed_code = output_file.read_text(encoding='utf-8', errors='ignore')
+
+    assert transformed_code != test_code
+    assert 'Hello, World!' not in transformed_code
+    assert 'greet' in transformed_code
+    assert 'calculate' in transformed_code
+
+
+def test_directory_protection(tmp_path):
     """Test directory protection workflow"""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create input directory with multiple files
-        input_dir = os.path.join(tmpdir, 'input')
-        os.makedirs(input_dir, exist_ok=True)
-        
-        # Create test files
-        files = {
-            'test1.py': 'print("Test 1")',
-            'test2.py': 'print("Test 2")',
-            'subdir': {
-                'test3.py': 'print("Test 3")'
-            }
-        }
-        
-        # Create files
-        for name, content in files.items():
-            if isinstance(content, dict):
-                subdir = os.path.join(input_dir, name)
-                os.makedirs(subdir, exist_ok=True)
-                for subname, subcontent in content.items():
-                    with open(os.path.join(subdir, subname), 'w') as f:
-                        f.write(subcontent)
-            else:
-                with open(os.path.join(input_dir, name), 'w') as f:
-                    f.write(content)
-        
-        # Create output directory
-        output_dir = os.path.join(tmpdir, 'output')
-        
-        # Run HOS protection on directory
-        result = subprocess.run(
-            ['python', '-m', 'hos.cli.main', 'protect',
-             '--input', input_dir,
-             '--output', output_dir,
-             '--level', 'low',
-             '--mode', 'performance'],
-            capture_output=True,
-            text=True
-        )
-        
-        assert result.returncode == 0
-        assert '加密完成' in result.stdout
-        
-        # Check that all files were processed
-        expected_files = [
-            'test1.py',
-            'test2.py',
-            'subdir/test3.py'
-        ]
-        
-        for expected_file in expected_files:
-            output_file = os.path.join(output_dir, expected_file)
-            assert os.path.exists(output_file)
-            assert os.path.getsize(output_file) > 0
+    # Create input directory with multiple files
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir(exist_ok=True)
+
+    # Create test files (relative path -> content)
+    files = {
+        'test1.py': 'print("Test 1")',
+        'test2.py': 'print("Test 2")',
+        'subdir/test3.py': 'print("Test 3")',
+    }
+
+    for rel_path, content in files.items():
+        path = input_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
 
+    # Create output directory
+    output_dir = tmp_path / 'output'
 
-def test_analysis_workflow():
+    # Run HOS protection on directory (in-process: one interpreter
+    # and one hos import for the whole suite instead of a cold
+    # python -m start per invocation)
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        'protect',
+        '--input', str(input_dir),
+        '--output', str(output_dir),
+        '--level', 'low',
+        '--mode', 'performance',
+        '--json'
+    ])
+
+    assert result.exit_code == 0
+    report = json.loads(result.output.strip().splitlines()[-1])
+    assert report['ok'] is True
+    assert report['files'] == 3
+
+    # Check that all files were processed
+    expected_files = [
+        'test1.py',
+        'test2.py',
+        'subdir/test3.py'
+    ]
+
+    for expected_file in expected_files:
+        output_file = output_dir / expected_file
+        assert output_file.exists()
+        assert output_file.stat().st_size > 0
+
+
+def test_analysis_workflow(tmp_path):
     """Test code analysis workflow"""
     test_code = '''
 def complex_function(x, y):
@@ -134,94 +124,90 @@ def complex_function(x, y):
     else:
         return y // 2
 '''
-    
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-        f.write(test_code)
-        input_file = f.name
-    
-    try:
-        # Run HOS analysis
-        result = subprocess.run(
-            ['python', '-m', 'hos.cli.main', 'analyze-cmd',
-             '--file', input_file],
-            capture_output=True,
-            text=True
-        )
-        
-        assert result.returncode == 0
-        assert '分析结果' in result.stdout
-        assert '代码行数' in result.stdout
-        assert '函数数量' in result.stdout
-        assert '类数量' in result.stdout
-        
-    finally:
-        os.unlink(input_file)
+
+    input_file = tmp_path / 'test.py'
+    input_file.write_text(test_code)
+
+    # Run HOS analysis
+    result = subprocess.run(
+        ['python', '-m', 'hos.cli.main', 'analyze-cmd',
+         '--file', str(input_file)],
+        capture_output=True,
+        text=True
+    )
+
+    assert result.returncode == 0
+    assert '分析结果' in result.stdout
+    assert '代码行数' in result.stdout
+    assert '函数数量' in result.stdout
+    assert '类数量' in result.stdout
 
 
-def test_performance_modes():
+@pytest.mark.parametrize("mode", ['performance', 'balanced', 'security'])
+def test_performance_modes(mode, tmp_path):
     """Test different performance modes"""
     test_code = 'x = 12345'
-    
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create input file
-        input_file = os.path.join(tmpdir, 'test.py')
-        with open(input_file, 'w') as f:
-            f.write(test_code)
-        
-        # Test different modes
-        for mode in ['performance', 'balanced', 'security']:
-            output_file = os.path.join(tmpdir, f'test_{mode}.py')
-            
-            # Run HOS protection
-            result = subprocess.run(
-                ['python', '-m', 'hos.cli.main', 'protect',
-                 '--input', input_file,
-                 '--output', output_file,
-                 '--level', 'medium',
-                 '--mode', mode],
-                capture_output=True,
-                text=True
-            )
-            
-            assert result.returncode == 0
-            assert os.path.exists(output_file)
-            assert os.path.getsize(output_file) > 0
-
-
-def test_strength_levels():
+
+    # Create input file
+    input_file = tmp_path / 'test.py'
+    input_file.write_text(test_code)
+
+    output_file = tmp_path / f'test_{mode}.py'
+
+    # Run HOS protection
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        'protect',
+        '--input', str(input_file),
+        '--output', str(output_file),
+        '--level', 'medium',
+        '--mode', mode
+    ])
+
+    assert result.exit_code == 0
+    assert output_file.exists()
+    assert output_file.stat().st_size > 0
+
+
+@pytest.mark.parametrize("level", ['low', 'medium', 'high'])
+def test_strength_levels(level, tmp_path):
     """Test different strength levels"""
     test_code = 'print("Hello")'
-    
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create input file
-        input_file = os.path.join(tmpdir, 'test.py')
-        with open(input_file, 'w') as f:
-            f.write(test_code)
-        
-        # Test different strength levels
-        for level in ['low', 'medium', 'high']:
-            output_file = os.path.join(tmpdir, f'test_{level}.py')
-            
-            # Run HOS protection
-            result = subprocess.run(
-                ['python', '-m', 'hos.cli.main', 'protect',
-                 '--input', input_file,
-                 '--output', output_file,
-                 '--level', level,
-                 '--mode', 'balanced'],
-                capture_output=True,
-                text=True
-            )
-            
-            assert result.returncode == 0
-            assert os.path.exists(output_file)
-            assert os.path.getsize(output_file) > 0
-
-
-def test_edge_cases():
-    """Test edge cases for Python obfuscation"""
-    # Test edge cases
-    edge_cases = [
+
+    # Create input file
+    input_file = tmp_path / 'test.py'
+    input_file.write_text(test_code)
+
+    output_file = tmp_path / f'test_{level}.py'
+
+    # Run HOS protection
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        'protect',
+        '--input', str(input_file),
+        '--output', str(output_file),
+        '--level', level,
+        '--mode', 'balanced'
+    ])
+
+    assert result.exit_code == 0
+    assert output_file.exists()
+    assert output_file.stat().st_size > 0
+
+
+@pytest.fixture(scope="module")
+def tmp_workspace(tmp_path_factory):
+    """One temp directory shared by all edge cases in this module.
+
+    Each case gets a cheap subdirectory instead of paying a full
+    mkdtemp/rmtree cycle per parametrized run.
+    """
+    return tmp_path_factory.mktemp("edge")
+
+
+# Edge cases for Python obfuscation (module scope so pytest can
+# parametrize and xdist can schedule each case independently)
+EDGE_CASES = (
         # Empty function
         ('''
 def empty_function():
@@ -292,37 +278,41 @@ def dict_comp():
 def set_comp():
     return {x * 2 for x in range(10) if x % 2 == 0}
 ''', "set_comp"),
-    ]
-    
-    for test_code, function_name in edge_cases:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Create input file
-            input_file = os.path.join(tmpdir, 'test.py')
-            with open(input_file, 'w') as f:
-                f.write(test_code)
-            
-            # Create output file
-            output_file = os.path.join(tmpdir, 'test_protected.py')
-            
-            # Run HOS protection
-            result = subprocess.run(
-                ['python', '-m', 'hos.cli.main', 'protect',
-                 '--input', input_file,
-                 '--output', output_file,
-                 '--level', 'medium',
-                 '--mode', 'balanced'],
-                capture_output=True,
-                text=True
-            )
-            
-            assert result.returncode == 0
-            assert os.path.exists(output_file)
-            assert os.path.getsize(output_file) > 0
-            
-            # Read protected code
-            with open(output_file, 'r', encoding='utf-8', errors='ignore') as f:
-                protected_code = f.read()
-            
-            # Verify obfuscation
-            assert protected_code != test_code
-            assert function_name in protected_code
+)
+
+
+@pytest.mark.parametrize("test_code,function_name", EDGE_CASES,
+                         ids=[case[1] for case in EDGE_CASES])
+def test_edge_cases(test_code, function_name, tmp_workspace):
+    """Test edge cases for Python obfuscation"""
+    # Per-case subdirectory inside the shared module workspace
+    work = tmp_workspace / function_name
+    work.mkdir()
+
+    # Create input file
+    input_file = work / 'test.py'
+    input_file.write_text(test_code)
+
+    # Create output file
+    output_file = work / 'test_protected.py'
+
+    # Run HOS protection
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        'protect',
+        '--input', str(input_file),
+        '--output', str(output_file),
+        '--level', 'medium',
+        '--mode', 'balanced'
+    ])
+
+    assert result.exit_code == 0
+    assert output_file.exists()
+    assert output_file.stat().st_size > 0
+
+    # Read protected code
+    protected_code = output_file.read_text(encoding='utf-8', errors='ignore')
+
+    # Verify obfuscation
+    assert protected_code != test_code
+    assert function_name in protected_code